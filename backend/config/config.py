@@ -4,14 +4,125 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Settings(BaseSettings):
-    PINECONE_API_KEY: str
-    PINECONE_ENVIRONMENT: str
-    PINECONE_INDEX_NAME: str
+    # Not needed when VECTOR_BACKEND is "local"
+    PINECONE_API_KEY: str = ""
+    PINECONE_ENVIRONMENT: str = ""
+    PINECONE_INDEX_NAME: str = ""
     GROQ_API_KEY: str
     GOOGLE_API_KEY: str
     OPENAI_API_KEY: str
     VOYAGE_API_KEY: str
-    GOOGLE_APPLICATION_CREDENTIAL: str
+    # Only needed to OCR scanned pages; read on first use
+    GOOGLE_APPLICATION_CREDENTIAL: str = ""
+
+    # Query-embedding cache (empty path keeps it in memory only); the SQLite
+    # file keeps at most EMBED_CACHE_DISK_SIZE rows
+    EMBED_CACHE_SIZE: int = 2048
+    EMBED_CACHE_TTL_SECONDS: float = 86400
+    EMBED_CACHE_PATH: str = "data/query_embeddings.sqlite"
+    EMBED_CACHE_DISK_SIZE: int = 100_000
+
+    # Semantic answer cache (cosine similarity needed to reuse an answer)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_TTL_SECONDS: float = 3600
+
+    # Threads used to offload sync-only clients from the event loop
+    SYNC_POOL_SIZE: int = 16
+
+    # Background ingestion
+    INGEST_WORKERS: int = 2
+    JOBS_DB_PATH: str = "data/jobs.sqlite"
+    CHUNK_MANIFEST_PATH: str = "data/chunk_manifest.sqlite"
+    # Streaming ingestion: chunks per embed/upsert batch, max seconds a partial
+    # batch waits, and batches buffered between stages
+    INGEST_BATCH_CHUNKS: int = 512
+    INGEST_FLUSH_SECONDS: float = 2.0
+    INGEST_QUEUE_DEPTH: int = 2
+    # Chunking: structure-aware chunks of at most CHUNK_MAX_TOKENS embedding tokens
+    # (False keeps the 500-character recursive splitter). Changing either
+    # re-embeds every chunk on the next ingestion of a document
+    STRUCTURED_CHUNKING: bool = True
+    CHUNK_MAX_TOKENS: int = 192
+    CHUNK_MIN_TOKENS: int = 32
+
+    # Local float16 copy of every document embedding, so an index can be
+    # rebuilt without re-embedding (`python -m backend.rebuild_index`);
+    # empty path disables it
+    EMBEDDING_ARCHIVE_PATH: str = "data/embedding_archive"
+    # Chunk text by vector id, read by the retrievers; the index metadata then
+    # only holds source, page and section. Empty path keeps the text in the index
+    CHUNK_STORE_PATH: str = "data/chunks.sqlite"
+
+    # Document embedding (Voyage allows up to 1000 texts / 320k tokens per call)
+    EMBED_CONCURRENCY: int = 4
+    EMBED_BATCH_TOKENS: int = 32000
+    EMBED_BATCH_ITEMS: int = 128
+    EMBED_MAX_RETRIES: int = 5
+
+    # Vector store: "pinecone", or "local" for the in-process memory-mapped index
+    VECTOR_BACKEND: str = "pinecone"
+    VECTOR_DIMENSION: int = 1024
+    LOCAL_INDEX_PATH: str = "data/vector_index"
+
+    # Hybrid retrieval: BM25 alongside dense search, merged with reciprocal rank fusion
+    HYBRID_SEARCH: bool = True
+    HYBRID_CANDIDATES: int = 10
+    RRF_K: int = 60
+    BM25_INDEX_PATH: str = "data/bm25.sqlite"
+
+    # Reranking: over-fetch candidates, pick with MMR, merge overlapping neighbours
+    RERANK_ENABLED: bool = True
+    RERANK_FETCH_K: int = 20
+    MMR_LAMBDA: float = 0.5
+    MERGE_ADJACENT_CHUNKS: bool = True
+
+    # Context packing: retrieve up to CONTEXT_MAX_CHUNKS, keep those scoring at
+    # least CONTEXT_MIN_RELEVANCE x the best one (dense cosine scores only; hybrid
+    # results keep their fused order), within CONTEXT_TOKEN_BUDGET tokens
+    CONTEXT_PACKING: bool = True
+    CONTEXT_TOKEN_BUDGET: int = 350
+    CONTEXT_MAX_CHUNKS: int = 6
+    CONTEXT_MIN_RELEVANCE: float = 0.75
+
+    # Upstream calls on the query path (Voyage query embeds, Pinecone queries,
+    # Groq): a deadline per call (time to first token when streaming), a
+    # duplicate request once a call outlasts the HEDGE_QUANTILE of recent
+    # latencies (at most HEDGE_MAX_RATIO of calls), and a circuit breaker that
+    # fails fast for BREAKER_RESET_SECONDS after BREAKER_FAILURE_THRESHOLD
+    # consecutive failures
+    RESILIENCE_ENABLED: bool = True
+    EMBED_QUERY_TIMEOUT_SECONDS: float = 5.0
+    VECTOR_QUERY_TIMEOUT_SECONDS: float = 5.0
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    HEDGE_ENABLED: bool = True
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_MIN_DELAY_SECONDS: float = 0.02
+    HEDGE_MAX_RATIO: float = 0.1
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_SECONDS: float = 30.0
+
+    # Pinecone upserts (requests are capped at 2 MB / 1000 vectors)
+    UPSERT_CONCURRENCY: int = 8
+    UPSERT_MAX_REQUEST_BYTES: int = 1_800_000
+    UPSERT_MAX_BATCH_VECTORS: int = 1000
+    UPSERT_MAX_RETRIES: int = 5
+
+    # Scanned-PDF OCR (Google Vision)
+    OCR_DPI: int = 200
+    OCR_CONCURRENCY: int = 4
+    OCR_BATCH_SIZE: int = 4
+    OCR_MAX_PAGES_IN_MEMORY: int = 16
+
+    # Per-page hybrid extraction: pages below this many characters that are
+    # mostly image are OCR'd
+    EXTRACT_MIN_TEXT_CHARS: int = 40
+    EXTRACT_MIN_IMAGE_COVERAGE: float = 0.3
+
+    # Content-addressed page cache for extraction/OCR results
+    EXTRACTION_CACHE_DIR: str = "ocr_cache"
+    EXTRACTION_CACHE_MAX_MB: int = 512
 
     model_config = SettingsConfigDict(
         env_file=".env",
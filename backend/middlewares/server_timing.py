@@ -0,0 +1,22 @@
+import time
+from fastapi import Request
+from backend.modules.metrics import HTTP_REQUEST_SECONDS, server_timing_header, start_request_timings
+
+
+async def server_timing_middleware(request: Request, call_next):
+    """
+    Time every request and report the stages it went through in a
+    `Server-Timing` header. Streaming responses only carry the stages that
+    finished before the first byte; the LLM stages still reach `/metrics`.
+    """
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), str(response.status_code)
+    ).observe(elapsed)
+    response.headers["Server-Timing"] = server_timing_header({**timings, "app": elapsed})
+    return response
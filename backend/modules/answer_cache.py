@@ -0,0 +1,180 @@
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_answer_cache = None
+
+
+def _source_key(source) -> str:
+    return Path(str(source)).name
+
+
+class SemanticAnswerCache:
+    """
+    Full answers + sources keyed by query embedding. A lookup returns the cached
+    answer of the most similar stored question when its cosine similarity is at
+    least `threshold`. Entries remember which documents produced them so that
+    re-ingesting a document drops every answer built from it.
+
+    An answer is generated after its documents were retrieved, so a document
+    may be re-ingested in between. Callers take `generation()` before
+    retrieving and pass it to `store`, which discards the answer if any of its
+    sources was invalidated since.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._vectors: Optional[np.ndarray] = None   # (max_entries, dim), unit rows
+        self._entries: list[Optional[dict]] = [None] * max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._invalidated_at: dict[str, int] = {}  # source key -> generation of its last invalidation
+        self._cleared_at = 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _live_mask(self, now: float) -> np.ndarray:
+        return np.array([
+            e is not None and (self.ttl_seconds <= 0 or now - e["created"] <= self.ttl_seconds)
+            for e in self._entries
+        ])
+
+    def lookup(self, vector) -> Optional[dict]:
+        """Return `{"response", "sources", "similarity"}` for a near-duplicate question, else None."""
+        with self._lock:
+            if self._vectors is None:
+                self.misses += 1
+                return None
+
+            query = self._unit(vector)
+            scores = self._vectors @ query
+            scores[~self._live_mask(time.time())] = -np.inf
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[best]
+            entry["last_used"] = time.time()
+            self.hits += 1
+            return {
+                "response": entry["response"],
+                "sources": entry["sources"],
+                "similarity": float(scores[best]),
+            }
+
+    def generation(self) -> int:
+        """Token to pass to `store` for an answer about to be built from freshly retrieved documents."""
+        with self._lock:
+            return self._generation
+
+    def _stale(self, documents: set[str], generation: int) -> bool:
+        if self._cleared_at > generation:
+            return True
+        if not documents:
+            # answers without sources are dropped by any invalidation
+            return self._generation > generation
+        return any(self._invalidated_at.get(key, 0) > generation for key in documents)
+
+    def store(self, vector, response: str, sources: list[dict], generation: Optional[int] = None):
+        if not response:
+            return
+        query = self._unit(vector)
+        documents = {_source_key(s.get("source", "")) for s in sources}
+        now = time.time()
+        with self._lock:
+            if generation is not None and self._stale(documents, generation):
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+
+            live = self._live_mask(now)
+            if not live.all():
+                slot = int(np.argmin(live))
+            else:
+                # evict the least recently used answer
+                slot = min(range(self.max_entries), key=lambda i: self._entries[i]["last_used"])
+
+            self._vectors[slot] = query
+            self._entries[slot] = {
+                "response": response,
+                "sources": sources,
+                "documents": documents,
+                "created": now,
+                "last_used": now,
+            }
+
+    def invalidate_source(self, source) -> int:
+        """
+        Drop answers built from `source`, plus answers that had no sources at all
+        (they may be answerable now that new content was ingested).
+        """
+        key = _source_key(source)
+        dropped = 0
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at[key] = self._generation
+            for i, entry in enumerate(self._entries):
+                if entry is not None and (key in entry["documents"] or not entry["documents"]):
+                    self._entries[i] = None
+                    dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared_at = self._generation
+            self._entries = [None] * self.max_entries
+
+    def configure(self, threshold: float, max_entries: int, ttl_seconds: float):
+        """Apply new settings; drops every entry, since the size of the vector matrix may change."""
+        with self._lock:
+            self.threshold = threshold
+            self.max_entries = max_entries
+            self.ttl_seconds = ttl_seconds
+            self._vectors = None
+            self._entries = [None] * max_entries
+            self._generation += 1
+            self._cleared_at = self._generation
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": sum(e is not None for e in self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+            }
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache shared by the ask routes and the ingestion path."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            threshold=config.ANSWER_CACHE_THRESHOLD,
+            max_entries=config.ANSWER_CACHE_SIZE,
+            ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+        )
+    return _answer_cache
@@ -0,0 +1,170 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_bm25_index = None
+
+# Model numbers, parameter names and values ("HX-Stomp", "CC#64", "v2.1")
+# stay whole; their parts are indexed too so "stomp" or "64" still match.
+_TOKEN = re.compile(r"[a-z0-9]+(?:[#._\-/+][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Incremental on-disk BM25 (Okapi) index over chunk text.
+
+    Terms and chunks are interned to integer ids, so each posting is three
+    integers in a `WITHOUT ROWID` table; document frequencies and corpus
+    statistics are kept up to date on every add/remove, so chunks can be
+    added or removed without a rebuild. Chunks are identified by the same
+    vector ids the vector index uses.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "  doc_id INTEGER PRIMARY KEY, vector_id TEXT NOT NULL UNIQUE,"
+                "  source TEXT NOT NULL, length INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);"
+                "CREATE TABLE IF NOT EXISTS terms ("
+                "  term_id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, df INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "  term_id INTEGER NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL,"
+                "  PRIMARY KEY (term_id, doc_id)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+            )
+            self._db.commit()
+            self._count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+            self._total_length = total
+
+    def __len__(self) -> int:
+        return self._count
+
+    def missing(self, vector_ids) -> set[str]:
+        """Which of `vector_ids` are not indexed yet."""
+        vector_ids = list(vector_ids)
+        found = set()
+        with self._lock:
+            for start in range(0, len(vector_ids), 500):
+                batch = vector_ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT vector_id FROM chunks WHERE vector_id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return set(vector_ids) - found
+
+    def _remove_locked(self, vector_ids):
+        removed = 0
+        for vector_id in vector_ids:
+            row = self._db.execute("SELECT doc_id, length FROM chunks WHERE vector_id = ?", (vector_id,)).fetchone()
+            if row is None:
+                continue
+            doc_id, length = row
+            self._db.execute(
+                "UPDATE terms SET df = df - 1 WHERE term_id IN (SELECT term_id FROM postings WHERE doc_id = ?)",
+                (doc_id,),
+            )
+            self._db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            self._db.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._count -= 1
+            self._total_length -= length
+            removed += 1
+        if removed:
+            self._db.execute("DELETE FROM terms WHERE df <= 0")
+
+    def add(self, source: str, chunks: list[tuple[str, str]]):
+        """Index `(vector_id, text)` pairs; re-adding an id replaces its postings."""
+        with self._lock:
+            self._remove_locked([vector_id for vector_id, _ in chunks])
+            for vector_id, text in chunks:
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                doc_id = self._db.execute(
+                    "INSERT INTO chunks (vector_id, source, length) VALUES (?, ?, ?)",
+                    (vector_id, str(source), length),
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(term,) for term in counts],
+                )
+                self._db.executemany(
+                    "INSERT INTO postings (term_id, doc_id, tf) "
+                    "SELECT term_id, ?, ? FROM terms WHERE term = ?",
+                    [(doc_id, tf, term) for term, tf in counts.items()],
+                )
+                self._count += 1
+                self._total_length += length
+            self._db.commit()
+
+    def remove(self, source: str, vector_ids):
+        with self._lock:
+            self._remove_locked(list(vector_ids))
+            self._db.commit()
+
+    def search(self, query: str, top_k: int = 10) -> list[tuple[str, float]]:
+        """Return up to `top_k` `(vector_id, score)` pairs, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            if not self._count:
+                return []
+            n, avgdl = self._count, self._total_length / self._count
+            rows = self._db.execute(
+                "SELECT t.df, p.doc_id, p.tf, c.length FROM terms t "
+                "JOIN postings p ON p.term_id = t.term_id "
+                "JOIN chunks c ON c.doc_id = p.doc_id "
+                f"WHERE t.term IN ({','.join('?' * len(terms))})",
+                terms,
+            ).fetchall()
+
+            scores: dict[int, float] = {}
+            for df, doc_id, tf, length in rows:
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            if not best:
+                return []
+            ids = dict(self._db.execute(
+                f"SELECT doc_id, vector_id FROM chunks WHERE doc_id IN ({','.join('?' * len(best))})",
+                [doc_id for doc_id, _ in best],
+            ).fetchall())
+        return [(ids[doc_id], score) for doc_id, score in best]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_bm25_index() -> BM25Index:
+    global _bm25_index
+    if _bm25_index is None:
+        _bm25_index = BM25Index(config.BM25_INDEX_PATH)
+    return _bm25_index
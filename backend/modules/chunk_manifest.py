@@ -0,0 +1,148 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_chunk_manifest = None
+
+
+def chunk_hash(text: str, model: str, section: str = "") -> str:
+    """
+    Content hash of a chunk; changes whenever its text, section path or
+    embedding model does. The page is left out, so inserting or removing a
+    page of a manual does not change the chunks after it (their page is
+    metadata, updated without re-embedding).
+    """
+    key = f"{model}\0{text}" + (f"\0{section}" if section else "")
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class VectorIdAssigner:
+    """
+    Stable vector ids derived from chunk content. Identical chunks within one
+    document get an occurrence suffix so every id stays unique; the counts
+    carry over between calls, so a document can be assigned ids page by page.
+    """
+
+    def __init__(self, source: str):
+        self.stem = Path(source).stem
+        self._seen: dict[str, int] = {}
+
+    def __call__(self, hashes: list[str]) -> list[str]:
+        ids = []
+        for h in hashes:
+            n = self._seen.get(h, 0)
+            self._seen[h] = n + 1
+            ids.append(f"{self.stem}#{h[:16]}" + (f"-{n}" if n else ""))
+        return ids
+
+
+def assign_vector_ids(source: str, hashes: list[str]) -> list[str]:
+    return VectorIdAssigner(source)(hashes)
+
+
+class ChunkManifest:
+    """
+    Which vector ids (with their chunk hash and page) are currently in the
+    index for each source document, and the content hash of the file each
+    source was last fully ingested from.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "source TEXT NOT NULL, vector_id TEXT NOT NULL, chunk_hash TEXT NOT NULL, page INTEGER, "
+                "PRIMARY KEY (source, vector_id))"
+            )
+            columns = {r[1] for r in self._db.execute("PRAGMA table_info(chunks)")}
+            if "page" not in columns:  # manifests created while the page was part of the hash
+                self._db.execute("ALTER TABLE chunks ADD COLUMN page INTEGER")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "source TEXT PRIMARY KEY, content_hash TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS documents_hash ON documents (content_hash)")
+            self._db.commit()
+
+    def has_source(self, source: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM chunks WHERE source = ? LIMIT 1", (str(source),)).fetchone()
+        return row is not None
+
+    def vector_ids(self, source: str) -> set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT vector_id FROM chunks WHERE source = ?", (str(source),)).fetchall()
+        return {r[0] for r in rows}
+
+    def pages(self, source: str) -> dict[str, Optional[int]]:
+        """Page of each vector id indexed for `source`."""
+        with self._lock:
+            rows = self._db.execute("SELECT vector_id, page FROM chunks WHERE source = ?", (str(source),)).fetchall()
+        return dict(rows)
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT source FROM chunks ORDER BY source").fetchall()
+        return [r[0] for r in rows]
+
+    def entries(self, source: str) -> list[tuple[str, str]]:
+        """`(vector_id, chunk_hash)` pairs indexed for `source`."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT vector_id, chunk_hash FROM chunks WHERE source = ? ORDER BY vector_id", (str(source),)
+            ).fetchall()
+
+    def add(self, source: str, entries: list[tuple[str, str, Optional[int]]]):
+        """Record `(vector_id, chunk_hash, page)` triples that are now in the index."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (source, vector_id, chunk_hash, page) VALUES (?, ?, ?, ?)",
+                [(str(source), vid, h, page) for vid, h, page in entries],
+            )
+            self._db.commit()
+
+    def remove(self, source: str, vector_ids):
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM chunks WHERE source = ? AND vector_id = ?",
+                [(str(source), vid) for vid in vector_ids],
+            )
+            self._db.commit()
+
+
+    def set_content_hash(self, source: str, content_hash: Optional[str]):
+        """Record that `source` is fully indexed from the file with this SHA-256 (None: not known to be)."""
+        with self._lock:
+            if content_hash is None:
+                self._db.execute("DELETE FROM documents WHERE source = ?", (str(source),))
+            else:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO documents (source, content_hash) VALUES (?, ?)",
+                    (str(source), content_hash),
+                )
+            self._db.commit()
+
+    def source_for_hash(self, content_hash: str) -> Optional[str]:
+        """A source currently indexed from a file with this SHA-256, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT source FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+
+def get_chunk_manifest() -> ChunkManifest:
+    global _chunk_manifest
+    if _chunk_manifest is None:
+        _chunk_manifest = ChunkManifest(config.CHUNK_MANIFEST_PATH)
+    return _chunk_manifest
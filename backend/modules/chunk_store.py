@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_chunk_store = None
+
+# SQLite's default limit on host parameters per statement is 999
+_SQL_BATCH = 900
+
+
+class ChunkStore:
+    """
+    Chunk text and page by vector id, so the vector index only carries ids
+    and the fields queries filter on (source, page, section). Retrievers
+    read the text of their top-k ids here in one primary-key lookup instead
+    of shipping it in every upsert and query response.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "  vector_id TEXT PRIMARY KEY, source TEXT NOT NULL, page INTEGER, text TEXT NOT NULL"
+                ") WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);"
+            )
+            self._db.commit()
+
+    def _select(self, columns: str, vector_ids: list[str]) -> list[tuple]:
+        rows = []
+        for start in range(0, len(vector_ids), _SQL_BATCH):
+            batch = vector_ids[start:start + _SQL_BATCH]
+            rows.extend(self._db.execute(
+                f"SELECT {columns} FROM chunks WHERE vector_id IN ({','.join('?' * len(batch))})", batch
+            ))
+        return rows
+
+    def texts(self, vector_ids) -> dict[str, str]:
+        """Text of each of `vector_ids` the store has."""
+        vector_ids = list(dict.fromkeys(vector_ids))
+        if not vector_ids:
+            return {}
+        with self._lock:
+            return dict(self._select("vector_id, text", vector_ids))
+
+    def missing(self, vector_ids) -> set[str]:
+        """Which of `vector_ids` have no stored text yet."""
+        vector_ids = list(dict.fromkeys(vector_ids))
+        with self._lock:
+            found = {r[0] for r in self._select("vector_id", vector_ids)}
+        return set(vector_ids) - found
+
+    def add(self, source: str, chunks: list[tuple[str, str, Optional[int]]]):
+        """Store `(vector_id, text, page)` triples; re-adding an id replaces it."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (vector_id, source, page, text) VALUES (?, ?, ?, ?)",
+                [(vid, str(source), page, text) for vid, text, page in chunks],
+            )
+            self._db.commit()
+
+    def remove(self, source: str, vector_ids):
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM chunks WHERE source = ? AND vector_id = ?",
+                [(str(source), vid) for vid in vector_ids],
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_chunk_store() -> Optional[ChunkStore]:
+    """The store at `CHUNK_STORE_PATH`, or None when chunk text stays in the index metadata (empty path)."""
+    global _chunk_store
+    if _chunk_store is None and config.CHUNK_STORE_PATH:
+        _chunk_store = ChunkStore(config.CHUNK_STORE_PATH)
+    return _chunk_store
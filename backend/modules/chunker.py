@@ -0,0 +1,266 @@
+import re
+from typing import Callable, Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
+from backend.modules.embedding_engine import estimate_tokens
+
+HEADING, TABLE, TEXT = "heading", "table", "text"
+
+# One pattern classifies every (stripped) line of a paragraph; the first
+# alternative that matches wins, so a single regex pass replaces per-line tests.
+# Each alternative fails on its first character or two for lines of other kinds.
+BODY_LINE = r"""
+      (?P<columns>[^\n]*?\S(?:[ ]{2,}|\t|[ ]*\|[ ]*)\S[^\n]*)     # "Level   0-100   50", "Mix | 0 to 127"
+    | (?P<key_value>[^:.\n]{1,40}:[ \t]+\S[^\n]{0,60})               # "Rate: 0.1 to 10 Hz"
+    | (?P<text>[^\n]+)
+"""
+LINE = re.compile(r"""
+    ^(?:
+        # page furniture: "12", "- 12 -", "Page 3 of 40", "12 / 40", rules of dashes or dots
+        (?P<furniture>(?i:-?[ \t]*\d+[ \t]*-?|page[ \t]+\d+(?:[ \t]+of[ \t]+\d+)?|\d+[ \t]*/[ \t]*\d+)|[\W_]{3,})
+        # headings (length and trailing punctuation are checked in `_heading_level`)
+        | (?P<numbered>\d+(?:\.\d+)*)\.?[ \t]+[A-Z][^.\n]*                          # "3.2 Delay settings"
+        | (?P<named>(?i:chapter|part|appendix|section))[ \t]+(?i:\d[\d.]*|[IVXLC]+|[A-Z])\b[^\n]*  # "Section 12: Gain"
+        | (?=[A-Z][A-Z0-9 &/()'\-]{2,}$)(?![^\n]*?\S(?:[ ]{2,}|\t|[ ]*\|[ ]*)\S)(?P<caps>[^\n]+)  # "DELAY EFFECTS"
+        | """ + BODY_LINE + r"""
+    )$
+""", re.MULTILINE | re.VERBOSE)
+BODY = re.compile(BODY_LINE, re.VERBOSE)
+LINE_KINDS = {"columns": TABLE, "key_value": TABLE, "text": TEXT}
+NAMED_LEVELS = {"chapter": 1, "part": 1, "appendix": 1, "section": 2}
+MAX_HEADING_CHARS = 80
+
+COLUMNS = re.compile(r"\S(?:\s{2,}|\t|\s*\|\s*)\S")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+BLANK_LINES = re.compile(r"\n[ \t]*\n")
+# Can any line of a paragraph be more than text? Both anchor on the literal
+# newline so the regex engine skips straight from line to line
+MAYBE_STRUCTURE = re.compile(
+    r"\n(?:[\d\W_]|[A-Z][A-Z0-9 &/()'\-]{2,}(?:\n|$)|(?i:chapter|part|appendix|section|page)\s)"
+)
+MAYBE_KEY_VALUE = re.compile(r"\n[^:.\n]{1,40}:\s")
+
+
+def _plain_text(paragraph: str) -> bool:
+    """True if no line of `paragraph` (lines stripped) can be a heading, table row or furniture."""
+    if "  " in paragraph or "\t" in paragraph or "|" in paragraph:
+        return False
+    paragraph = "\n" + paragraph
+    return not MAYBE_STRUCTURE.search(paragraph) and (":" not in paragraph or not MAYBE_KEY_VALUE.search(paragraph))
+
+
+def _is_furniture(line: str) -> bool:
+    match = LINE.match(line)
+    return match is not None and match.lastgroup == "furniture"
+
+
+def _is_table(lines: list[str]) -> bool:
+    """Two or more (stripped) lines that all have columns: a table, no need to classify each row."""
+    return len(lines) > 1 and all("  " in line or "\t" in line or "|" in line for line in lines)
+
+
+def _heading_level(match: re.Match) -> Optional[int]:
+    """Outline level of a line classified by `LINE`, or None if it is not a heading."""
+    kind, line = match.lastgroup, match.group()
+    if len(line) > MAX_HEADING_CHARS or line.endswith((".", ",", ";")):
+        return None
+    if kind == "numbered":
+        return match.group("numbered").count(".") + 1
+    if kind == "named":
+        return NAMED_LEVELS[match.group("named").lower()]
+    return 1 if kind == "caps" else None
+
+
+class ManualChunker:
+    """
+    Splits extracted manual pages into chunks sized in embedding tokens.
+
+    Each page is parsed into headings, tables (runs of column or `key: value`
+    rows) and paragraphs, and blocks are packed into chunks of at most
+    `max_tokens`. A heading always starts a new chunk, a table is only split
+    between rows (repeating its header row), a long paragraph between
+    sentences, and a chunk never spans two pages. Page furniture (page
+    numbers, rules) is dropped. A last chunk smaller than `min_tokens` is
+    folded into the previous one of the same section when it fits. There is
+    no overlap: chunks end on structure boundaries, not mid-sentence.
+
+    Chunks carry the page's metadata plus `section`, the heading path
+    ("3 Effects > 3.2 Delay"). The path carries across pages, so one
+    instance must see one document's pages in order: a page numbered lower
+    than the one before it raises ValueError. State resets when the `source`
+    changes.
+    """
+
+    def __init__(self, max_tokens: int = 192, min_tokens: int = 32,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.count_tokens = count_tokens
+        self._source = None
+        self._path: list[tuple[int, str]] = []
+        self._edges: set[str] = set()  # first and last lines of the pages seen so far
+        self._page = None
+
+    # ------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------
+    def _blocks(self, text: str) -> Iterator[tuple[str, object]]:
+        """(kind, lines) blocks of one page in order; a heading's payload is (level, line)."""
+        for paragraph in BLANK_LINES.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if "\n " in paragraph or " \n" in paragraph:
+                paragraph = "\n".join(line.strip() for line in paragraph.splitlines())
+            if _plain_text(paragraph):
+                yield TEXT, [paragraph]
+                continue
+            lines = paragraph.split("\n")
+            if _is_table(lines):
+                yield TABLE, lines
+                continue
+            kind, lines = None, []
+            for match in LINE.finditer(paragraph):
+                line = match.group()
+                if match.lastgroup == "furniture":
+                    continue
+                line_kind = LINE_KINDS.get(match.lastgroup)
+                if line_kind is None:
+                    level = _heading_level(match)
+                    if level is not None:
+                        if lines:
+                            yield kind, lines
+                        yield HEADING, (level, line)
+                        kind, lines = None, []
+                        continue
+                    # too long or punctuated like a sentence: a body line after all
+                    line_kind = LINE_KINDS[BODY.fullmatch(line).lastgroup]
+                if lines and line_kind != kind:
+                    yield kind, lines
+                    lines = []
+                kind = line_kind
+                lines.append(line)
+            if lines:
+                yield kind, lines
+
+    def _pieces(self, kind: str, lines: list[str]) -> Iterator[str]:
+        """An oversized block as texts of at most `max_tokens`, split at row or sentence boundaries."""
+        if kind == TABLE:
+            header = lines[0] if COLUMNS.search(lines[0]) and not any(c.isdigit() for c in lines[0]) else None
+            units = lines[1:] if header else lines
+        else:
+            units = [s for s in SENTENCE_END.split(" ".join(lines)) if s]
+            header = None
+        piece, joiner = [header] if header else [], "\n" if kind == TABLE else " "
+        for unit in units:
+            for part in self._fit_unit(unit):
+                if piece and piece != [header] and self.count_tokens(joiner.join(piece + [part])) > self.max_tokens:
+                    yield joiner.join(piece)
+                    piece = [header] if header else []
+                piece.append(part)
+        if piece and piece != [header]:
+            yield joiner.join(piece)
+
+    def _fit_unit(self, unit: str) -> Iterator[str]:
+        """A single row or sentence, hard-split between words if it alone is over `max_tokens`."""
+        if self.count_tokens(unit) <= self.max_tokens:
+            yield unit
+            return
+        words, part = unit.split(), []
+        for word in words:
+            if part and self.count_tokens(" ".join(part + [word])) > self.max_tokens:
+                yield " ".join(part)
+                part = []
+            part.append(word)
+        if part:
+            yield " ".join(part)
+
+    # ------------------------------------------------------
+    # Chunking
+    # ------------------------------------------------------
+    def _enter_heading(self, level: int, line: str):
+        while self._path and self._path[-1][0] >= level:
+            self._path.pop()
+        self._path.append((level, line))
+
+    def _section(self) -> str:
+        return " > ".join(title for _, title in self._path)
+
+    def _strip_running_lines(self, text: str) -> str:
+        """
+        Drop the first and last line of a page when it is page furniture or was
+        also the first or last line of an earlier page (running headers and footers).
+        """
+        first, _, rest = text.strip().partition("\n")
+        rest, _, last = rest.rpartition("\n")
+        first, last = first.strip(), last.strip()
+        drop_first = first in self._edges or _is_furniture(first)
+        drop_last = last in self._edges or _is_furniture(last)
+        self._edges.update((first, last))
+        return f"{'' if drop_first else first}\n{rest}\n{'' if drop_last else last}"
+
+    def _page_chunks(self, page: Document) -> List[Document]:
+        if page.metadata.get("source") != self._source:
+            self._source, self._path, self._edges = page.metadata.get("source"), [], set()
+            self._page = None
+        number = page.metadata.get("page")
+        if number is not None:
+            if self._page is not None and number < self._page:
+                raise ValueError(
+                    f"Pages of {self._source} out of order: page {number} after page {self._page}; "
+                    "sections would carry over from the wrong page"
+                )
+            self._page = number
+
+        chunks: list[tuple[str, list[str], int, bool]] = []  # (section, texts, tokens, has_body)
+        texts, tokens, has_body, section = [], 0, False, self._section()
+
+        def flush():
+            if texts:
+                chunks.append((section, list(texts), tokens, has_body))
+
+        count_tokens, max_tokens = self.count_tokens, self.max_tokens
+        for kind, lines in self._blocks(self._strip_running_lines(page.page_content)):
+            if kind == HEADING:
+                if has_body:
+                    flush()
+                    texts, tokens, has_body = [], 0, False
+                level, line = lines
+                self._enter_heading(level, line)
+                section = self._section()
+                texts.append(line)
+                tokens += count_tokens(line) + 1
+                continue
+            text = lines[0] if len(lines) == 1 else "\n".join(lines)
+            pieces = (text,) if count_tokens(text) <= max_tokens else self._pieces(kind, lines)
+            for piece in pieces:
+                piece_tokens = count_tokens(piece) + 1
+                if has_body and tokens + piece_tokens > max_tokens:
+                    flush()
+                    texts, tokens = [], 0
+                texts.append(piece)
+                tokens += piece_tokens
+                has_body = True
+        flush()
+
+        # fold a small tail of the same section (or headings whose body is on the next page)
+        # into the chunk before it
+        if len(chunks) > 1:
+            tail, previous = chunks[-1], chunks[-2]
+            small_tail = tail[0] == previous[0] and tail[2] < self.min_tokens
+            if (small_tail or not tail[3]) and tail[2] + previous[2] <= self.max_tokens:
+                chunks[-2:] = [(previous[0], previous[1] + tail[1], previous[2] + tail[2], True)]
+
+        return [
+            Document(page_content="\n".join(texts),
+                     metadata={**page.metadata, "section": section} if section else dict(page.metadata))
+            for section, texts, _, _ in chunks
+        ]
+
+    def iter_chunks(self, pages: Iterable[Document]) -> Iterator[Document]:
+        """Lazily chunk a stream of pages (one document's, in page order)."""
+        for page in pages:
+            yield from self._page_chunks(page)
+
+    def split_documents(self, pages: Iterable[Document]) -> List[Document]:
+        """Same interface as LangChain's text splitters."""
+        return list(self.iter_chunks(pages))
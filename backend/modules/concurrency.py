@@ -0,0 +1,55 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_sync_executor = None
+_upstream_executor = None
+
+
+def get_sync_executor() -> ThreadPoolExecutor:
+    """Bounded pool for sync-only components called from async code."""
+    global _sync_executor
+    if _sync_executor is None:
+        _sync_executor = ThreadPoolExecutor(
+            max_workers=config.SYNC_POOL_SIZE,
+            thread_name_prefix="sync-offload"
+        )
+    return _sync_executor
+
+
+def get_upstream_executor() -> ThreadPoolExecutor:
+    """
+    Pool the sync path of `backend.modules.resilience` runs upstream calls on,
+    so a caller can give up on a stalled call. Separate from the sync pool
+    because those calls are often made from a sync-pool thread already.
+    """
+    global _upstream_executor
+    if _upstream_executor is None:
+        _upstream_executor = ThreadPoolExecutor(
+            max_workers=config.SYNC_POOL_SIZE,
+            thread_name_prefix="upstream"
+        )
+    return _upstream_executor
+
+
+async def run_sync(fn, *args, **kwargs):
+    """Run a blocking call on the bounded pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    # carry context variables (e.g. the request's stage timings) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_sync_executor(), functools.partial(context.run, fn, *args, **kwargs))
+
+
+def shutdown_sync_executor():
+    global _sync_executor, _upstream_executor
+    if _sync_executor is not None:
+        _sync_executor.shutdown(wait=False, cancel_futures=True)
+        _sync_executor = None
+    if _upstream_executor is not None:
+        _upstream_executor.shutdown(wait=False, cancel_futures=True)
+        _upstream_executor = None
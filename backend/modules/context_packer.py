@@ -0,0 +1,98 @@
+import re
+from typing import Callable, List, Optional, Sequence
+from langchain_core.documents import Document
+from backend.modules.embedding_engine import estimate_tokens
+
+# Page furniture: "12", "- 12 -", "Page 12", "12 / 40", "Page 3 of 40", rules of dashes or dots
+PAGE_FURNITURE = re.compile(
+    r"^\s*(?:-?\s*\d+\s*-?|page\s+\d+(?:\s+of\s+\d+)?|\d+\s*/\s*\d+|[\W_]{3,})\s*$", re.IGNORECASE
+)
+# Lines shorter than this are never dropped as repeats (table rows like "Mix: 0 to 127" recur legitimately)
+MIN_REPEAT_CHARS = 40
+
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split()).lower()
+
+
+class ContextPacker:
+    """
+    Chooses and trims the retrieved chunks that go into the prompt.
+
+    Chunks are taken best-first until `budget_tokens` is used up, so k adapts
+    to the question: chunks scoring below `min_relevance` times the best score
+    are dropped (only for similarity scores; fused rank scores of hybrid
+    search say nothing about how relevant a BM25-only hit is), and at most
+    `max_chunks` are kept. Page furniture (page
+    numbers, rules) and long lines already present earlier in the context
+    (repeated notices, headers) are trimmed first. A chunk that no longer
+    fits is cut at a line or sentence boundary when at least
+    `min_fragment_tokens` remain.
+    """
+
+    def __init__(self, budget_tokens: int = 350, max_chunks: int = 6, min_relevance: float = 0.75,
+                 min_fragment_tokens: int = 48, count_tokens: Callable[[str], int] = estimate_tokens):
+        self.budget_tokens = budget_tokens
+        self.max_chunks = max_chunks
+        self.min_relevance = min_relevance
+        self.min_fragment_tokens = min_fragment_tokens
+        self.count_tokens = count_tokens
+
+    def trim(self, text: str, seen: set[str]) -> str:
+        """Drop page furniture and lines already in `seen` (which is updated), collapse blank runs."""
+        kept = []
+        for line in text.splitlines():
+            if PAGE_FURNITURE.match(line):
+                continue
+            key = _normalize(line)
+            if len(key) >= MIN_REPEAT_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            if line.strip() or (kept and kept[-1].strip()):
+                kept.append(line.rstrip())
+        return "\n".join(kept).strip()
+
+    def _cut(self, text: str, budget: int) -> str:
+        """Longest prefix ending at a line or sentence boundary that fits in `budget` tokens."""
+        pieces = re.split(r"(?<=[.!?])\s+|\n", text)
+        out = ""
+        for piece in pieces:
+            candidate = f"{out}\n{piece}" if out else piece
+            if self.count_tokens(candidate) > budget:
+                break
+            out = candidate
+        return out
+
+    def pack(self, docs: Sequence[Document], scores: Optional[Sequence[float]] = None,
+             relative_floor: bool = True) -> List[Document]:
+        """
+        Best-first selection of `docs` (ranked, with optional relevance `scores`)
+        within the budget; `relative_floor=False` orders by `scores` without
+        dropping low scorers.
+        """
+        if not docs:
+            return []
+        order = list(range(len(docs)))
+        if scores is not None and len(scores):
+            order.sort(key=lambda i: -float(scores[i]))
+            if relative_floor:
+                floor = float(scores[order[0]]) * self.min_relevance
+                order = [i for i in order if float(scores[i]) >= floor]
+
+        packed, seen, remaining = [], set(), self.budget_tokens
+        for i in order:
+            if len(packed) >= self.max_chunks or remaining < self.min_fragment_tokens:
+                break
+            text = self.trim(docs[i].page_content, seen)
+            if not text:
+                continue
+            tokens = self.count_tokens(text) + 2  # separator between documents
+            if tokens > remaining:
+                text = self._cut(text, remaining - 2)
+                if not text or (packed and self.count_tokens(text) < self.min_fragment_tokens):
+                    continue
+                tokens = self.count_tokens(text) + 2
+            remaining -= tokens
+            packed.append(Document(id=docs[i].id, page_content=text, metadata=docs[i].metadata))
+        return packed
@@ -0,0 +1,160 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Optional
+import numpy as np
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_embedding_archive = None
+
+# SQLite's default limit on host parameters per statement is 999
+_SQL_BATCH = 900
+
+
+class EmbeddingArchive:
+    """
+    Every document embedding ingestion paid for, kept locally so an index can
+    be rebuilt (new index name or metric, lost data) without re-embedding.
+
+    Vectors are float16 rows of one memory-mapped file per model: half the
+    size of float32, and the rounding (~1e-3 relative) is far below anything
+    that changes a cosine ranking. A SQLite sidecar maps `(chunk hash, model)`
+    to its row and to the chunk's index metadata minus `source`; chunk hashes
+    do not depend on the document, so identical chunks of two documents share
+    a row and the manifest says which vector ids use it. Rows are append-only.
+    """
+
+    def __init__(self, path: str, initial_capacity: int = 1024):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._matrices: dict[str, np.memmap] = {}
+        self._db = sqlite3.connect(os.path.join(path, "archive.sqlite"), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS models ("
+            "  model TEXT PRIMARY KEY, dimension INTEGER NOT NULL, rows INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "  chunk_hash TEXT NOT NULL, model TEXT NOT NULL, row INTEGER NOT NULL, metadata TEXT NOT NULL,"
+            "  PRIMARY KEY (chunk_hash, model)) WITHOUT ROWID;"
+        )
+        self._db.commit()
+
+    def _matrix_path(self, model: str) -> str:
+        return os.path.join(self.path, re.sub(r"[^A-Za-z0-9._-]", "_", model) + ".f16")
+
+    def _matrix(self, model: str, dimension: int, rows: int) -> np.memmap:
+        """The model's vector file, grown (doubling) to hold at least `rows` rows."""
+        matrix = self._matrices.get(model)
+        if matrix is not None and matrix.shape[0] >= rows:
+            return matrix
+        path = self._matrix_path(model)
+        on_disk = os.path.getsize(path) // (2 * dimension) if os.path.exists(path) else 0
+        capacity = max(self.initial_capacity, on_disk, rows,
+                       2 * matrix.shape[0] if matrix is not None else 0)
+        if matrix is not None:
+            matrix.flush()
+        with open(path, "ab") as f:
+            if f.tell() < capacity * dimension * 2:
+                f.truncate(capacity * dimension * 2)
+        matrix = np.memmap(path, dtype=np.float16, mode="r+", shape=(capacity, dimension))
+        self._matrices[model] = matrix
+        return matrix
+
+    def _rows(self, model: str, hashes: list[str]) -> dict[str, tuple[int, str]]:
+        found = {}
+        for start in range(0, len(hashes), _SQL_BATCH):
+            batch = hashes[start:start + _SQL_BATCH]
+            found.update(
+                (h, (row, metadata)) for h, row, metadata in self._db.execute(
+                    f"SELECT chunk_hash, row, metadata FROM embeddings WHERE model = ? "
+                    f"AND chunk_hash IN ({','.join('?' * len(batch))})", (model, *batch)
+                )
+            )
+        return found
+
+    def add(self, model: str, items: list[tuple[str, list[float], dict]]) -> int:
+        """Archive `(chunk_hash, values, metadata)` embeddings of `model`; returns how many were new."""
+        with self._lock:
+            known = self._rows(model, [h for h, _, _ in items])
+            new, seen = [], set()
+            for h, values, metadata in items:
+                if h not in known and h not in seen:
+                    seen.add(h)
+                    new.append((h, values, {k: v for k, v in metadata.items() if k != "source"}))
+            if not new:
+                return 0
+
+            vectors = np.asarray([values for _, values, _ in new], dtype=np.float16)
+            row = self._db.execute("SELECT dimension, rows FROM models WHERE model = ?", (model,)).fetchone()
+            dimension, start = row if row else (vectors.shape[1], 0)
+            if vectors.shape[1] != dimension:
+                raise ValueError(f"{model} embeddings have dimension {vectors.shape[1]}, archive has {dimension}")
+            matrix = self._matrix(model, dimension, start + len(new))
+            matrix[start:start + len(new)] = vectors
+            # vectors reach the file before the sidecar refers to them
+            matrix.flush()
+            self._db.executemany(
+                "INSERT INTO embeddings (chunk_hash, model, row, metadata) VALUES (?, ?, ?, ?)",
+                [(h, model, start + i, json.dumps(metadata, ensure_ascii=False))
+                 for i, (h, _, metadata) in enumerate(new)],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO models (model, dimension, rows) VALUES (?, ?, ?)",
+                (model, dimension, start + len(new)),
+            )
+            self._db.commit()
+            return len(new)
+
+    def missing(self, model: str, hashes: list[str]) -> set[str]:
+        """Those of `hashes` with no archived `model` embedding."""
+        with self._lock:
+            found = self._rows(model, list(set(hashes)))
+        return {h for h in hashes if h not in found}
+
+    def get(self, model: str, hashes: list[str]) -> tuple[list[int], np.ndarray, list[dict]]:
+        """
+        Archived embeddings of `hashes`: the positions (in `hashes`) that were
+        found, their float32 vectors as one matrix, and their metadata.
+        """
+        with self._lock:
+            found = self._rows(model, list(set(hashes)))
+            row = self._db.execute("SELECT dimension, rows FROM models WHERE model = ?", (model,)).fetchone()
+            positions = [i for i, h in enumerate(hashes) if h in found]
+            if not positions:
+                return [], np.empty((0, row[0] if row else 0), dtype=np.float32), []
+            matrix = self._matrix(model, row[0], row[1])
+            rows = np.array([found[hashes[i]][0] for i in positions])
+            # read in file order, then put the rows back in the order asked for
+            order = np.argsort(rows, kind="stable")
+            vectors = np.empty((len(rows), row[0]), dtype=np.float32)
+            vectors[order] = matrix[rows[order]]
+        return positions, vectors, [json.loads(found[hashes[i]][1]) for i in positions]
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = self._db.execute("SELECT model, dimension, rows FROM models").fetchall()
+        return {
+            model: {"dimension": dimension, "vectors": rows, "bytes": rows * dimension * 2}
+            for model, dimension, rows in models
+        }
+
+    def close(self):
+        with self._lock:
+            for matrix in self._matrices.values():
+                matrix.flush()
+            self._matrices.clear()
+            self._db.close()
+
+
+def get_embedding_archive() -> Optional[EmbeddingArchive]:
+    """The archive at `EMBEDDING_ARCHIVE_PATH`, or None when archiving is off (empty path)."""
+    global _embedding_archive
+    if _embedding_archive is None and config.EMBEDDING_ARCHIVE_PATH:
+        _embedding_archive = EmbeddingArchive(config.EMBEDDING_ARCHIVE_PATH)
+    return _embedding_archive
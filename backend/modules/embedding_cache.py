@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from backend.modules.concurrency import run_sync
+
+# The SQLite tier is pruned of expired and excess rows every this many writes
+DISK_PRUNE_EVERY = 256
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys."""
+    return " ".join(text.casefold().split())
+
+
+def make_cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+# ==========================================================
+# Cache store
+# ==========================================================
+class EmbeddingCache:
+    """
+    Bounded in-memory LRU with TTL, optionally backed by a SQLite file so
+    cached query vectors survive restarts and are shared between workers.
+    The file holds at most `max_disk_entries` rows: on open and every
+    `DISK_PRUNE_EVERY` writes, expired rows and the oldest rows over the cap
+    are deleted.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400,
+                 persist_path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, tuple[float, list[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._puts = 0
+
+        self._db = None
+        if persist_path:
+            os.makedirs(os.path.dirname(persist_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS query_embeddings_created ON query_embeddings (created);"
+            )
+            self._prune_disk()
+            self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def _remember(self, key: str, created: float, vector: list[float]):
+        self._memory[key] = (created, vector)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self):
+        """Delete expired rows, then the oldest ones beyond `max_disk_entries`."""
+        deleted = 0
+        if self.ttl_seconds > 0:
+            deleted += self._db.execute(
+                "DELETE FROM query_embeddings WHERE created < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+        deleted += self._db.execute(
+            "DELETE FROM query_embeddings WHERE key IN ("
+            "SELECT key FROM query_embeddings ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (max(0, self.max_disk_entries),),
+        ).rowcount
+        self.disk_evictions += deleted
+
+    def get(self, key: str) -> Optional[list[float]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, vector = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector, created FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    blob, created = row
+                    if not self._expired(created, now):
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        self._remember(key, created, vector)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return vector
+                    self._db.execute("DELETE FROM query_embeddings WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector: list[float]):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, list(vector))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, vector, created) VALUES (?, ?, ?)",
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), created),
+                )
+                self._puts += 1
+                if self._puts % DISK_PRUNE_EVERY == 0:
+                    self._prune_disk()
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_embeddings")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._memory),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# ==========================================================
+# Embeddings wrapper
+# ==========================================================
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so repeated queries skip the upstream round trip.
+    Only `embed_query` is cached; document embeddings pass straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_query(self, text: str) -> List[float]:
+        key = make_cache_key(text, self.model_name)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = make_cache_key(text, self.model_name)
+        # the SQLite tier does blocking I/O, keep it off the event loop
+        vector = await run_sync(self.cache.get, key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await run_sync(self.cache.put, key, vector)
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
@@ -0,0 +1,123 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from backend.logger import logger
+from backend.modules.retry import backoff_delay, is_retryable
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound-ish token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class EmbeddingResult:
+    """Embeddings aligned index-for-index with the input texts; failed slots are None."""
+    embeddings: list[Optional[list[float]]]
+    failed: dict[int, str] = field(default_factory=dict)
+
+    @property
+    def succeeded(self) -> list[int]:
+        return [i for i, e in enumerate(self.embeddings) if e is not None]
+
+
+class EmbeddingEngine:
+    """
+    Concurrent, rate-limit-aware document embedding.
+
+    Texts are grouped into batches by estimated token count (and item count),
+    batches run concurrently up to `max_concurrency`, and 429/5xx/transport
+    errors are retried with exponential backoff and jitter. A batch rejected
+    for any other reason is split in half until the offending text is
+    isolated. Every result is written back to its input position, so a chunk
+    can never be paired with another chunk's vector; texts that still fail are
+    reported in `EmbeddingResult.failed`.
+    """
+
+    def __init__(self, model, max_concurrency: int = 4, max_batch_tokens: int = 32_000,
+                 max_batch_items: int = 128, max_retries: int = 5, base_delay: float = 0.5,
+                 max_delay: float = 30.0, count_tokens: Callable[[str], int] = estimate_tokens,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.count_tokens = count_tokens
+        self._sleep = sleep
+
+    def make_batches(self, texts: list[str]) -> list[list[int]]:
+        """Group input positions into batches under the token and item limits."""
+        batches, current, tokens = [], [], 0
+        for i, text in enumerate(texts):
+            n = self.count_tokens(text)
+            if current and (tokens + n > self.max_batch_tokens or len(current) >= self.max_batch_items):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(i)
+            tokens += n
+        if current:
+            batches.append(current)
+        return batches
+
+    def _call_with_retry(self, texts: list[str]) -> list[list[float]]:
+        attempt = 0
+        while True:
+            try:
+                vectors = self.model.embed_documents(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                return vectors
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                logger.warning(f"Embedding batch of {len(texts)} failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+                self._sleep(delay)
+                attempt += 1
+
+    def _embed_batch(self, texts: list[str], positions: list[int],
+                     out: list[Optional[list[float]]], failed: dict[int, str]) -> int:
+        """Embed one batch into `out`; returns how many positions were filled."""
+        try:
+            vectors = self._call_with_retry([texts[i] for i in positions])
+        except Exception as e:
+            if len(positions) > 1 and not is_retryable(e):
+                mid = len(positions) // 2
+                return (self._embed_batch(texts, positions[:mid], out, failed)
+                        + self._embed_batch(texts, positions[mid:], out, failed))
+            for i in positions:
+                failed[i] = str(e)
+            return 0
+
+        for i, vector in zip(positions, vectors):
+            out[i] = vector
+        return len(positions)
+
+    def embed(self, texts: list[str], progress=None) -> EmbeddingResult:
+        """
+        Embed all `texts`. `progress`, if given, is called from the calling
+        thread as `progress("embedding", chunks_embedded=n)` after each batch.
+        """
+        out: list[Optional[list[float]]] = [None] * len(texts)
+        failed: dict[int, str] = {}
+        if not texts:
+            return EmbeddingResult(out, failed)
+
+        done = 0
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed")
+        try:
+            futures = [pool.submit(self._embed_batch, texts, b, out, failed) for b in self.make_batches(texts)]
+            for future in as_completed(futures):
+                done += future.result()
+                if progress:
+                    progress("embedding", chunks_embedded=done)
+        finally:
+            # on cancellation (progress raised) drop batches that have not started
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        if failed:
+            logger.error(f"{len(failed)} of {len(texts)} texts could not be embedded")
+        return EmbeddingResult(out, failed)
@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable, Iterator, Optional
+import pypdf
+from backend.config.config import config
+
+# Bump when extraction or OCR output changes so stale entries are ignored
+# (v2: pages are stored in page order)
+EXTRACTOR_VERSION = f"hybrid-v2/pypdf-{pypdf.__version__}/vision-text_detection"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_extraction_cache = None
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed, page-granular cache of extraction/OCR results.
+
+    Entries are keyed on the SHA-256 of the PDF bytes, so a changed file under
+    the same name misses and two different files never collide. Each entry is
+    a gzipped JSON-lines file: a header with the extractor version, then one
+    line per page, so pages can be streamed back without loading the whole
+    document. Total size is capped; the least recently used entries go first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, version: str = EXTRACTOR_VERSION):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.jsonl.gz")
+
+    def iter_pages(self, content_hash: str) -> Optional[Iterator[dict]]:
+        """Return an iterator over cached page records, or None on a miss."""
+        path = self._path(content_hash)
+        try:
+            f = gzip.open(path, "rt", encoding="utf-8")
+            header = json.loads(f.readline() or "{}")
+        except (OSError, ValueError):
+            return None
+
+        if header.get("version") != self.version or header.get("sha256") != content_hash:
+            f.close()
+            self.discard(content_hash)
+            return None
+
+        os.utime(path)  # mark as recently used
+
+        def pages():
+            with f:
+                for line in f:
+                    yield json.loads(line)
+
+        return pages()
+
+    def store(self, content_hash: str, pages: Iterable[dict], filename: str = ""):
+        """Write page records (`{"page", "text", "extraction"}`) atomically, then enforce the size cap."""
+        writer = self.open_writer(content_hash, filename)
+        try:
+            for record in pages:
+                writer.write(record)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+    def open_writer(self, content_hash: str, filename: str = "") -> "CacheWriter":
+        """Start an entry that is filled page by page as extraction streams; see `CacheWriter`."""
+        return CacheWriter(self, content_hash, filename)
+
+    def discard(self, content_hash: str):
+        try:
+            os.remove(self._path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".jsonl.gz"):
+                    continue
+                full = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, full in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(full)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+class CacheWriter:
+    """
+    Incrementally written cache entry. Records go to a temp file as they are
+    produced; `commit` publishes the entry atomically, `abort` drops it, so a
+    partially extracted document is never served from the cache.
+    """
+
+    def __init__(self, cache: ExtractionCache, content_hash: str, filename: str = ""):
+        self.cache = cache
+        self.path = cache._path(content_hash)
+        self.tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+        header = {"version": cache.version, "sha256": content_hash, "filename": filename}
+        self._file.write(json.dumps(header) + "\n")
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict()
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache(
+            config.EXTRACTION_CACHE_DIR,
+            max_bytes=config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+            # page classification thresholds change which pages get OCR'd
+            version=f"{EXTRACTOR_VERSION}/chars-{config.EXTRACT_MIN_TEXT_CHARS}"
+                    f"/coverage-{config.EXTRACT_MIN_IMAGE_COVERAGE}",
+        )
+    return _extraction_cache
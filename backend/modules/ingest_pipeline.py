@@ -0,0 +1,292 @@
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, Optional
+from langchain_core.documents import Document
+from backend.logger import logger
+from backend.modules.chunk_manifest import VectorIdAssigner, chunk_hash
+from backend.modules.embedding_engine import EmbeddingEngine
+from backend.modules.metrics import INGEST_CHUNKS, INGEST_PAGES, INGEST_STAGE_SECONDS, timed
+from backend.modules.upsert_pipeline import UpsertPipeline
+
+_DONE = object()
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: pages → chunks → embedding batches → upsert batches.
+
+    The calling thread pulls pages from the extractor, splits them and diffs
+    the chunks against the manifest. New or changed chunks are handed to an
+    embedding thread in batches, and its vectors go to an upsert thread. The
+    queues between the stages hold at most `queue_depth` batches, so a slow
+    stage blocks the ones before it and memory stays bounded by the batch
+    size, not the document size. Every upserted batch is recorded in the
+    manifest (and BM25 index) right away, so the first chunks are searchable
+    while the rest of the document is still being extracted.
+
+    A batch is sent once it has `batch_size` chunks or `flush_seconds` after
+    its first chunk, whichever comes first, so slow (OCR) documents still
+    trickle into the index.
+
+    Chunk ids do not depend on the page, so a chunk that only moved to another
+    page (a page was inserted or removed before it) is not re-embedded: its
+    `page` metadata is updated in place, in batches, in the index, manifest
+    and chunk store.
+
+    With an `archive` (`EmbeddingArchive`), every embedding is also kept
+    locally as soon as it is computed, before the upsert. With a
+    `chunk_store` (`ChunkStore`), chunk text goes there, written before its
+    vector is upserted, instead of into the vector metadata.
+    """
+
+    def __init__(self, source: str, model_name: str, splitter, embedder: EmbeddingEngine,
+                 upserter: UpsertPipeline, manifest, lexical=None,
+                 progress: Optional[Callable] = None, batch_size: int = 512,
+                 flush_seconds: float = 2.0, queue_depth: int = 2, archive=None, chunk_store=None):
+        self.source = source
+        self.model_name = model_name
+        self.splitter = splitter
+        self.embedder = embedder
+        self.upserter = upserter
+        self.manifest = manifest
+        self.lexical = lexical
+        self.archive = archive
+        self.chunk_store = chunk_store
+        self.progress = progress
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.queue_depth = max(1, queue_depth)
+
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._extraction = Counter()
+        self.seen_ids: set[str] = set()
+        # per stage, so progress tells extraction, embedding and upserting apart
+        self.counters = {"pages_extracted": 0, "pages_failed": 0, "chunks_total": 0, "chunks_skipped": 0,
+                         "chunks_embedded": 0, "vectors_upserted": 0, "chunks_moved": 0, "chunks_failed": 0}
+        self.failed_chunks: list[dict] = []
+        self.first_upsert_seconds: Optional[float] = None
+
+    # ------------------------------------------------------
+    # Stage plumbing
+    # ------------------------------------------------------
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the pipeline is stopping (backpressure point)."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(self, inbox: queue.Queue, outbox: Optional[queue.Queue], fn):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                result = fn(item)
+                if outbox is not None and result is not None:
+                    self._put(outbox, result)
+        except BaseException as e:
+            with self._lock:
+                self._error = self._error or e
+            self._stop.set()
+        finally:
+            if outbox is not None:
+                self._put(outbox, _DONE)
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+    def _report_progress(self, stage: str = "ingesting"):
+        if self.progress:
+            with self._lock:
+                counters = dict(self.counters)
+            self.progress(stage, **counters)
+
+    # ------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------
+    def _embed(self, batch: list[tuple[str, str, Document]]):
+        with timed("embed", INGEST_STAGE_SECONDS):
+            result = self.embedder.embed([chunk.page_content for _, _, chunk in batch])
+        INGEST_CHUNKS.labels("embedded").inc(len(result.succeeded))
+        with self._lock:
+            self.counters["chunks_embedded"] += len(result.succeeded)
+        vectors, entries = [], {}
+        for i in result.succeeded:
+            vector_id, h, chunk = batch[i]
+            entries[vector_id] = (h, chunk.page_content)
+            metadata = {
+                "source": str(self.source),
+                "page": chunk.metadata.get("page", None),
+            }
+            if self.chunk_store is None:
+                metadata["text"] = chunk.page_content
+            if chunk.metadata.get("section"):
+                metadata["section"] = chunk.metadata["section"]
+            vectors.append((vector_id, result.embeddings[i], metadata))
+        if self.archive is not None and vectors:
+            with timed("archive", INGEST_STAGE_SECONDS):
+                self.archive.add(self.model_name, [(entries[vid][0], values, metadata)
+                                                   for vid, values, metadata in vectors])
+        if result.failed:
+            self._record_failures([
+                {"vector_id": batch[i][0], "page": batch[i][2].metadata.get("page"), "error": error}
+                for i, error in sorted(result.failed.items())
+            ])
+        return (vectors, entries, {vid: chunk.metadata.get("page") for vid, _, chunk in batch}) if vectors else None
+
+    def _upsert(self, item):
+        vectors, entries, page_of = item
+
+        def on_batch(batch_ids):
+            self.manifest.add(self.source, [(vid, entries[vid][0], page_of.get(vid)) for vid in batch_ids])
+            if self.lexical is not None:
+                self.lexical.add(self.source, [(vid, entries[vid][1]) for vid in batch_ids])
+            INGEST_CHUNKS.labels("upserted").inc(len(batch_ids))
+            with self._lock:
+                self.counters["vectors_upserted"] += len(batch_ids)
+                if self.first_upsert_seconds is None:
+                    self.first_upsert_seconds = time.monotonic() - self._started
+
+        if self.chunk_store is not None:
+            with timed("chunk_store", INGEST_STAGE_SECONDS):
+                self.chunk_store.add(self.source, [(vid, entries[vid][1], page_of.get(vid)) for vid, _, _ in vectors])
+        with timed("upsert", INGEST_STAGE_SECONDS):
+            result = self.upserter.upsert(vectors, on_batch=on_batch)
+        if result.failed and self.chunk_store is not None:
+            self.chunk_store.remove(self.source, list(result.failed))
+        if result.failed:
+            self._record_failures([
+                {"vector_id": vid, "page": page_of.get(vid), "error": error}
+                for vid, error in sorted(result.failed.items())
+            ])
+
+    def _update_pages(self, moved: list[tuple[str, str, str, Optional[int]]]):
+        """Point `(vector_id, chunk_hash, text, page)` chunks that moved to another page at their new page."""
+        with timed("update_pages", INGEST_STAGE_SECONDS):
+            result = self.upserter.update_metadata([(vid, {"page": page}) for vid, _, _, page in moved])
+        done = set(result.upserted)
+        updated = [m for m in moved if m[0] in done]
+        if updated:
+            self.manifest.add(self.source, [(vid, h, page) for vid, h, _, page in updated])
+            if self.chunk_store is not None:
+                self.chunk_store.add(self.source, [(vid, text, page) for vid, _, text, page in updated])
+            with self._lock:
+                self.counters["chunks_moved"] += len(updated)
+        if result.failed:
+            page_of = {vid: page for vid, _, _, page in moved}
+            self._record_failures([
+                {"vector_id": vid, "page": page_of.get(vid), "error": error}
+                for vid, error in sorted(result.failed.items())
+            ])
+
+    def _record_failures(self, failures: list[dict]):
+        INGEST_CHUNKS.labels("failed").inc(len(failures))
+        with self._lock:
+            self.failed_chunks.extend(failures)
+            self.counters["chunks_failed"] += len(failures)
+
+    # ------------------------------------------------------
+    # Driver
+    # ------------------------------------------------------
+    def run(self, pages: Iterable[Document]) -> dict:
+        """Ingest `pages`; returns the counters plus `failed_chunks` and an extraction summary."""
+        self._started = time.monotonic()
+        existing = self.manifest.pages(self.source)
+        assign_ids = VectorIdAssigner(self.source)
+        embed_queue = queue.Queue(maxsize=self.queue_depth)
+        upsert_queue = queue.Queue(maxsize=self.queue_depth)
+        workers = [
+            threading.Thread(target=self._worker, args=(embed_queue, upsert_queue, self._embed),
+                             name="ingest-embed", daemon=True),
+            threading.Thread(target=self._worker, args=(upsert_queue, None, self._upsert),
+                             name="ingest-upsert", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            batch, batch_started, moved = [], 0.0, []
+            for page in pages:
+                self._raise_if_failed()
+                extraction = page.metadata.get("extraction", "text")
+                self._extraction[extraction] += 1
+                INGEST_PAGES.labels(extraction).inc()
+                with timed("chunk", INGEST_STAGE_SECONDS):
+                    chunks = self.splitter.split_documents([page])
+                    hashes = [chunk_hash(c.page_content, self.model_name, c.metadata.get("section", ""))
+                              for c in chunks]
+                unchanged = []
+                for vector_id, h, chunk in zip(assign_ids(hashes), hashes, chunks):
+                    self.seen_ids.add(vector_id)
+                    if vector_id in existing:
+                        page_number = chunk.metadata.get("page")
+                        unchanged.append((vector_id, chunk.page_content, page_number))
+                        if existing[vector_id] != page_number:
+                            moved.append((vector_id, h, chunk.page_content, page_number))
+                        continue
+                    if not batch:
+                        batch_started = time.monotonic()
+                    batch.append((vector_id, h, chunk))
+
+                # unchanged chunks indexed before the BM25 index (or chunk store)
+                # existed only need their text indexed (or stored)
+                if unchanged and self.lexical is not None:
+                    missing = self.lexical.missing(vid for vid, _, _ in unchanged)
+                    if missing:
+                        self.lexical.add(self.source, [(vid, text) for vid, text, _ in unchanged if vid in missing])
+                if unchanged and self.chunk_store is not None:
+                    missing = self.chunk_store.missing(vid for vid, _, _ in unchanged)
+                    if missing:
+                        self.chunk_store.add(self.source, [c for c in unchanged if c[0] in missing])
+
+                INGEST_CHUNKS.labels("skipped").inc(len(unchanged))
+                with self._lock:
+                    self.counters["pages_extracted"] += 1
+                    self.counters["pages_failed"] += bool(page.metadata.get("ocr_failed"))
+                    self.counters["chunks_total"] += len(chunks)
+                    self.counters["chunks_skipped"] += len(unchanged)
+                if batch and (len(batch) >= self.batch_size
+                              or time.monotonic() - batch_started >= self.flush_seconds):
+                    self._put(embed_queue, batch)
+                    batch = []
+                if len(moved) >= self.batch_size:
+                    self._update_pages(moved)
+                    moved = []
+                self._report_progress()
+
+            if batch:
+                self._put(embed_queue, batch)
+            if moved:
+                self._update_pages(moved)
+            self._put(embed_queue, _DONE)
+
+            # drain: keep reporting (and honouring cancellation) while the workers finish
+            while any(worker.is_alive() for worker in workers):
+                workers[-1].join(timeout=1.0)
+                self._raise_if_failed()
+                self._report_progress()
+            self._raise_if_failed()
+        except BaseException:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+            raise
+
+        report = dict(self.counters)
+        report["failed_chunks"] = self.failed_chunks
+        report["extraction"] = {"pages": self.counters["pages_extracted"], **self._extraction}
+        if self.first_upsert_seconds is not None:
+            logger.info(f"First vectors of {self.source} searchable after {self.first_upsert_seconds:.2f}s")
+        return report
@@ -0,0 +1,346 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from backend.config.config import config
+from backend.logger import logger
+from backend.modules.chunk_manifest import get_chunk_manifest
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_ingestion_queue = None
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was cancelled."""
+
+
+class JobInterrupted(Exception):
+    """Raised inside a worker when the queue shuts down; the job resumes on next start."""
+
+
+# ==========================================================
+# Persistence
+# ==========================================================
+class JobStore:
+    """SQLite-backed job table, so queued work survives a restart."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, filename TEXT NOT NULL, file_path TEXT NOT NULL, "
+                "status TEXT NOT NULL, stage TEXT NOT NULL, progress TEXT NOT NULL, "
+                "error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                "created REAL NOT NULL, updated REAL NOT NULL, content_hash TEXT, source TEXT)"
+            )
+            columns = {r["name"] for r in self._db.execute("PRAGMA table_info(jobs)")}
+            if "content_hash" not in columns:  # job tables created before uploads were hashed
+                self._db.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+            if "source" not in columns:  # before uploads were staged, file_path was the source
+                self._db.execute("ALTER TABLE jobs ADD COLUMN source TEXT")
+            self._db.commit()
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job["source"] = job["source"] or job["file_path"]
+        return job
+
+    def create(self, filename: str, file_path: str, content_hash: Optional[str] = None,
+               source: Optional[str] = None) -> dict:
+        """
+        A queued job ingesting the file at `file_path` as `source` (the path
+        it is indexed under; defaults to `file_path`).
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, filename, file_path, status, stage, progress, created, updated, "
+                "content_hash, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, file_path, QUEUED, QUEUED, json.dumps({}), now, now, content_hash,
+                 source or file_path),
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def find_unfinished(self, content_hash: str) -> Optional[dict]:
+        """A queued or running job for a file with this SHA-256, if any."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE content_hash = ? AND status IN (?, ?) "
+                "AND cancel_requested = 0 ORDER BY created LIMIT 1",
+                (content_hash, QUEUED, RUNNING),
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def update(self, job_id: str, *, status: Optional[str] = None, stage: Optional[str] = None,
+               progress: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock:
+            row = self._db.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            merged = {**json.loads(row["progress"]), **(progress or {})}
+            self._db.execute(
+                "UPDATE jobs SET status = COALESCE(?, status), stage = COALESCE(?, stage), "
+                "progress = ?, error = COALESCE(?, error), updated = ? WHERE id = ?",
+                (status, stage, json.dumps(merged), error, time.time(), job_id),
+            )
+            self._db.commit()
+
+    def request_cancel(self, job_id: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ==========================================================
+# Progress reporting
+# ==========================================================
+class JobProgress:
+    """
+    Callback handed to the ingestion code. Each call records the current stage
+    and counters, and raises `JobCancelled` once a cancel was requested, or
+    `JobInterrupted` once `stopping` is set.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, stopping: Optional[threading.Event] = None):
+        self.store = store
+        self.job_id = job_id
+        self.stopping = stopping
+
+    def check_cancelled(self):
+        if self.stopping is not None and self.stopping.is_set():
+            raise JobInterrupted(self.job_id)
+        job = self.store.get(self.job_id)
+        if job is None or job["cancel_requested"]:
+            raise JobCancelled(self.job_id)
+
+    def __call__(self, stage: str, **counters):
+        self.store.update(self.job_id, stage=stage, progress=counters)
+        self.check_cancelled()
+
+
+# ==========================================================
+# Worker pool
+# ==========================================================
+class IngestionQueue:
+    """
+    Bounded worker pool that runs PDF ingestion jobs in the background.
+
+    Jobs for the same source run one at a time: two ingestions of one
+    document would race on its manifest entries and delete each other's
+    vectors as stale. While a source's job runs, the latest later upload of
+    it waits; an upload arriving after that supersedes the waiting one.
+    A job's file stays at its staging path until the job starts, so a new
+    upload never overwrites a file an earlier job is still reading.
+    """
+
+    def __init__(self, store: JobStore, max_workers: int = 2):
+        self.store = store
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._running: set[str] = set()  # sources with a job on a worker
+        self._waiting: dict[str, str] = {}  # source -> job to run once its current one finishes
+
+    def start(self):
+        """Start the workers and re-enqueue jobs left unfinished by the last run."""
+        if self._executor is None:
+            self._stopping.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        for job in self.store.unfinished():
+            logger.info(f"Resuming ingestion job {job['id']} ({job['filename']})")
+            self.store.update(job["id"], status=QUEUED, stage=QUEUED)
+            self._dispatch(job)
+
+    def submit(self, filename: str, file_path: str, content_hash: Optional[str] = None,
+               source: Optional[str] = None) -> dict:
+        """Queue ingestion of the file at `file_path` as `source` (default: `file_path`)."""
+        job = self.store.create(filename, file_path, content_hash, source)
+        if self._executor is None:
+            self.start()
+        else:
+            self._dispatch(job)
+        return job
+
+    def _dispatch(self, job: dict):
+        source, superseded = job["source"], None
+        with self._lock:
+            if source in self._running:
+                superseded = self._waiting.get(source)
+                self._waiting[source] = job["id"]
+            else:
+                self._running.add(source)
+                self._executor.submit(self._run, job["id"])
+        if superseded is not None:
+            logger.info(f"Ingestion job {superseded} superseded by {job['id']} ({job['filename']})")
+            self._discard_staged(self.store.get(superseded))
+            self.store.update(superseded, status=CANCELLED, stage=CANCELLED,
+                              error="Superseded by a newer upload of the same file")
+
+    def _finished(self, source: str):
+        """Start the job waiting for `source`, if any."""
+        with self._lock:
+            job_id = self._waiting.pop(source, None)
+            if job_id is None or self._executor is None:
+                self._running.discard(source)
+                return
+            self._executor.submit(self._run, job_id)
+
+    @staticmethod
+    def _discard_staged(job: Optional[dict]):
+        if job is not None and job["file_path"] != job["source"]:
+            try:
+                os.remove(job["file_path"])
+            except FileNotFoundError:
+                pass
+
+    def find_duplicate(self, content_hash: str) -> Optional[dict]:
+        """
+        Where an identical file already is: a job still ingesting it
+        (`{"job_id", "filename"}`) or a source fully indexed from it
+        (`{"job_id": None, "filename"}`). None if it is new.
+        """
+        job = self.store.find_unfinished(content_hash)
+        if job is not None:
+            return {"job_id": job["id"], "filename": job["filename"]}
+        source = get_chunk_manifest().source_for_hash(content_hash)
+        if source is not None:
+            return {"job_id": None, "filename": os.path.basename(source)}
+        return None
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return job
+        self.store.request_cancel(job_id)
+        if job["status"] == QUEUED:
+            self.store.update(job_id, status=CANCELLED, stage=CANCELLED)
+        return self.store.get(job_id)
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        try:
+            self._run_job(job)
+        finally:
+            self._finished(job["source"])
+
+    def _run_job(self, job: dict):
+        # imported here so the queue can be created without loading the OCR stack
+        from backend.modules.load_vectorstore import ingest_pages
+        from backend.modules.ocr_loader import iter_pdf_documents
+
+        job_id, source = job["id"], job["source"]
+        if job["status"] != QUEUED:
+            self._discard_staged(job)
+            return
+        if job["cancel_requested"]:
+            self._discard_staged(job)
+            self.store.update(job_id, status=CANCELLED, stage=CANCELLED)
+            return
+
+        progress = JobProgress(self.store, job_id, self._stopping)
+        filename = job["filename"]
+        try:
+            self.store.update(job_id, status=RUNNING, stage="ingesting")
+            if job["file_path"] != source and os.path.exists(job["file_path"]):
+                # no other job of this source is running: the upload can take its place now
+                os.replace(job["file_path"], source)
+            # pages stream from extraction straight into chunking, embedding and upserting
+            content_hash = job["content_hash"]
+            report = ingest_pages(iter_pdf_documents(source, content_hash), source,
+                                  progress=progress, content_hash=content_hash)
+
+            if report["pages_failed"]:
+                # indexed what could be read; the file is not recorded as ingested, so it can be retried
+                logger.warning(f"OCR failed on {report['pages_failed']} pages of {filename}")
+                self.store.update(job_id, status=FAILED, stage="indexed",
+                                  error=f"OCR failed on {report['pages_failed']} pages; upload the file again to retry")
+                return
+            if not report["chunks_total"]:
+                logger.warning(f"No text extracted from {filename}")
+                self.store.update(job_id, status=FAILED, stage="indexed", error="No text extracted")
+                return
+
+            self.store.update(job_id, status=COMPLETED, stage="done")
+            logger.info(f"Document added to vectorstore: {filename}")
+
+        except JobCancelled:
+            logger.info(f"Ingestion job {job_id} cancelled ({filename})")
+            self.store.update(job_id, status=CANCELLED, stage=CANCELLED)
+        except JobInterrupted:
+            # left "running" in the store, so the next start resumes it
+            logger.info(f"Ingestion job {job_id} interrupted by shutdown ({filename})")
+        except Exception as e:
+            logger.exception(f"Ingestion job {job_id} failed ({filename})")
+            self.store.update(job_id, status=FAILED, error=str(e))
+
+    def shutdown(self):
+        """
+        Drop queued jobs and ask running ones to stop; they stop at their next
+        progress report (about one page), which interpreter exit waits for.
+        Both stay unfinished in the store and are resumed on next start.
+        """
+        if self._executor is not None:
+            self._stopping.set()
+            with self._lock:
+                executor, self._executor = self._executor, None
+                self._waiting.clear()
+                self._running.clear()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        _ingestion_queue = IngestionQueue(
+            JobStore(config.JOBS_DB_PATH),
+            max_workers=config.INGEST_WORKERS,
+        )
+    return _ingestion_queue
@@ -1,22 +1,42 @@
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains.retrieval import create_retrieval_chain
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_groq import ChatGroq
+from functools import lru_cache
+from typing import Optional
 from backend.config.config import config
 from backend.config.loader import load_yaml_config
-from backend.modules.prompt_builder import build_prompt_from_config
+
+# LangChain chains and the Groq client are imported on first use: they are the
+# slowest imports in the app and only the query pipeline needs them.
 
 GROQ_API_KEY = config.GROQ_API_KEY
-prompt_config = load_yaml_config("backend/config/prompts.yaml")
+PROMPTS_PATH = "backend/config/prompts.yaml"
+
+
+@lru_cache(maxsize=1)
+def get_prompt_config() -> dict:
+    return load_yaml_config(PROMPTS_PATH)
+
+
+def get_llm(settings=config):
+    from langchain_groq import ChatGroq
 
-def get_llm_chain(retriever):
-    llm = ChatGroq(
-        groq_api_key=GROQ_API_KEY,
+    return ChatGroq(
+        groq_api_key=settings.GROQ_API_KEY,
         model_name="llama-3.1-8b-instant"
     )
 
-    rag_prompt = prompt_config["rag_assistant_prompt"]
+
+def get_answer_chain(prompt_config: Optional[dict] = None, settings=config, llm=None):
+    """
+    Stuff-documents chain without a retriever in front of it.
+    Expects `{"input": question, "context": [Document, ...]}` and returns plain text,
+    so callers retrieve once and reuse the same documents for the response sources.
+    """
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+    from backend.modules.prompt_builder import build_prompt_from_config
+
+    llm = llm or get_llm(settings)
+
+    rag_prompt = (prompt_config or get_prompt_config())["rag_assistant_prompt"]
     system_prompt = build_prompt_from_config(rag_prompt)
 
     system_message = SystemMessagePromptTemplate.from_template(
@@ -27,15 +47,14 @@ def get_llm_chain(retriever):
 
     prompt = ChatPromptTemplate([system_message, human_message])
 
-    question_answer_chain = create_stuff_documents_chain(llm, prompt)
-    chain = create_retrieval_chain(retriever, question_answer_chain)
-
-    return chain | (lambda x: x["answer"]) | StrOutputParser()
-
-
-
-
+    return create_stuff_documents_chain(llm, prompt)
 
 
+def get_llm_chain(retriever, prompt_config: Optional[dict] = None, settings=config):
+    from langchain.chains.retrieval import create_retrieval_chain
+    from langchain_core.output_parsers import StrOutputParser
 
+    question_answer_chain = get_answer_chain(prompt_config, settings)
+    chain = create_retrieval_chain(retriever, question_answer_chain)
 
+    return chain | (lambda x: x["answer"]) | StrOutputParser()
@@ -1,17 +1,35 @@
+import re
 import time
 from pathlib import Path
 from itertools import islice
-from tqdm.auto import tqdm
+from typing import Iterable, Optional
 from pinecone import Pinecone, ServerlessSpec
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_voyageai import VoyageAIEmbeddings
 from backend.config.config import config
+from backend.modules.answer_cache import get_answer_cache
+from backend.modules.bm25_index import get_bm25_index
+from backend.modules.chunk_manifest import get_chunk_manifest
+from backend.modules.chunk_store import get_chunk_store
+from backend.modules.chunker import ManualChunker
+from backend.modules.concurrency import run_sync
+from backend.modules.embedding_archive import get_embedding_archive
+from backend.modules.embedding_engine import EmbeddingEngine
+from backend.modules.ingest_pipeline import IngestionPipeline
+from backend.modules.metrics import INGEST_STAGE_SECONDS, observe
+from backend.modules.upsert_pipeline import UpsertPipeline
+from backend.modules.vector_index import get_local_vector_index
 
 # ==========================================================
 # Lazy Globals
 # ==========================================================
+_pinecone_client = None
 _pinecone_index = None
+_pinecone_index_name = None
+_pinecone_async_index = None
+
+EMBEDDING_MODEL = "voyage-3.5"
 
 
 # ==========================================================
@@ -26,32 +44,38 @@ def chunked_iterable(iterable, size):
         yield chunk
 
 
-def embed_texts_in_batches(embedding_model, texts, batch_size: int = 50):
-    """Safely embed texts in smaller batches to avoid API resets."""
-    all_embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        try:
-            batch_embeddings = embedding_model.embed_documents(batch)
-            all_embeddings.extend(batch_embeddings)
-        except Exception as e:
-            print(f"Error embedding batch {i//batch_size + 1}: {e}")
-            # Retry one by one
-            for text in batch:
-                try:
-                    single_embedding = embedding_model.embed_documents([text])[0]
-                    all_embeddings.append(single_embedding)
-                except Exception as inner_e:
-                    print(f"Failed on single text: {inner_e}")
-    return all_embeddings
+def get_embedding_engine(embedding_model) -> EmbeddingEngine:
+    return EmbeddingEngine(
+        embedding_model,
+        max_concurrency=config.EMBED_CONCURRENCY,
+        max_batch_tokens=config.EMBED_BATCH_TOKENS,
+        max_batch_items=config.EMBED_BATCH_ITEMS,
+        max_retries=config.EMBED_MAX_RETRIES,
+    )
+
+
+def get_upsert_pipeline(index) -> UpsertPipeline:
+    return UpsertPipeline(
+        index,
+        max_concurrency=config.UPSERT_CONCURRENCY,
+        max_request_bytes=config.UPSERT_MAX_REQUEST_BYTES,
+        max_batch_vectors=config.UPSERT_MAX_BATCH_VECTORS,
+        max_retries=config.UPSERT_MAX_RETRIES,
+    )
 
 
 # ==========================================================
 # Pinecone
 # ==========================================================
 def get_pinecone_index():
-    """Return Pinecone index, creating it if needed."""
-    global _pinecone_index
+    """
+    Return the vector index, creating it if needed: the Pinecone index, or the
+    local in-process index when `VECTOR_BACKEND` is "local". Both implement
+    `backend.modules.vector_index.VectorIndex`.
+    """
+    global _pinecone_client, _pinecone_index, _pinecone_index_name
+    if _pinecone_index is None and config.VECTOR_BACKEND == "local":
+        _pinecone_index = get_local_vector_index()
     if _pinecone_index is None:
         pc = Pinecone(api_key=config.PINECONE_API_KEY)
         spec = ServerlessSpec(cloud="aws", region=config.PINECONE_ENVIRONMENT)
@@ -66,7 +90,7 @@ def get_pinecone_index():
             print(f" Creating new Pinecone index: {config.PINECONE_INDEX_NAME}")
             pc.create_index(
                 name=config.PINECONE_INDEX_NAME,
-                dimension=1024,
+                dimension=config.VECTOR_DIMENSION,
                 metric="cosine",
                 spec=spec,
             )
@@ -75,53 +99,157 @@ def get_pinecone_index():
             index_name = config.PINECONE_INDEX_NAME
             print(f"Created Pinecone index: {index_name}")
 
-        _pinecone_index = pc.Index(index_name)
+        _pinecone_client = pc
+        _pinecone_index_name = index_name
+        # one pooled connection per concurrent upsert request
+        _pinecone_index = pc.Index(
+            index_name,
+            pool_threads=config.UPSERT_CONCURRENCY,
+            connection_pool_maxsize=max(config.UPSERT_CONCURRENCY, config.SYNC_POOL_SIZE),
+        )
     return _pinecone_index
 
 
+async def get_pinecone_async_index():
+    """
+    Return the native asyncio client for the same index, or None when it is
+    unavailable (e.g. `pinecone[asyncio]` not installed) so callers fall back
+    to the sync index on the bounded thread pool.
+    """
+    global _pinecone_async_index
+    if config.VECTOR_BACKEND == "local":
+        return None  # queries are sub-millisecond; the thread pool is enough
+    if _pinecone_async_index is None:
+        try:
+            await run_sync(get_pinecone_index)
+            description = await run_sync(_pinecone_client.describe_index, _pinecone_index_name)
+            _pinecone_async_index = _pinecone_client.IndexAsyncio(host=description.host)
+        except Exception as e:
+            print(f"Async Pinecone client unavailable, using thread pool: {e}")
+            return None
+    return _pinecone_async_index
+
+
+async def close_pinecone_async_index():
+    global _pinecone_async_index
+    if _pinecone_async_index is not None:
+        await _pinecone_async_index.close()
+        _pinecone_async_index = None
+
+
 # ==========================================================
-# Vectorstore Loader (Docs → Embeddings → Pinecone)
+# Vectorstore Loader (Pages → Chunks → Embeddings → Pinecone)
 # ==========================================================
-def load_vectorstore_from_docs(docs: list[Document], source: str):
+def _delete_legacy_vectors(index, source: str) -> int:
+    """
+    Vectors written before the manifest existed used positional ids
+    (`{stem}-{i}`). Remove them the first time a document is re-ingested;
+    needs a serverless index that supports listing ids by prefix.
     """
-    Takes extracted Document objects and pushes them to Pinecone.
-    `source` is the file path of the original PDF.
+    stem = Path(source).stem
+    legacy = re.compile(rf"^{re.escape(stem)}-\d+$")
+    deleted = 0
+    try:
+        for ids in index.list(prefix=f"{stem}-"):
+            stale = [i for i in ids if legacy.match(i)]
+            if stale:
+                index.delete(ids=stale)
+                deleted += len(stale)
+    except Exception as e:
+        print(f"Could not list legacy vectors for {Path(source).name}: {e}")
+    return deleted
+
+
+def ingest_pages(pages: Iterable[Document], source: str, progress=None,
+                 content_hash: Optional[str] = None) -> dict:
     """
+    Stream extracted pages into Pinecone (see `IngestionPipeline`).
+    `source` is the file path of the original PDF and `content_hash` the
+    SHA-256 of its bytes; once every chunk is indexed the hash is recorded, so
+    an identical upload can be recognized and skipped.
+    `progress`, if given, is called as `progress(stage, **counters)` as pages
+    are processed (see `backend.modules.jobs.JobProgress`); it may raise to abort.
+
+    Ingestion is incremental: chunks are identified by content hash, so on
+    re-ingestion only new or changed chunks are embedded and upserted, and
+    vectors for chunks that no longer exist are deleted. Returns a report of
+    what was embedded, skipped and deleted.
+    """
+    model_name = EMBEDDING_MODEL
     embedding_model = VoyageAIEmbeddings(
         voyage_api_key=config.VOYAGE_API_KEY,
-        model="voyage-3.5"
-    )
-
-    # Split into chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50
+        model=model_name
     )
-    chunks = splitter.split_documents(docs)
-
-    # Embeddings
-    print(f"Embedding {len(chunks)} chunks from {Path(source).name}...")
-    texts = [chunk.page_content for chunk in chunks]
-    embeddings = embed_texts_in_batches(embedding_model, texts, batch_size=50)
-
-    # Format for Pinecone
-    vectors = []
-    for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-        vectors.append((
-            f"{Path(source).stem}-{i}",
-            embedding,
-            {
-                "source": str(source),
-                "page": chunk.metadata.get("page", None),
-                "text": chunk.page_content
-            }
-        ))
-
-    # Upsert to Pinecone
+    manifest = get_chunk_manifest()
+    bm25 = get_bm25_index()
+    chunk_store = get_chunk_store()
     index = get_pinecone_index()
-    with tqdm(total=len(vectors), desc="Upserting to Pinecone") as progress:
-        for batch in chunked_iterable(vectors, 100):
-            index.upsert(vectors=batch)
-            progress.update(len(batch))
-
-    print(f"Upload complete for {Path(source).name}")
+    name = Path(source).name
+    first_ingest = not manifest.has_source(source)
+    # until this run completes, the index no longer matches any one file
+    manifest.set_content_hash(source, None)
+
+    # Split → embed → upsert, one bounded batch at a time
+    if config.STRUCTURED_CHUNKING:
+        splitter = ManualChunker(max_tokens=config.CHUNK_MAX_TOKENS, min_tokens=config.CHUNK_MIN_TOKENS)
+    else:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=500,
+            chunk_overlap=50
+        )
+    pipeline = IngestionPipeline(
+        source,
+        model_name,
+        splitter,
+        embedder=get_embedding_engine(embedding_model),
+        upserter=get_upsert_pipeline(index),
+        manifest=manifest,
+        lexical=bm25,
+        progress=progress,
+        batch_size=config.INGEST_BATCH_CHUNKS,
+        flush_seconds=config.INGEST_FLUSH_SECONDS,
+        queue_depth=config.INGEST_QUEUE_DEPTH,
+        archive=get_embedding_archive(),
+        chunk_store=chunk_store,
+    )
+    print(f"Ingesting {name}...")
+    started = time.perf_counter()
+    report = pipeline.run(pages)
+
+    # Delete vectors for chunks that are gone from the new version. A run that
+    # produced no chunks at all (e.g. extraction failed) leaves the index alone,
+    # and so does one where OCR failed on some pages: their chunks are missing
+    # from this run, not from the document.
+    deleted = 0
+    if report["chunks_total"] and not report["pages_failed"]:
+        stale = sorted(manifest.vector_ids(source) - pipeline.seen_ids)
+        for batch in chunked_iterable(stale, 1000):
+            index.delete(ids=batch)
+            manifest.remove(source, batch)
+            bm25.remove(source, batch)
+            if chunk_store is not None:
+                chunk_store.remove(source, batch)
+        deleted = len(stale)
+        if first_ingest:
+            deleted += _delete_legacy_vectors(index, source)
+    report["vectors_deleted"] = deleted
+    observe("document", time.perf_counter() - started, INGEST_STAGE_SECONDS)
+    if content_hash and report["chunks_total"] and not report["chunks_failed"] and not report["pages_failed"]:
+        manifest.set_content_hash(source, content_hash)
+    if progress:
+        progress("indexed", **report)
+
+    # Cached answers built from the previous version of this document are stale now
+    if report["vectors_upserted"] or report["chunks_moved"] or deleted:
+        dropped = get_answer_cache().invalidate_source(source)
+        if dropped:
+            print(f"Invalidated {dropped} cached answers for {name}")
+
+    print(f"Upload complete for {name}: "
+          f"{ {k: v for k, v in report.items() if k != 'failed_chunks'} }")
+    return report
+
+
+def load_vectorstore_from_docs(docs: list[Document], source: str, progress=None) -> dict:
+    """Ingest already extracted Document objects; see `ingest_pages`."""
+    return ingest_pages(docs, source, progress=progress)
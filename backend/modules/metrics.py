@@ -0,0 +1,156 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# ==========================================================
+# Metrics
+# ==========================================================
+QUERY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INGEST_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+QUERY_STAGE_SECONDS = Histogram(
+    "rag_query_stage_seconds",
+    "Time spent in each stage of answering a question "
+    "(normalize, embed, retrieve, vector_query, chunk_text, pack, prompt_build, llm_first_token, llm_total, total)",
+    ["stage"], buckets=QUERY_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "rag_llm_tokens_per_second",
+    "LLM generation speed after the first token",
+    buckets=(5, 10, 25, 50, 100, 200, 400, 800, 1600),
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "rag_ingest_stage_seconds",
+    "Time spent in each ingestion stage (extract and ocr_page per page, chunk per page, "
+    "embed, archive, chunk_store and upsert per batch, document per file)",
+    ["stage"], buckets=INGEST_BUCKETS,
+)
+INGEST_PAGES = Counter("rag_ingest_pages", "Pages ingested, by extraction path", ["extraction"])
+INGEST_CHUNKS = Counter("rag_ingest_chunks", "Chunks seen by ingestion, by outcome", ["result"])
+UPSTREAM_CALLS = Counter(
+    "rag_upstream_calls",
+    "Guarded upstream calls (voyage, pinecone, groq) by outcome: ok, error, timeout, "
+    "or rejected by an open circuit",
+    ["upstream", "outcome"],
+)
+UPSTREAM_HEDGES = Counter(
+    "rag_upstream_hedges",
+    "Duplicate requests sent after the hedge delay, by which attempt won (primary, hedge, none)",
+    ["upstream", "winner"],
+)
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "rag_upstream_circuit_state",
+    "Circuit breaker state per upstream: 0 closed, 1 half-open, 2 open",
+    ["upstream"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "rag_http_request_seconds",
+    "Time until the response headers are sent",
+    ["method", "route", "status"], buckets=QUERY_BUCKETS,
+)
+
+# Stage durations of the current request, for its Server-Timing header
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+
+# ==========================================================
+# Recording
+# ==========================================================
+def start_request_timings() -> dict:
+    """Collect stage timings of the current request (and tasks it spawns) into the returned dict."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def observe(stage: str, seconds: float, histogram: Histogram = QUERY_STAGE_SECONDS):
+    histogram.labels(stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str, histogram: Histogram = QUERY_STAGE_SECONDS):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, histogram)
+
+
+def server_timing_header(timings: dict) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text exposition of every metric, and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# ==========================================================
+# LLM timing
+# ==========================================================
+class LLMTimingCallback(BaseCallbackHandler):
+    """
+    Times one answer-chain run: prompt build (chain start until the model is
+    called), time to first token, total model time, and tokens/s after the
+    first token. Use a fresh instance per run.
+    """
+
+    run_inline = True  # keep timestamps exact and in the request's context
+
+    def __init__(self):
+        self._chain_start: Optional[float] = None
+        self._llm_start: Optional[float] = None
+        self._first_token: Optional[float] = None
+        self._tokens = 0
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None and self._chain_start is None:
+            self._chain_start = time.perf_counter()
+
+    def _on_model_start(self):
+        self._llm_start = time.perf_counter()
+        if self._chain_start is not None:
+            observe("prompt_build", self._llm_start - self._chain_start)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._on_model_start()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._on_model_start()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if not token:
+            return
+        self._tokens += 1
+        if self._first_token is None and self._llm_start is not None:
+            self._first_token = time.perf_counter()
+            observe("llm_first_token", self._first_token - self._llm_start)
+
+    def on_llm_end(self, response, **kwargs):
+        if self._llm_start is None:
+            return
+        end = time.perf_counter()
+        observe("llm_total", end - self._llm_start)
+        if self._first_token is None:
+            # not streamed: the whole answer arrived at once
+            observe("llm_first_token", end - self._llm_start)
+        tokens = self._tokens or _output_tokens(response)
+        generating = end - (self._first_token or self._llm_start)
+        if tokens > 1 and generating > 0:
+            LLM_TOKENS_PER_SECOND.observe(tokens / generating)
+
+
+def _output_tokens(response) -> int:
+    """Output token count reported by the model, else a whitespace estimate."""
+    try:
+        generation = response.generations[0][0]
+    except (AttributeError, IndexError):
+        return 0
+    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+    return usage.get("output_tokens") or len(generation.text.split())
@@ -0,0 +1,130 @@
+import io
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+from pdf2image import convert_from_path, pdfinfo_from_path
+from google.cloud import vision
+from backend.logger import logger
+from backend.modules.metrics import INGEST_STAGE_SECONDS, observe
+
+# Vision's images:annotate accepts at most 16 images per request
+MAX_VISION_BATCH = 16
+
+
+def contiguous_groups(pages: Iterable[int], size: int) -> Iterator[list[int]]:
+    """Split page numbers into runs of consecutive pages, at most `size` long."""
+    group: list[int] = []
+    for page in pages:
+        if group and (page != group[-1] + 1 or len(group) >= size):
+            yield group
+            group = []
+        group.append(page)
+    if group:
+        yield group
+
+
+class StreamingOCREngine:
+    """
+    Page-streaming OCR for scanned PDFs.
+
+    Pages are rasterized lazily, a small run at a time, PNG-encoded and sent to
+    Google Vision from a thread pool. Each worker holds at most one run of
+    `batch_size` pages, so peak image memory is bounded by `max_pages_in_memory`
+    instead of growing with the document. Results are yielded in page order as
+    soon as they are ready.
+    """
+
+    def __init__(self, client, dpi: int = 200, concurrency: int = 4, batch_size: int = 1,
+                 max_pages_in_memory: int = 8, poppler_path: Optional[str] = None,
+                 rasterize: Optional[Callable] = None, page_count: Optional[Callable] = None):
+        self.client = client
+        self.dpi = dpi
+        self.batch_size = max(1, min(batch_size, MAX_VISION_BATCH))
+        self.poppler_path = poppler_path
+        # never hold more rasterized pages than the memory cap allows
+        self.workers = max(1, min(concurrency, max_pages_in_memory // self.batch_size))
+        self._rasterize_fn = rasterize or self._rasterize
+        self._page_count_fn = page_count or self._page_count
+
+    # ------------------------------------------------------
+    # Rasterization
+    # ------------------------------------------------------
+    def _page_count(self, file_path: str) -> int:
+        return int(pdfinfo_from_path(file_path, poppler_path=self.poppler_path)["Pages"])
+
+    def _rasterize(self, file_path: str, first_page: int, last_page: int):
+        return convert_from_path(
+            file_path,
+            dpi=self.dpi,
+            first_page=first_page,
+            last_page=last_page,
+            poppler_path=self.poppler_path,
+        )
+
+    def _encode_pages(self, file_path: str, pages: list[int]) -> list[bytes]:
+        contents = []
+        for img in self._rasterize_fn(file_path, pages[0], pages[-1]):
+            buf = io.BytesIO()
+            img.save(buf, format="PNG")
+            contents.append(buf.getvalue())
+            img.close()
+        return contents
+
+    # ------------------------------------------------------
+    # Vision
+    # ------------------------------------------------------
+    def _annotate(self, contents: list[bytes]) -> list[Optional[str]]:
+        if len(contents) == 1:
+            response = self.client.text_detection(image=vision.Image(content=contents[0]))
+            responses = [response]
+        else:
+            feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+            batch = self.client.batch_annotate_images(requests=[
+                vision.AnnotateImageRequest(image=vision.Image(content=c), features=[feature])
+                for c in contents
+            ])
+            responses = list(batch.responses)
+
+        texts = []
+        for response in responses:
+            if response.error.message:
+                logger.warning(f"Vision error: {response.error.message}")
+                texts.append(None)
+                continue
+            texts.append(response.full_text_annotation.text if response.full_text_annotation else "")
+        return texts
+
+    def _ocr_group(self, file_path: str, pages: list[int]) -> list[tuple[int, Optional[str]]]:
+        start = time.perf_counter()
+        try:
+            texts = self._annotate(self._encode_pages(file_path, pages))
+        except Exception as e:
+            logger.error(f"OCR failed for pages {pages[0]}-{pages[-1]} of {file_path}: {e}")
+            texts = [None] * len(pages)
+        per_page = (time.perf_counter() - start) / len(pages)
+        for _ in pages:
+            observe("ocr_page", per_page, INGEST_STAGE_SECONDS)
+        return [(page, None if text is None else text.strip()) for page, text in zip(pages, texts)]
+
+    # ------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------
+    def iter_pages(self, file_path: str, pages: Optional[Iterable[int]] = None) -> Iterator[tuple[int, Optional[str]]]:
+        """
+        Yield `(page_number, text)` in page order; page numbers are 1-based.
+        `text` is None for a page whose OCR failed, "" for one with no text.
+        """
+        if pages is None:
+            pages = range(1, self._page_count_fn(file_path) + 1)
+
+        groups = contiguous_groups(pages, self.batch_size)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr") as pool:
+            window = deque()
+            for group in groups:
+                # bounded look-ahead: never rasterize far ahead of the consumer
+                if len(window) >= self.workers:
+                    yield from window.popleft().result()
+                window.append(pool.submit(self._ocr_group, file_path, group))
+            while window:
+                yield from window.popleft().result()
@@ -1,20 +1,18 @@
 from pathlib import Path
 import os
-import io
-import pickle
 import base64
 import tempfile
-from pdf2image import convert_from_path
-from langchain_community.document_loaders import PyPDFLoader
+import threading
+from typing import Callable, Iterator, Optional
+from pypdf import PdfReader
 from langchain_core.documents import Document
 from google.cloud import vision
 from google.oauth2 import service_account
-
-# -------------------------
-# CACHE
-# -------------------------
-CACHE_DIR = "ocr_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
+from backend.config.config import config
+from backend.modules.extraction_cache import file_sha256, get_extraction_cache
+from backend.modules.metrics import INGEST_STAGE_SECONDS, timed
+from backend.modules.ocr_engine import StreamingOCREngine
+from backend.modules.page_classifier import BLANK, OCR, TEXT, analyze_page, classify_page
 
 # -------------------------
 # POPPLER PATH HANDLING
@@ -62,70 +60,204 @@ def load_google_credentials():
         ) from e
 
 
-credentials = load_google_credentials()
-vision_client = vision.ImageAnnotatorClient(credentials=credentials)
+# Built on first OCR, so the API starts (and text-only PDFs ingest) without Vision credentials
+_vision_client = None
+_vision_client_lock = threading.Lock()
+
+
+def get_vision_client() -> vision.ImageAnnotatorClient:
+    global _vision_client
+    with _vision_client_lock:
+        if _vision_client is None:
+            _vision_client = vision.ImageAnnotatorClient(credentials=load_google_credentials())
+        return _vision_client
+
+
+def get_ocr_engine() -> StreamingOCREngine:
+    return StreamingOCREngine(
+        get_vision_client(),
+        dpi=config.OCR_DPI,
+        concurrency=config.OCR_CONCURRENCY,
+        batch_size=config.OCR_BATCH_SIZE,
+        max_pages_in_memory=config.OCR_MAX_PAGES_IN_MEMORY,
+        poppler_path=POPPLER_PATH,
+    )
 
 # -------------------------
 # HELPERS
 # -------------------------
-def _get_cache_path(file_path: str) -> str:
-    return os.path.join(CACHE_DIR, Path(file_path).stem + ".pkl")
+def _page_document(file_path: str, page: int, text: str, extraction: str, ocr_failed: bool = False) -> Document:
+    metadata = {
+        "source": str(file_path),
+        "filename": Path(file_path).name,
+        "page": page,
+        "extraction": extraction,
+    }
+    if ocr_failed:
+        metadata["ocr_failed"] = True
+    return Document(page_content=text, metadata=metadata)
 
 
-def load_pdf_with_hybrid_ocr(file_path: str):
-    """Try extracting text normally first; if none, fallback to OCR."""
-    cache_path = _get_cache_path(file_path)
+def summarize_extraction(documents: list[Document]) -> dict:
+    """Per-document metrics: how many pages took each extraction path."""
+    summary = {"pages": len(documents), TEXT: 0, OCR: 0, BLANK: 0}
+    for doc in documents:
+        path = doc.metadata.get("extraction", TEXT)
+        summary[path] = summary.get(path, 0) + 1
+    return summary
 
-    # 1. Return cached results
-    if os.path.exists(cache_path):
-        with open(cache_path, "rb") as f:
-            return pickle.load(f)
 
-    documents = []
+def _resolve(file_path: str, pending: list[tuple[int, Optional[Document]]], weak_text: dict[int, str],
+             ocr: Callable[[list[int]], Iterator[tuple[int, Optional[str]]]]) -> Iterator[Document]:
+    """
+    OCR the pages of `pending` still waiting for it (document None) and yield
+    the whole run in page order. Where OCR found nothing the page's weak
+    digital text is used instead, flagged `ocr_failed` if the OCR call failed.
+    """
+    wanted = [i for i, doc in pending if doc is None]
+    texts: dict[int, str] = {}
+    failed: set[int] = set()
+    if wanted:
+        try:
+            for page_number, text in ocr([i + 1 for i in wanted]):
+                if text is None:
+                    failed.add(page_number - 1)
+                else:
+                    texts[page_number - 1] = text
+        except Exception as e:
+            print(f"[ERROR] OCR failed for {file_path}: {e}")
+            failed.update(i for i in wanted if i not in texts)
+
+    for i, doc in pending:
+        if doc is None:
+            if texts.get(i):
+                doc = _page_document(file_path, i, texts[i].strip(), OCR)
+            else:
+                text = weak_text.pop(i, "").strip()
+                doc = _page_document(file_path, i, text, TEXT if text else BLANK, ocr_failed=i in failed)
+        yield doc
+
 
-    # 2. Try PyPDFLoader first
+def iter_pdf_pages(file_path: str) -> Iterator[Document]:
+    """
+    Page-level hybrid extraction, streamed in page order: every page is
+    classified on its digital text and image coverage. Pages with usable text
+    are yielded as soon as they are read unless an earlier page is waiting
+    for OCR; then they wait in a reorder buffer of at most
+    `OCR_MAX_PAGES_IN_MEMORY` pages. When it is full (and at the end) the
+    buffered OCR-bound pages are OCR'd together by the engine and the buffer
+    is flushed in order.
+
+    A page whose OCR failed (Vision error, missing credentials) is yielded
+    with its weak digital text and `metadata["ocr_failed"]`, so callers can
+    tell it from a page that really is blank. If the PDF could not be read
+    and OCR failed too, nothing is known about its pages and the OCR error
+    is raised.
+    """
+    name = Path(file_path).name
+    buffer_size = max(1, config.OCR_MAX_PAGES_IN_MEMORY)
+    pending: list[tuple[int, Optional[Document]]] = []  # reorder buffer; None waits for OCR
+    weak_text: dict[int, str] = {}  # digital text of OCR-bound pages, the fallback if OCR finds nothing
+    engine = None
+    read_pages = 0
+    read_failed = False
+
+    def ocr(pages: Optional[list[int]]):
+        nonlocal engine
+        if engine is None:
+            engine = get_ocr_engine()
+        return engine.iter_pages(file_path, pages)
+
+    # 1. Digital text + classification, page by page
     try:
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
-
-        if documents and any(doc.page_content.strip() for doc in documents):
-            for d in documents:
-                d.metadata.update({"filename": Path(file_path).name})
-            print(f"[INFO] Extracted text with PyPDFLoader from {Path(file_path).name}")
-            with open(cache_path, "wb") as f:
-                pickle.dump(documents, f)
-            return documents
-        else:
-            print(f"[WARN] No digital text in {Path(file_path).name}, trying OCR...")
+        reader = PdfReader(file_path)
+        for i, page in enumerate(reader.pages):
+            with timed("extract", INGEST_STAGE_SECONDS):
+                text, coverage, error = analyze_page(page)
+            if error is not None:
+                print(f"[WARN] Digital extraction failed on page {i + 1} of {name}: {error}")
+            path = classify_page(
+                text, coverage, error,
+                min_text_chars=config.EXTRACT_MIN_TEXT_CHARS,
+                min_image_coverage=config.EXTRACT_MIN_IMAGE_COVERAGE,
+            )
+            read_pages = i + 1
+            if path == OCR:
+                pending.append((i, None))
+                weak_text[i] = text
+            elif pending:
+                pending.append((i, _page_document(file_path, i, text.strip(), path)))
+            else:
+                yield _page_document(file_path, i, text.strip(), path)
+            # 2. OCR only the pages that need it, a buffer at a time
+            if len(pending) >= buffer_size:
+                yield from _resolve(file_path, pending, weak_text, ocr)
+                pending = []
     except Exception as e:
-        print(f"[ERROR] PyPDFLoader failed: {e}")
+        print(f"[ERROR] pypdf could not read {name}, OCRing the remaining pages: {e}")
+        read_failed = True
 
-    # 3. Fallback: pdf2image + Google Vision OCR
-    try:
-        images = convert_from_path(file_path, dpi=200, poppler_path=POPPLER_PATH)
-        for i, img in enumerate(images):
-            buf = io.BytesIO()
-            img.save(buf, format="PNG")
-            content = buf.getvalue()
+    yield from _resolve(file_path, pending, weak_text, ocr)
 
-            response = vision_client.text_detection(image=vision.Image(content=content))
-            page_text = response.full_text_annotation.text if response.full_text_annotation else ""
+    # 3. Unreadable PDF: OCR every page past the ones already read
+    if read_failed:
+        for page_number, text in ocr(None):
+            i = page_number - 1
+            if i < read_pages:
+                continue
+            if text is None:
+                yield _page_document(file_path, i, "", BLANK, ocr_failed=True)
+            else:
+                yield _page_document(file_path, i, text.strip(), OCR if text else BLANK)
 
-            documents.append(Document(
-                page_content=page_text.strip(),
-                metadata={
-                    "source": str(file_path),
-                    "filename": Path(file_path).name,
-                    "page": i + 1
-                }
-            ))
 
-        print(f"[INFO] OCR extraction complete for {Path(file_path).name}")
+def extract_pdf_pages(file_path: str) -> list[Document]:
+    """`iter_pdf_pages` collected into a list."""
+    documents = list(iter_pdf_pages(file_path))
+    print(f"[INFO] Extracted {Path(file_path).name}: {summarize_extraction(documents)}")
+    return documents
 
-        with open(cache_path, "wb") as f:
-            pickle.dump(documents, f)
 
-    except Exception as e:
-        print(f"[ERROR] OCR failed for {file_path}: {e}")
+def iter_pdf_documents(file_path: str, content_hash: Optional[str] = None) -> Iterator[Document]:
+    """
+    Stream a PDF's pages, in page order, with digital text where possible
+    and OCR for the rest. Results are cached per page under the file's content hash: a hit
+    replays the cache, a miss writes each page to the cache as it is yielded
+    and publishes the entry only once the whole document was extracted
+    without any OCR failure, so a retry OCRs the failed pages again. Pass
+    `content_hash` when it is already known to skip re-hashing the file.
+    """
+    cache = get_extraction_cache()
+    content_hash = content_hash or file_sha256(file_path)
 
-    return documents
+    # 1. Replay cached results
+    cached = cache.iter_pages(content_hash)
+    if cached is not None:
+        for r in cached:
+            yield _page_document(file_path, r["page"], r["text"], r["extraction"])
+        return
+
+    # 2. Extract, caching as we go
+    writer = cache.open_writer(content_hash, filename=Path(file_path).name)
+    has_text, failed = False, False
+    try:
+        for doc in iter_pdf_pages(file_path):
+            writer.write({"page": doc.metadata["page"], "text": doc.page_content,
+                          "extraction": doc.metadata["extraction"]})
+            has_text = has_text or bool(doc.page_content)
+            failed = failed or doc.metadata.get("ocr_failed", False)
+            yield doc
+    except BaseException:
+        # includes the consumer closing the generator early
+        writer.abort()
+        raise
+
+    if has_text and not failed:
+        writer.commit()
+    else:
+        writer.abort()
+
+
+def load_pdf_with_hybrid_ocr(file_path: str, content_hash: Optional[str] = None) -> list[Document]:
+    """All pages of `iter_pdf_documents`, in page order."""
+    return list(iter_pdf_documents(file_path, content_hash))
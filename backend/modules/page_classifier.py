@@ -0,0 +1,54 @@
+from typing import Optional
+from pypdf import PageObject
+
+TEXT = "text"
+OCR = "ocr"
+BLANK = "blank"
+
+
+def _image_coverage(page: PageObject, draws: list[tuple[float, float]]) -> float:
+    """Fraction of the page area covered by drawn XObjects (capped at 1.0)."""
+    box = page.mediabox
+    page_area = abs(float(box.width) * float(box.height)) or 1.0
+    drawn = sum(abs(w * h) for w, h in draws)
+    return min(drawn / page_area, 1.0)
+
+
+def analyze_page(page: PageObject) -> tuple[str, float, Optional[Exception]]:
+    """
+    Extract a page's digital text and measure how much of it is covered by
+    images. Returns `(text, image_coverage, error)`; on failure the text is
+    empty and the error is returned instead of raised.
+    """
+    draws = []
+
+    def on_operand(op, args, cm, tm):
+        # `Do` paints an XObject; the current matrix scales the unit square to its size
+        if op == b"Do":
+            draws.append((float(cm[0]), float(cm[3])))
+
+    try:
+        text = page.extract_text(visitor_operand_before=on_operand) or ""
+    except Exception as e:
+        return "", 1.0, e
+    return text, _image_coverage(page, draws), None
+
+
+def classify_page(text: str, image_coverage: float, error: Optional[Exception] = None,
+                  min_text_chars: int = 40, min_image_coverage: float = 0.3) -> str:
+    """
+    Decide how a page should be extracted:
+    - `text`: enough digital text, use it as is
+    - `ocr`: little or no usable text but the page is (mostly) an image, or
+      digital extraction failed
+    - `blank`: nothing to extract
+    """
+    if error is not None:
+        return OCR
+
+    chars = len("".join(text.split()))
+    if chars >= min_text_chars:
+        return TEXT
+    if image_coverage >= min_image_coverage:
+        return OCR
+    return TEXT if chars else BLANK
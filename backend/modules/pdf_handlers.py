@@ -1,20 +1,52 @@
+import hashlib
 import os
-import shutil
+import uuid
+from typing import BinaryIO
 from fastapi import UploadFile
-import tempfile
 
 UPLOAD_DIR = "./uploaded_documents"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def stream_to_disk(src: BinaryIO, directory: str = UPLOAD_DIR) -> tuple[str, str]:
+    """
+    Copy an upload to a temporary file in `directory` one chunk at a time,
+    hashing it on the way. Returns `(temp_path, sha256)`; the caller moves the
+    file into place or removes it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, "wb") as f:
+            for block in iter(lambda: src.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(block)
+                f.write(block)
+    except BaseException:
+        discard(temp_path)
+        raise
+    return temp_path, digest.hexdigest()
+
+
+def staged_path(filename: str, directory: str = UPLOAD_DIR) -> str:
+    """A unique path in `directory` where an upload waits until its ingestion job moves it into place."""
+    return os.path.join(directory, f".queued-{uuid.uuid4().hex}-{filename}")
+
+
+def discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
 
 def save_uploaded_files(files: list[UploadFile]) -> list[str]:
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
     file_path = []
 
     for file in files:
-        temp_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(temp_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        file_path.append(temp_path)
+        temp_path, _ = stream_to_disk(file.file)
+        path = os.path.join(UPLOAD_DIR, os.path.basename(file.filename))
+        os.replace(temp_path, path)
+        file_path.append(path)
 
     return file_path
-
-
@@ -0,0 +1,183 @@
+from typing import AsyncIterator, Iterator, List, Optional
+from langchain_core.documents import Document
+from backend.logger import logger
+from backend.modules.metrics import LLMTimingCallback, timed
+from backend.modules.query_handlers import format_sources, query_chain
+
+
+class RAGPipeline:
+    """
+    Single-retrieval ask path: documents are fetched once per question and the
+    same list feeds both the stuff-documents chain and the response sources.
+
+    With an `answer_cache`, the query embedding is computed up front and used
+    both for the semantic cache lookup and for the vector query, so a cache miss
+    still costs a single embed.
+
+    With a `packer` (`ContextPacker`), the retrieved candidates are cut down
+    to a token budget before they reach the prompt; the packed documents are
+    also the ones returned as sources.
+
+    Each stage is timed (see `backend.modules.metrics`): the query embedding,
+    retrieval, and the LLM via a callback on the answer chain.
+
+    With an `llm_upstream` (`resilience.Upstream`), answers are generated
+    under its deadline, hedging and circuit breaker; for `astream` they apply
+    to the first token. The sync `stream` is not guarded.
+    """
+
+    def __init__(self, retriever, answer_chain, answer_cache=None, packer=None, llm_upstream=None):
+        self.retriever = retriever
+        self.answer_chain = answer_chain
+        self.answer_cache = answer_cache
+        self.packer = packer
+        self.llm_upstream = llm_upstream
+
+    def _timed_chain(self):
+        return self.answer_chain.with_config(callbacks=[LLMTimingCallback()])
+
+    def embed(self, query: str) -> List[float]:
+        with timed("embed"):
+            return self.retriever.embeddings.embed_query(query)
+
+    def _pack(self, candidates) -> List[Document]:
+        with timed("pack"):
+            return self.packer.pack(candidates.docs, candidates.scores, relative_floor=candidates.cosine)
+
+    def retrieve(self, query: str, vector: Optional[List[float]] = None) -> List[Document]:
+        if vector is None:
+            vector = self.embed(query)
+        with timed("retrieve"):
+            if self.packer is None:
+                return self.retriever.search_by_vector(vector, query=query)
+            candidates = self.retriever.search_candidates(vector, query=query)
+        return self._pack(candidates)
+
+    def answer(self, query: str, docs: List[Document]) -> str:
+        run = lambda: query_chain(self._timed_chain(), {"input": query, "context": docs})
+        result = self.llm_upstream.call_sync(run, "answer") if self.llm_upstream is not None else run()
+        return result["response"]
+
+    def stream(self, query: str, docs: List[Document]) -> Iterator[str]:
+        for token in self._timed_chain().stream({"input": query, "context": docs}):
+            yield token
+
+    # ------------------------------------------------------
+    # Async path (native ainvoke/astream; sync-only parts go to the thread pool)
+    # ------------------------------------------------------
+    async def aembed(self, query: str) -> List[float]:
+        with timed("embed"):
+            return await self.retriever.embeddings.aembed_query(query)
+
+    async def aretrieve(self, query: str, vector: Optional[List[float]] = None) -> List[Document]:
+        if vector is None:
+            vector = await self.aembed(query)
+        with timed("retrieve"):
+            if self.packer is None:
+                return await self.retriever.asearch_by_vector(vector, query=query)
+            candidates = await self.retriever.asearch_candidates(vector, query=query)
+        return self._pack(candidates)
+
+    async def aanswer(self, query: str, docs: List[Document]) -> str:
+        run = lambda: self._timed_chain().ainvoke({"input": query, "context": docs})
+        result = await (self.llm_upstream.call(run, "answer") if self.llm_upstream is not None else run())
+        return result if isinstance(result, str) else str(result)
+
+    async def astream(self, query: str, docs: List[Document]) -> AsyncIterator[str]:
+        run = lambda: self._timed_chain().astream({"input": query, "context": docs})
+        tokens = self.llm_upstream.stream(run) if self.llm_upstream is not None else run()
+        async for token in tokens:
+            yield token
+
+    # ------------------------------------------------------
+    # Semantic answer cache
+    # ------------------------------------------------------
+    def cached_answer(self, vector: Optional[List[float]]) -> Optional[dict]:
+        if self.answer_cache is None or vector is None:
+            return None
+        hit = self.answer_cache.lookup(vector)
+        if hit is not None:
+            logger.info(f"Semantic answer cache hit (similarity={hit['similarity']:.3f})")
+        return hit
+
+    def cache_generation(self) -> Optional[int]:
+        """Taken before retrieval, so `remember_answer` drops answers whose documents changed meanwhile."""
+        return self.answer_cache.generation() if self.answer_cache is not None else None
+
+    def remember_answer(self, vector: Optional[List[float]], response: str, sources: list[dict],
+                        generation: Optional[int] = None):
+        if self.answer_cache is not None and vector is not None:
+            self.answer_cache.store(vector, response, sources, generation=generation)
+
+    def ask(self, query: str) -> dict:
+        if not query or not query.strip():
+            logger.warning("Empty question passed to RAGPipeline; aborting.")
+            return {"response": "", "sources": []}
+
+        vector = self.embed(query) if self.answer_cache is not None else None
+        cached = self.cached_answer(vector)
+        if cached is not None:
+            return {"response": cached["response"], "sources": cached["sources"]}
+
+        generation = self.cache_generation()
+        docs = self.retrieve(query, vector)
+        result = {
+            "response": self.answer(query, docs),
+            "sources": format_sources(docs),
+        }
+        self.remember_answer(vector, result["response"], result["sources"], generation)
+        return result
+
+    async def aask(self, query: str) -> dict:
+        if not query or not query.strip():
+            logger.warning("Empty question passed to RAGPipeline; aborting.")
+            return {"response": "", "sources": []}
+
+        vector = await self.aembed(query) if self.answer_cache is not None else None
+        cached = self.cached_answer(vector)
+        if cached is not None:
+            return {"response": cached["response"], "sources": cached["sources"]}
+
+        generation = self.cache_generation()
+        docs = await self.aretrieve(query, vector)
+        result = {
+            "response": await self.aanswer(query, docs),
+            "sources": format_sources(docs),
+        }
+        self.remember_answer(vector, result["response"], result["sources"], generation)
+        return result
+
+    async def aask_stream(self, query: str) -> tuple[AsyncIterator[str], list[dict]]:
+        """
+        Streaming `aask`: embeds, checks the answer cache and retrieves before
+        returning, so failures there surface to the caller rather than
+        mid-stream. Returns the answer tokens (the cached answer as a single
+        chunk on a hit) and the sources; the answer is cached once the tokens
+        are exhausted.
+        """
+        if not query or not query.strip():
+            logger.warning("Empty question passed to RAGPipeline; aborting.")
+            return _replay(""), []
+
+        vector = await self.aembed(query) if self.answer_cache is not None else None
+        cached = self.cached_answer(vector)
+        if cached is not None:
+            return _replay(cached["response"]), cached["sources"]
+
+        generation = self.cache_generation()
+        docs = await self.aretrieve(query, vector)
+        sources = format_sources(docs)
+
+        async def tokens():
+            parts = []
+            async for token in self.astream(query, docs):
+                parts.append(token)
+                yield token
+            self.remember_answer(vector, "".join(parts), sources, generation)
+
+        return tokens(), sources
+
+
+async def _replay(response: str) -> AsyncIterator[str]:
+    if response:
+        yield response
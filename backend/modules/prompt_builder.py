@@ -1,28 +1,27 @@
 from langchain.prompts import PromptTemplate
 
 def build_prompt_from_config(rag_prompt: dict) -> PromptTemplate:
+    bullet = "\n- "
     template = f"""
 Role: {rag_prompt['role']}
 
 Style or Tone:
-- {'\n- '.join(rag_prompt['style_or_tone'])}
+- {bullet.join(rag_prompt['style_or_tone'])}
 
 Instruction:
 {rag_prompt['instruction']}
 
 Output Constraints:
-- {'\n- '.join(rag_prompt['output_constraints'])}
+- {bullet.join(rag_prompt['output_constraints'])}
 
 Output Format:
-- {'\n- '.join(rag_prompt['output_format'])}
+- {bullet.join(rag_prompt['output_format'])}
 
-Now, using the following context, answer the user’s query:
-
-
-Query: {{input}}
+Now, using the following context, answer the user’s question.
 """
-
+    # The question itself goes in the human message only; repeating it here
+    # cost tokens on every request.
     return PromptTemplate(
-        input_variables=["input", "context"],
+        input_variables=[],
         template=template
     )
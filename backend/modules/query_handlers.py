@@ -1,4 +1,18 @@
 from backend.logger import logger
+
+
+def format_sources(docs) -> list[dict]:
+    return [
+        {
+            "source": doc.metadata.get("source", ""),
+            "page": doc.metadata.get("page", None),
+            "content": doc.page_content,
+            "extra": doc.metadata,
+        }
+        for doc in docs
+    ]
+
+
 def query_chain(chain, user_input: dict):
     try:
         # Accept multiple incoming keys to be robust
@@ -24,15 +38,7 @@ def query_chain(chain, user_input: dict):
         # result may be a dict depending on chain; keep previous response shape
         return {
             "response": result.get("answer", "") if isinstance(result, dict) else str(result),
-            "sources": [
-                {
-                    "source": doc.metadata.get("source", ""),
-                    "page": doc.metadata.get("page", None),
-                    "content": doc.page_content,
-                    "extra": doc.metadata,
-                }
-                for doc in (result.get("context", []) if isinstance(result, dict) else [])
-            ],
+            "sources": format_sources(result.get("context", []) if isinstance(result, dict) else []),
         }
 
     except Exception:
@@ -0,0 +1,83 @@
+from typing import List, Optional
+import numpy as np
+from langchain_core.documents import Document
+
+
+def maximal_marginal_relevance(query: np.ndarray, candidates: Optional[np.ndarray], k: int,
+                               lambda_mult: float = 0.5, relevance: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Pick `k` candidate rows balancing relevance to the query against
+    similarity to what is already picked. One candidate-by-candidate cosine
+    matrix is computed up front; each step is a vectorized argmax.
+    `relevance` overrides the query cosine (e.g. fused rank scores).
+    No candidates (None or zero rows) picks nothing.
+    """
+    if candidates is None or not len(candidates) or k <= 0:
+        return []
+    matrix = np.asarray(candidates, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        q = np.asarray(query, dtype=np.float32)
+        relevance = matrix @ (q / max(np.linalg.norm(q), 1e-12))
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = matrix @ matrix.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    for _ in range(min(k, len(matrix)) - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        np.maximum(max_similarity, similarity[chosen], out=max_similarity)
+    return selected
+
+
+def _overlap(left: str, right: str, min_overlap: int, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`, cut on whitespace on both sides."""
+    for length in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if (left.endswith(right[:length])
+                and (length == len(left) or left[-length - 1].isspace())
+                and (length == len(right) or right[length].isspace())):
+            return length
+    return 0
+
+
+def _join(a: Document, b: Document, min_overlap: int, max_overlap: int) -> Optional[Document]:
+    """Join two chunks of the same source page if one contains or overlaps the other."""
+    if (a.metadata.get("source"), a.metadata.get("page")) != (b.metadata.get("source"), b.metadata.get("page")):
+        return None
+    first, second = a.page_content, b.page_content
+    if second in first:
+        return a
+    if first in second:
+        return Document(id=a.id, page_content=second, metadata=a.metadata)
+
+    for left, right in ((first, second), (second, first)):
+        length = _overlap(left, right, min_overlap, max_overlap)
+        if length:
+            return Document(id=a.id, page_content=left + right[length:], metadata=a.metadata)
+    return None
+
+
+def merge_adjacent_chunks(docs: List[Document], min_overlap: int = 8, max_overlap: int = 200) -> List[Document]:
+    """
+    Merge chunks from the same source and page whose text overlaps (the
+    splitter's `chunk_overlap`) or is contained in another, so shared text is
+    sent once. A merged chunk keeps the position of its best-ranked part.
+    """
+    merged = list(docs)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                joined = _join(merged[i], merged[j], min_overlap, max_overlap)
+                if joined is not None:
+                    merged[i] = joined
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
@@ -0,0 +1,383 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from backend.config.config import config
+from backend.logger import logger
+from backend.modules.concurrency import get_upstream_executor
+from backend.modules.metrics import UPSTREAM_CALLS, UPSTREAM_CIRCUIT_STATE, UPSTREAM_HEDGES
+from backend.modules.retry import is_retryable
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+PRIMARY, HEDGE = "primary", "hedge"
+# Successful calls needed (per operation) before hedging starts
+MIN_HEDGE_SAMPLES = 20
+_END = object()
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was not made (circuit open) or did not finish in time."""
+
+    def __init__(self, upstream: str, message: str):
+        super().__init__(message)
+        self.upstream = upstream
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class UpstreamTimeout(UpstreamUnavailable, TimeoutError):
+    pass
+
+
+def _is_failure(exc: BaseException) -> bool:
+    """Errors that say the upstream is unhealthy; a rejected request (HTTP 4xx) says it is up."""
+    return isinstance(exc, Exception) and is_retryable(exc)
+
+
+# ==========================================================
+# Circuit breaker
+# ==========================================================
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open: calls
+    fail fast with `CircuitOpenError` for `reset_seconds`. After that one
+    trial call goes through (half-open); its success closes the circuit and
+    its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        UPSTREAM_CIRCUIT_STATE.labels(name).set(CIRCUIT_STATE_VALUES[CLOSED])
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            log = logger.info if state == CLOSED else logger.warning
+            log(f"Circuit for {self.name} {self.state} -> {state}")
+        self.state = state
+        UPSTREAM_CIRCUIT_STATE.labels(self.name).set(CIRCUIT_STATE_VALUES[state])
+
+    def before_call(self):
+        """Raise `CircuitOpenError` unless a call may go to the upstream now."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    raise CircuitOpenError(self.name, f"{self.name} circuit is open")
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trial:
+                    raise CircuitOpenError(self.name, f"{self.name} circuit is half-open, trial call in flight")
+                self._trial = True
+
+    def record(self, failed: bool):
+        with self._lock:
+            self._trial = False
+            if not failed:
+                self.failures = 0
+                self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def abandon(self):
+        """A call was cancelled before it had an outcome: free the half-open trial slot."""
+        with self._lock:
+            self._trial = False
+
+
+class LatencyWindow:
+    """Durations of the most recent successful calls, for the hedge delay."""
+
+    def __init__(self, size: int = 256):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_HEDGE_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+# ==========================================================
+# Guarded calls
+# ==========================================================
+class Upstream:
+    """
+    Deadline, hedging and circuit breaker around the calls to one upstream.
+
+    `call` (async) and `call_sync` run `fn`, a zero-argument callable making
+    the request, and give up after `timeout` seconds with `UpstreamTimeout`.
+    When it is still running after the `hedge_quantile` of recent latencies
+    of the same `operation` (but at least `hedge_min_delay`), a duplicate is
+    sent and whichever answers first wins; the other is cancelled (on the
+    sync path, abandoned to finish in its thread). At most `hedge_max_ratio`
+    of recent calls are hedged, so a slow upstream does not get its load
+    doubled. Timeouts and retryable errors count towards the breaker; while
+    it is open, calls raise `CircuitOpenError` without reaching the upstream.
+    """
+
+    def __init__(self, name: str, timeout: float, hedge: bool = True, hedge_quantile: float = 0.95,
+                 hedge_min_delay: float = 0.02, hedge_max_ratio: float = 0.1,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_ratio = hedge_max_ratio
+        self.breaker = breaker or CircuitBreaker(name)
+        self._latency: dict[str, LatencyWindow] = {}
+        self._hedged: deque[bool] = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def _window(self, operation: str) -> LatencyWindow:
+        with self._lock:
+            return self._latency.setdefault(operation, LatencyWindow())
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """Seconds after which a duplicate of a call is sent, or None if it won't be."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if sum(self._hedged) >= self.hedge_max_ratio * self._hedged.maxlen:
+                return None
+        latency = self._window(operation).quantile(self.hedge_quantile)
+        return None if latency is None else max(self.hedge_min_delay, latency)
+
+    def _admit(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            UPSTREAM_CALLS.labels(self.name, "rejected").inc()
+            raise
+
+    def _settle(self, operation: str, hedged: bool, winner: Optional[str] = None,
+                seconds: Optional[float] = None, outcome: str = "ok", failed: bool = False):
+        self.breaker.record(failed)
+        if seconds is not None:
+            self._window(operation).add(seconds)
+        with self._lock:
+            self._hedged.append(hedged)
+        UPSTREAM_CALLS.labels(self.name, outcome).inc()
+        if hedged:
+            UPSTREAM_HEDGES.labels(self.name, winner or "none").inc()
+
+    def _timeout_error(self) -> UpstreamTimeout:
+        return UpstreamTimeout(self.name, f"{self.name} did not respond within {self.timeout:.1f}s")
+
+    async def call(self, fn: Callable[[], Awaitable], operation: str = "call"):
+        self._admit()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.timeout
+        hedge_delay = self.hedge_delay(operation)
+
+        async def attempt():
+            started = time.perf_counter()
+            result = await fn()
+            return result, time.perf_counter() - started
+
+        attempts = {asyncio.ensure_future(attempt()): PRIMARY}
+        hedged, settled, error = False, False, None
+        try:
+            while attempts:
+                until = deadline if hedged or hedge_delay is None else min(deadline, start + hedge_delay)
+                done, _ = await asyncio.wait(attempts, timeout=max(0.0, until - loop.time()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    which = attempts.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result, seconds = task.result()
+                    settled = True
+                    self._settle(operation, hedged, which, seconds)
+                    return result
+                if done:
+                    continue  # one attempt failed; the other may still answer
+                if loop.time() >= deadline:
+                    break
+                attempts[asyncio.ensure_future(attempt())] = HEDGE
+                hedged = True
+
+            settled = True
+            if attempts:
+                self._settle(operation, hedged, outcome="timeout", failed=True)
+                raise self._timeout_error()
+            self._settle(operation, hedged, outcome="error", failed=_is_failure(error))
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+            if not settled:
+                self.breaker.abandon()
+
+    def call_sync(self, fn: Callable, operation: str = "call"):
+        self._admit()
+        executor = get_upstream_executor()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        hedge_delay = self.hedge_delay(operation)
+
+        def attempt():
+            started = time.perf_counter()
+            result = fn()
+            return result, time.perf_counter() - started
+
+        def submit():
+            # each attempt carries its own copy of the caller's context variables
+            return executor.submit(contextvars.copy_context().run, attempt)
+
+        attempts = {submit(): PRIMARY}
+        hedged, settled, error = False, False, None
+        try:
+            while attempts:
+                until = deadline if hedged or hedge_delay is None else min(deadline, start + hedge_delay)
+                done, _ = concurrent.futures.wait(attempts, timeout=max(0.0, until - time.monotonic()),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    which = attempts.pop(future)
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    result, seconds = future.result()
+                    settled = True
+                    self._settle(operation, hedged, which, seconds)
+                    return result
+                if done:
+                    continue
+                if time.monotonic() >= deadline:
+                    break
+                attempts[submit()] = HEDGE
+                hedged = True
+
+            settled = True
+            if attempts:
+                self._settle(operation, hedged, outcome="timeout", failed=True)
+                raise self._timeout_error()
+            self._settle(operation, hedged, outcome="error", failed=_is_failure(error))
+            raise error
+        finally:
+            for future in attempts:
+                future.cancel()  # only stops attempts still queued
+            if not settled:
+                self.breaker.abandon()
+
+    async def stream(self, make_stream: Callable[[], AsyncIterator], operation: str = "stream") -> AsyncIterator:
+        """
+        Guard a stream: the deadline and hedging apply to its first item (time
+        to first token), and the stream that produces it first is kept. Each
+        later item must then arrive within `timeout` of the one before.
+        """
+        async def first():
+            iterator = make_stream().__aiter__()
+            try:
+                return iterator, await iterator.__anext__()
+            except StopAsyncIteration:
+                return iterator, _END
+
+        iterator, item = await self.call(first, operation)
+        while item is not _END:
+            yield item
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), self.timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                UPSTREAM_CALLS.labels(self.name, "timeout").inc()
+                raise self._timeout_error()
+
+
+
+# ==========================================================
+# Guarded embeddings
+# ==========================================================
+class ResilientEmbeddings:
+    """
+    Wraps an embedding model so query embeddings go through an `Upstream`
+    guard. Document embeddings pass straight through: ingestion has its own
+    retries. Implements LangChain's `Embeddings` methods without subclassing
+    it, so this module stays importable at startup without LangChain.
+    """
+
+    def __init__(self, embeddings, upstream: Upstream):
+        self.embeddings = embeddings
+        self.upstream = upstream
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.upstream.call_sync(lambda: self.embeddings.embed_query(text), "embed_query")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.upstream.call(lambda: self.embeddings.aembed_query(text), "embed_query")
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+UPSTREAM_TIMEOUTS = {
+    "voyage": "EMBED_QUERY_TIMEOUT_SECONDS",
+    "pinecone": "VECTOR_QUERY_TIMEOUT_SECONDS",
+    "groq": "LLM_TIMEOUT_SECONDS",
+}
+_upstreams: dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+_upstream_settings = config
+
+
+def _configure(upstream: Upstream, settings):
+    upstream.timeout = getattr(settings, UPSTREAM_TIMEOUTS[upstream.name])
+    upstream.hedge = settings.HEDGE_ENABLED
+    upstream.hedge_quantile = settings.HEDGE_QUANTILE
+    upstream.hedge_min_delay = settings.HEDGE_MIN_DELAY_SECONDS
+    upstream.hedge_max_ratio = settings.HEDGE_MAX_RATIO
+    upstream.breaker.failure_threshold = settings.BREAKER_FAILURE_THRESHOLD
+    upstream.breaker.reset_seconds = settings.BREAKER_RESET_SECONDS
+
+
+def get_upstream(name: str) -> Upstream:
+    """
+    The process-wide guard for `name` ("voyage", "pinecone" or "groq"),
+    configured from settings on first use; breaker state and latency history
+    outlive pipeline reloads.
+    """
+    with _upstreams_lock:
+        if name not in _upstreams:
+            upstream = Upstream(name, timeout=0.0, breaker=CircuitBreaker(name))
+            _configure(upstream, _upstream_settings)
+            _upstreams[name] = upstream
+        return _upstreams[name]
+
+
+def configure_upstreams(settings):
+    """Apply reloaded deadline, hedging and breaker settings to every guard, keeping their state."""
+    global _upstream_settings
+    with _upstreams_lock:
+        _upstream_settings = settings
+        for upstream in _upstreams.values():
+            _configure(upstream, settings)
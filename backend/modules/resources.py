@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+from dotenv import load_dotenv
+from fastapi import Request
+from backend.config.config import Settings, config
+from backend.config.loader import load_yaml_config
+from backend.logger import logger
+from backend.modules.answer_cache import get_answer_cache
+from backend.modules.llm import PROMPTS_PATH
+
+if TYPE_CHECKING:
+    from backend.modules.pipeline import RAGPipeline
+
+ENV_PATH = ".env"
+
+# Settings a reload applies to the query pipeline. Everything else (the vector
+# index and its API key, ingestion, on-disk stores, pool sizes) is read by
+# process-wide clients at startup and needs a restart to change
+RELOADABLE_SETTINGS = {
+    "VOYAGE_API_KEY", "GROQ_API_KEY",
+    "ANSWER_CACHE_ENABLED", "ANSWER_CACHE_THRESHOLD", "ANSWER_CACHE_SIZE", "ANSWER_CACHE_TTL_SECONDS",
+    "HYBRID_SEARCH", "HYBRID_CANDIDATES", "RRF_K",
+    "RERANK_ENABLED", "RERANK_FETCH_K", "MMR_LAMBDA", "MERGE_ADJACENT_CHUNKS",
+    "CONTEXT_PACKING", "CONTEXT_TOKEN_BUDGET", "CONTEXT_MAX_CHUNKS", "CONTEXT_MIN_RELEVANCE",
+    "RESILIENCE_ENABLED", "EMBED_QUERY_TIMEOUT_SECONDS", "VECTOR_QUERY_TIMEOUT_SECONDS", "LLM_TIMEOUT_SECONDS",
+    "HEDGE_ENABLED", "HEDGE_QUANTILE", "HEDGE_MIN_DELAY_SECONDS", "HEDGE_MAX_RATIO",
+    "BREAKER_FAILURE_THRESHOLD", "BREAKER_RESET_SECONDS",
+}
+
+
+@dataclass
+class Resources:
+    """Query pipeline objects built once and shared across requests."""
+    settings: Settings
+    embeddings: Any
+    vector_store: Any
+    retriever: Any
+    answer_chain: Any
+    pipeline: "RAGPipeline"
+
+
+# ==========================================================
+# Registry
+# ==========================================================
+class ResourceRegistry:
+    """
+    Builds the embedder, vector store, retriever and LLM chain once and hands
+    the same objects to every request. When `prompts.yaml` or `.env` change on
+    disk, the next request rebuilds them and swaps the new set in atomically.
+    Only `RELOADABLE_SETTINGS` take effect on a reload; changes to the others
+    are logged and wait for a restart.
+    """
+
+    def __init__(self, prompts_path: str = PROMPTS_PATH, env_path: str = ENV_PATH,
+                 check_interval: float = 5.0):
+        self.prompts_path = Path(prompts_path)
+        self.env_path = Path(env_path)
+        self.check_interval = check_interval
+        self._resources: Optional[Resources] = None
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self.async_index = None
+        self._embedding_cache = None
+
+    @property
+    def embedding_cache(self):
+        """Query-embedding cache; outlives reloads since entries are keyed on the model name too."""
+        with self._lock:
+            if self._embedding_cache is None:
+                # embedding_cache pulls in LangChain's Embeddings base class, so not at startup
+                from backend.modules.embedding_cache import EmbeddingCache
+
+                self._embedding_cache = EmbeddingCache(
+                    max_entries=config.EMBED_CACHE_SIZE,
+                    ttl_seconds=config.EMBED_CACHE_TTL_SECONDS,
+                    persist_path=config.EMBED_CACHE_PATH or None,
+                    max_disk_entries=config.EMBED_CACHE_DISK_SIZE,
+                )
+            return self._embedding_cache
+
+    def _current_fingerprint(self):
+        return tuple(
+            p.stat().st_mtime_ns if p.exists() else None
+            for p in (self.prompts_path, self.env_path)
+        )
+
+    def _build(self, settings: Settings) -> Resources:
+        # The client libraries are imported here rather than at module level so
+        # the app starts serving (health checks, uploads) while they load
+        from langchain_voyageai import VoyageAIEmbeddings
+        from backend.modules.bm25_index import get_bm25_index
+        from backend.modules.chunk_store import get_chunk_store
+        from backend.modules.context_packer import ContextPacker
+        from backend.modules.embedding_cache import CachedEmbeddings
+        from backend.modules.llm import get_answer_chain
+        from backend.modules.load_vectorstore import get_pinecone_index
+        from backend.modules.pipeline import RAGPipeline
+        from backend.modules.resilience import ResilientEmbeddings, get_upstream
+        from backend.modules.retriever import HybridRetriever, PineconeRetriever, RerankingRetriever
+
+        os.environ.setdefault("PINECONE_API_KEY", settings.PINECONE_API_KEY)
+
+        voyage = VoyageAIEmbeddings(
+            voyage_api_key=settings.VOYAGE_API_KEY,
+            model="voyage-3.5"
+        )
+        # deadlines, hedging and circuit breakers on every upstream call of the
+        # query path; cache hits never reach them
+        def upstream(name: str):
+            return get_upstream(name) if settings.RESILIENCE_ENABLED else None
+
+        guarded = ResilientEmbeddings(voyage, upstream("voyage")) if settings.RESILIENCE_ENABLED else voyage
+        embeddings = CachedEmbeddings(guarded, self.embedding_cache, model_name=voyage.model)
+        # Same index the upload path writes to (created if missing)
+        vector_store = get_pinecone_index()
+        # with packing, k adapts per question up to CONTEXT_MAX_CHUNKS
+        top_k = settings.CONTEXT_MAX_CHUNKS if settings.CONTEXT_PACKING else 3
+        retriever = PineconeRetriever(
+            index=vector_store,
+            embeddings=embeddings,
+            top_k=top_k,
+            async_index=self.async_index,
+            upstream=upstream("pinecone"),
+            chunk_store=get_chunk_store(),
+        )
+        if settings.HYBRID_SEARCH:
+            retriever = HybridRetriever(
+                dense=retriever,
+                lexical=get_bm25_index(),
+                top_k=top_k,
+                candidates=settings.HYBRID_CANDIDATES,
+                rrf_k=settings.RRF_K,
+            )
+        if settings.RERANK_ENABLED:
+            retriever = RerankingRetriever(
+                base=retriever,
+                top_k=top_k,
+                fetch_k=settings.RERANK_FETCH_K,
+                mmr_lambda=settings.MMR_LAMBDA,
+                merge_adjacent=settings.MERGE_ADJACENT_CHUNKS,
+            )
+        prompt_config = load_yaml_config(self.prompts_path)
+        answer_chain = get_answer_chain(prompt_config=prompt_config, settings=settings)
+
+        return Resources(
+            settings=settings,
+            embeddings=embeddings,
+            vector_store=vector_store,
+            retriever=retriever,
+            answer_chain=answer_chain,
+            pipeline=RAGPipeline(
+                retriever,
+                answer_chain,
+                answer_cache=get_answer_cache() if settings.ANSWER_CACHE_ENABLED else None,
+                packer=ContextPacker(
+                    budget_tokens=settings.CONTEXT_TOKEN_BUDGET,
+                    max_chunks=settings.CONTEXT_MAX_CHUNKS,
+                    min_relevance=settings.CONTEXT_MIN_RELEVANCE,
+                ) if settings.CONTEXT_PACKING else None,
+                llm_upstream=upstream("groq"),
+            ),
+        )
+
+    def load(self) -> Resources:
+        """(Re)build every resource and swap them in."""
+        with self._lock:
+            fingerprint = self._current_fingerprint()
+            reload = self._resources is not None
+            if reload:
+                load_dotenv(self.env_path, override=True)
+                settings = Settings()
+            else:
+                settings = config
+            resources = self._build(settings)
+            if reload:
+                self._apply(settings)
+            self._resources = resources
+            self._fingerprint = fingerprint
+            self._last_check = time.monotonic()
+            logger.info("Query pipeline resources loaded")
+            return self._resources
+
+    def _apply(self, settings: Settings):
+        """Push reloaded settings into the process-wide clients the new pipeline shares."""
+        from backend.modules.resilience import configure_upstreams
+
+        configure_upstreams(settings)
+        # answers produced with the old prompt/model are no longer valid
+        get_answer_cache().configure(
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            max_entries=settings.ANSWER_CACHE_SIZE,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        )
+        changed = sorted(
+            key for key in Settings.model_fields
+            if key not in RELOADABLE_SETTINGS and getattr(settings, key) != getattr(config, key)
+        )
+        if changed:
+            logger.warning(f"Settings changed in {self.env_path} that need a restart to apply: {', '.join(changed)}")
+
+    def ensure_loaded(self) -> Resources:
+        """Build the resources unless they already are (by startup warmup or another request)."""
+        with self._lock:
+            if self._resources is not None:
+                return self._resources
+            return self.load()
+
+    def get(self) -> Resources:
+        """Return the shared resources, reloading first if config or prompts changed."""
+        resources = self._resources
+        if resources is None:
+            return self.ensure_loaded()
+
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return resources
+
+        self._last_check = now
+        if self._current_fingerprint() != self._fingerprint:
+            logger.info("Config or prompts changed on disk, reloading query pipeline")
+            try:
+                return self.load()
+            except Exception:
+                # keep serving with the previous resources
+                logger.exception("Reloading query pipeline failed")
+        return resources
+
+    def close(self):
+        with self._lock:
+            self._resources = None
+            self._fingerprint = None
+            if self._embedding_cache is not None:
+                self._embedding_cache.close()
+                self._embedding_cache = None
+
+    async def astart(self):
+        """Attach the native asyncio Pinecone client once the event loop is running."""
+        from backend.modules.load_vectorstore import get_pinecone_async_index
+
+        self.async_index = await get_pinecone_async_index()
+        if self._resources is not None:
+            retriever = self._resources.retriever
+            getattr(retriever, "dense", retriever).async_index = self.async_index
+
+    async def aclose(self):
+        self.close()
+        if self.async_index is not None:
+            from backend.modules.load_vectorstore import close_pinecone_async_index
+
+            await close_pinecone_async_index()
+        self.async_index = None
+
+
+# ==========================================================
+# FastAPI dependency
+# ==========================================================
+def get_resources(request: Request) -> Resources:
+    return request.app.state.resources.get()
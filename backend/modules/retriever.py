@@ -1,23 +1,276 @@
+import asyncio
+from dataclasses import dataclass
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
 from pydantic import BaseModel, Field
 from typing import List, Any, Optional
+import numpy as np
+from backend.modules.concurrency import get_sync_executor, run_sync
+from backend.modules.metrics import timed
+from backend.modules.rerank import maximal_marginal_relevance, merge_adjacent_chunks
+
+
+@dataclass
+class Candidates:
+    """
+    Ranked documents with their relevance scores and, when requested, their
+    stored vectors. `cosine` is False when the scores are fused ranks rather
+    than similarities to the query, so they cannot be compared across hits
+    found by different retrievers.
+    """
+    docs: List[Document]
+    scores: np.ndarray
+    values: Optional[np.ndarray] = None
+    cosine: bool = True
+
+
+def vector_matrix(rows) -> np.ndarray:
+    """Stack vectors into a float32 matrix; no rows gives a zero-row matrix, not a 1-D array."""
+    return np.array(rows, dtype=np.float32) if len(rows) else np.empty((0, 0), dtype=np.float32)
+
 
 class PineconeRetriever(BaseRetriever, BaseModel):
     index: Any
     embeddings: Any = Field(...)  # declare as a field
     top_k: int = 3
+    async_index: Any = None  # native asyncio index; falls back to the thread pool when unset
+    upstream: Any = None  # `resilience.Upstream` guarding index calls (deadline, hedging, breaker)
+    chunk_store: Any = None  # `ChunkStore` holding chunk text the index metadata does not carry
 
     def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
-        vector = self.embeddings.embed_query(query)
-        response = self.index.query(vector=vector, top_k=self.top_k, include_metadata=True)
-        return [
-            Document(
-                page_content=match["metadata"].get("text", ""),
-                metadata=match["metadata"]
-            )
-            for match in response["matches"]
-        ]
+        return self.search_by_vector(self.embeddings.embed_query(query))
+
+    def search_by_vector(self, vector: List[float], query: Optional[str] = None,
+                         top_k: Optional[int] = None) -> List[Document]:
+        """Query the index with an already computed query embedding."""
+        return self.search_candidates(vector, query, top_k).docs
+
+    def search_candidates(self, vector: List[float], query: Optional[str] = None,
+                          top_k: Optional[int] = None, include_values: bool = False) -> Candidates:
+        def query():
+            return self.index.query(vector=vector, top_k=top_k or self.top_k,
+                                    include_metadata=True, include_values=include_values)
+
+        with timed("vector_query"):
+            response = self.upstream.call_sync(query, "query") if self.upstream is not None else query()
+        return self._to_candidates(response, include_values)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return await self.asearch_by_vector(await self.embeddings.aembed_query(query))
+
+    async def asearch_by_vector(self, vector: List[float], query: Optional[str] = None,
+                                top_k: Optional[int] = None) -> List[Document]:
+        return (await self.asearch_candidates(vector, query, top_k)).docs
+
+    async def asearch_candidates(self, vector: List[float], query: Optional[str] = None,
+                                 top_k: Optional[int] = None, include_values: bool = False) -> Candidates:
+        kwargs = dict(vector=vector, top_k=top_k or self.top_k, include_metadata=True, include_values=include_values)
+        if self.async_index is not None:
+            query = lambda: self.async_index.query(**kwargs)
+        else:
+            query = lambda: run_sync(self.index.query, **kwargs)
+        with timed("vector_query"):
+            response = await (self.upstream.call(query, "query") if self.upstream is not None else query())
+        if self.chunk_store is not None:
+            # the chunk store is SQLite; keep its read off the event loop
+            return await run_sync(self._to_candidates, response, include_values)
+        return self._to_candidates(response, include_values)
+
+    def _to_candidates(self, response, include_values: bool) -> Candidates:
+        matches = response["matches"]
+        docs = to_documents([(match["id"], match["metadata"]) for match in matches], self.chunk_store)
+        scores = np.array([match["score"] for match in matches], dtype=np.float32)
+        values = vector_matrix([match["values"] for match in matches]) if include_values else None
+        return Candidates(docs, scores, values)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> dict[str, float]:
+    """Merge ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in. Best first."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def to_documents(items: List[tuple[str, dict]], chunk_store=None) -> List[Document]:
+    """
+    Documents for `(vector_id, metadata)` pairs from the index. Chunks whose
+    metadata has no text (everything ingested with a chunk store) get it from
+    `chunk_store`, all in one lookup.
+    """
+    texts = {}
+    if chunk_store is not None:
+        without_text = [vid for vid, metadata in items if "text" not in metadata]
+        if without_text:
+            with timed("chunk_text"):
+                texts = chunk_store.texts(without_text)
+    return [
+        Document(id=vid, page_content=metadata.get("text", texts.get(vid, "")), metadata=metadata)
+        for vid, metadata in items
+    ]
+
+
+def fetch_documents(index, ids: List[str], chunk_store=None) -> tuple[List[Document], List[List[float]]]:
+    """Load chunks (and their vectors) by id from the index (Pinecone `fetch` or the local index)."""
+    if not ids:
+        return [], []
+    response = index.fetch(ids=list(ids))
+    vectors = response["vectors"] if isinstance(response, dict) else response.vectors
+    items, values = [], []
+    for vid, vector in vectors.items():
+        items.append((vid, vector["metadata"] or {}))
+        values.append(vector["values"])
+    return to_documents(items, chunk_store), values
+
+
+class HybridRetriever(BaseRetriever, BaseModel):
+    """
+    Dense + BM25 retrieval merged with reciprocal rank fusion.
+
+    Both retrievers fetch `candidates` results in parallel; the fused top
+    `top_k` are returned. Lexical-only hits are loaded from the index by id.
+    """
+    dense: PineconeRetriever
+    lexical: Any  # BM25Index
+    top_k: int = 3
+    candidates: int = 10
+    rrf_k: int = 60
+
+    @property
+    def embeddings(self):
+        return self.dense.embeddings
+
+    @property
+    def index(self):
+        return self.dense.index
+
+    def _fuse(self, dense: Candidates, lexical_hits, top_k: int, include_values: bool) -> Candidates:
+        by_id = {doc.id: i for i, doc in enumerate(dense.docs)}
+        fused = reciprocal_rank_fusion(
+            [[doc.id for doc in dense.docs], [vid for vid, _ in lexical_hits]], k=self.rrf_k
+        )
+        ranked = list(fused)[:top_k]
+        missing = [vid for vid in ranked if vid not in by_id]
+        fetch = lambda: fetch_documents(self.index, missing, self.dense.chunk_store)
+        if missing and self.dense.upstream is not None:
+            fetched_docs, fetched_values = self.dense.upstream.call_sync(fetch, "fetch")
+        else:
+            fetched_docs, fetched_values = fetch()
+        fetched = {doc.id: (doc, values) for doc, values in zip(fetched_docs, fetched_values)}
+
+        docs, values = [], []
+        for vid in ranked:
+            if vid in by_id:
+                docs.append(dense.docs[by_id[vid]])
+                values.append(dense.values[by_id[vid]] if include_values else None)
+            elif vid in fetched:  # ids the index no longer has (e.g. deleted mid-query) are dropped
+                docs.append(fetched[vid][0])
+                values.append(fetched[vid][1])
+        scores = np.array([fused[doc.id] for doc in docs], dtype=np.float32)
+        if len(scores):
+            scores /= scores.max()  # best fused rank = 1.0
+        return Candidates(docs, scores, vector_matrix(values) if include_values else None, cosine=False)
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.search_by_vector(self.embeddings.embed_query(query), query=query)
+
+    def search_by_vector(self, vector: List[float], query: Optional[str] = None,
+                         top_k: Optional[int] = None) -> List[Document]:
+        return self.search_candidates(vector, query, top_k).docs
+
+    def search_candidates(self, vector: List[float], query: Optional[str] = None,
+                          top_k: Optional[int] = None, include_values: bool = False) -> Candidates:
+        top_k = top_k or self.top_k
+        if not query:
+            return self.dense.search_candidates(vector, top_k=top_k, include_values=include_values)
+        lexical = get_sync_executor().submit(self.lexical.search, query, max(self.candidates, top_k))
+        dense = self.dense.search_candidates(vector, top_k=max(self.candidates, top_k), include_values=include_values)
+        return self._fuse(dense, lexical.result(), top_k, include_values)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return await self.asearch_by_vector(await self.embeddings.aembed_query(query), query=query)
+
+    async def asearch_by_vector(self, vector: List[float], query: Optional[str] = None,
+                                top_k: Optional[int] = None) -> List[Document]:
+        return (await self.asearch_candidates(vector, query, top_k)).docs
+
+    async def asearch_candidates(self, vector: List[float], query: Optional[str] = None,
+                                 top_k: Optional[int] = None, include_values: bool = False) -> Candidates:
+        top_k = top_k or self.top_k
+        if not query:
+            return await self.dense.asearch_candidates(vector, top_k=top_k, include_values=include_values)
+        dense, lexical_hits = await asyncio.gather(
+            self.dense.asearch_candidates(vector, top_k=max(self.candidates, top_k), include_values=include_values),
+            run_sync(self.lexical.search, query, max(self.candidates, top_k)),
+        )
+        dense_ids = {doc.id for doc in dense.docs}
+        if any(vid not in dense_ids for vid, _ in lexical_hits):
+            # fetch is blocking on both backends; keep it off the event loop
+            return await run_sync(self._fuse, dense, lexical_hits, top_k, include_values)
+        return self._fuse(dense, lexical_hits, top_k, include_values)
+
+
+class RerankingRetriever(BaseRetriever, BaseModel):
+    """
+    Over-fetch, then rerank: `fetch_k` candidates (with their vectors) come
+    from `base`, Maximal Marginal Relevance picks `top_k` that are relevant
+    but not redundant, and overlapping neighbouring chunks of the same page
+    are merged so their shared text is sent to the LLM once.
+    """
+    base: Any  # PineconeRetriever or HybridRetriever
+    top_k: int = 3
+    fetch_k: int = 20
+    mmr_lambda: float = 0.5
+    merge_adjacent: bool = True
+
+    @property
+    def embeddings(self):
+        return self.base.embeddings
+
+    @property
+    def dense(self) -> PineconeRetriever:
+        return getattr(self.base, "dense", self.base)
+
+    def rerank(self, vector: List[float], candidates: Candidates, top_k: int) -> Candidates:
+        """MMR-picked (and merged) candidates, in pick order, each keeping its relevance score."""
+        picked = maximal_marginal_relevance(
+            np.asarray(vector, dtype=np.float32), candidates.values, top_k,
+            lambda_mult=self.mmr_lambda, relevance=candidates.scores,
+        )
+        docs = [candidates.docs[i] for i in picked]
+        score_of = {candidates.docs[i].id: candidates.scores[i] for i in picked}
+        if self.merge_adjacent:
+            docs = merge_adjacent_chunks(docs)  # a merged chunk keeps the id of its best-ranked part
+        return Candidates(docs, np.array([score_of[doc.id] for doc in docs], dtype=np.float32),
+                          cosine=candidates.cosine)
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.search_by_vector(self.embeddings.embed_query(query), query=query)
+
+    def search_by_vector(self, vector: List[float], query: Optional[str] = None,
+                         top_k: Optional[int] = None) -> List[Document]:
+        return self.search_candidates(vector, query, top_k).docs
+
+    def search_candidates(self, vector: List[float], query: Optional[str] = None,
+                          top_k: Optional[int] = None, include_values: bool = False) -> Candidates:
+        top_k = top_k or self.top_k
+        candidates = self.base.search_candidates(vector, query, max(self.fetch_k, top_k), include_values=True)
+        return self.rerank(vector, candidates, top_k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return await self.asearch_by_vector(await self.embeddings.aembed_query(query), query=query)
+
+    async def asearch_by_vector(self, vector: List[float], query: Optional[str] = None,
+                                top_k: Optional[int] = None) -> List[Document]:
+        return (await self.asearch_candidates(vector, query, top_k)).docs
+
+    async def asearch_candidates(self, vector: List[float], query: Optional[str] = None,
+                                 top_k: Optional[int] = None, include_values: bool = False) -> Candidates:
+        top_k = top_k or self.top_k
+        candidates = await self.base.asearch_candidates(vector, query, max(self.fetch_k, top_k), include_values=True)
+        return self.rerank(vector, candidates, top_k)
+
 
 class SimpleRetriever(BaseRetriever):
     tags: Optional[List[str]] = Field(default_factory=list)
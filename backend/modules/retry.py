@@ -0,0 +1,31 @@
+import random
+from typing import Optional
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "ServiceUnavailableError", "APIConnectionError", "Timeout",
+    "TryAgain", "ServerError", "InternalServerError", "APITimeoutError",
+}
+
+
+def status_code_of(exc: Exception) -> Optional[int]:
+    for attr in ("status_code", "http_status", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """429s, 5xx and transport errors are worth retrying; anything else is a bad request."""
+    status = status_code_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with jitter for the given (0-based) retry attempt."""
+    return min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
@@ -0,0 +1,180 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from backend.logger import logger
+from backend.modules.retry import backoff_delay, is_retryable
+
+# Pinecone rejects upsert requests over 2 MB or 1000 vectors
+PINECONE_MAX_REQUEST_BYTES = 2 * 1024 * 1024
+PINECONE_MAX_BATCH_VECTORS = 1000
+
+# JSON-encoded float32 values run up to ~20 characters plus a separator
+BYTES_PER_VALUE = 22
+BYTES_PER_VECTOR_OVERHEAD = 64
+
+
+def estimate_vector_bytes(vector: tuple) -> int:
+    """Approximate serialized size of one `(id, values, metadata)` upsert item."""
+    vector_id, values, metadata = vector
+    meta_bytes = len(json.dumps(metadata, ensure_ascii=False).encode("utf-8")) if metadata else 0
+    return len(vector_id) + BYTES_PER_VALUE * len(values) + meta_bytes + BYTES_PER_VECTOR_OVERHEAD
+
+
+class PartialUpsertError(Exception):
+    """The index acknowledged fewer vectors than were sent; upserts are idempotent, so resend."""
+
+
+@dataclass
+class UpsertResult:
+    upserted: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+class UpsertPipeline:
+    """
+    Parallel, payload-size-aware upserts.
+
+    Vectors are grouped into requests by estimated serialized size (metadata
+    included) rather than a fixed count, so long chunks never push a request
+    over the index's payload limit while short ones still fill it. Requests
+    run concurrently over the index's pooled connections; 429/5xx/transport
+    errors and short acknowledgements are retried with backoff, and a request
+    rejected for any other reason is split in half until the bad vector is
+    isolated. Vectors that cannot be written are reported in
+    `UpsertResult.failed` instead of aborting the whole document.
+
+    `update_metadata` changes metadata of vectors already in the index
+    without resending their values, one request per vector (Pinecone's
+    update takes a single id), with the same concurrency and retries.
+    """
+
+    def __init__(self, index, max_concurrency: int = 4,
+                 max_request_bytes: int = PINECONE_MAX_REQUEST_BYTES,
+                 max_batch_vectors: int = PINECONE_MAX_BATCH_VECTORS,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.index = index
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_request_bytes = max_request_bytes
+        self.max_batch_vectors = min(max_batch_vectors, PINECONE_MAX_BATCH_VECTORS)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+
+    def make_batches(self, vectors: list[tuple]) -> tuple[list[list[tuple]], dict[str, str]]:
+        """Group vectors into requests under the byte and count limits; returns `(batches, oversized)`."""
+        batches, current, size = [], [], 0
+        oversized = {}
+        for vector in vectors:
+            n = estimate_vector_bytes(vector)
+            if n > self.max_request_bytes:
+                oversized[vector[0]] = f"vector payload of ~{n} bytes exceeds the {self.max_request_bytes} byte request limit"
+                continue
+            if current and (size + n > self.max_request_bytes or len(current) >= self.max_batch_vectors):
+                batches.append(current)
+                current, size = [], 0
+            current.append(vector)
+            size += n
+        if current:
+            batches.append(current)
+        return batches, oversized
+
+    def _retry(self, call: Callable[[], None], what: str):
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except Exception as e:
+                retryable = isinstance(e, PartialUpsertError) or is_retryable(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                logger.warning(f"{what} failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+                self._sleep(delay)
+                attempt += 1
+
+    def _call_with_retry(self, batch: list[tuple]):
+        def call():
+            response = self.index.upsert(vectors=batch)
+            count = _upserted_count(response)
+            if count is not None and count < len(batch):
+                raise PartialUpsertError(f"{count} of {len(batch)} vectors acknowledged")
+
+        self._retry(call, f"Upsert of {len(batch)} vectors")
+
+    def _upsert_batch(self, batch: list[tuple], failed: dict[str, str]) -> list[str]:
+        """Upsert one request; returns the ids that were written."""
+        try:
+            self._call_with_retry(batch)
+        except Exception as e:
+            if len(batch) > 1 and not (isinstance(e, PartialUpsertError) or is_retryable(e)):
+                mid = len(batch) // 2
+                return self._upsert_batch(batch[:mid], failed) + self._upsert_batch(batch[mid:], failed)
+            for vector in batch:
+                failed[vector[0]] = str(e)
+            return []
+        return [vector[0] for vector in batch]
+
+    def upsert(self, vectors: list[tuple], on_batch: Optional[Callable[[list[str]], None]] = None) -> UpsertResult:
+        """
+        Upsert `(id, values, metadata)` tuples. `on_batch`, if given, is called
+        from the calling thread with the ids of each request once it is written.
+        """
+        batches, failed = self.make_batches(vectors)
+        result = UpsertResult(failed=failed)
+        if not batches:
+            return result
+
+        pool = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches)), thread_name_prefix="upsert")
+        try:
+            futures = [pool.submit(self._upsert_batch, batch, failed) for batch in batches]
+            for future in as_completed(futures):
+                ids = future.result()
+                result.upserted.extend(ids)
+                if ids and on_batch:
+                    on_batch(ids)
+        finally:
+            # on cancellation (on_batch raised) drop requests that have not started
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        if failed:
+            logger.error(f"{len(failed)} of {len(vectors)} vectors could not be upserted")
+        return result
+
+
+    def update_metadata(self, updates: list[tuple[str, dict]]) -> UpsertResult:
+        """Merge `(id, metadata)` updates into vectors already in the index."""
+        result = UpsertResult()
+        if not updates:
+            return result
+
+        def update(vector_id: str, metadata: dict):
+            try:
+                self._retry(lambda: self.index.update(id=vector_id, set_metadata=metadata),
+                            f"Metadata update of {vector_id}")
+            except Exception as e:
+                return vector_id, str(e)
+            return vector_id, None
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(updates)),
+                                thread_name_prefix="upsert") as pool:
+            for vector_id, error in pool.map(lambda u: update(*u), updates):
+                if error is None:
+                    result.upserted.append(vector_id)
+                else:
+                    result.failed[vector_id] = error
+
+        if result.failed:
+            logger.error(f"{len(result.failed)} of {len(updates)} metadata updates failed")
+        return result
+
+
+def _upserted_count(response) -> Optional[int]:
+    if response is None:
+        return None
+    if isinstance(response, dict):
+        return response.get("upserted_count")
+    return getattr(response, "upserted_count", None)
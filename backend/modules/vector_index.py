@@ -0,0 +1,315 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Iterator, Optional, Protocol
+import numpy as np
+from backend.config.config import config
+
+# ==========================================================
+# Lazy Globals
+# ==========================================================
+_local_index = None
+
+
+class VectorIndex(Protocol):
+    """
+    The subset of the Pinecone `Index` API the app relies on. Any backend
+    returned by `get_pinecone_index` must provide it; responses are dicts (or
+    Pinecone's dict-like response objects).
+    """
+
+    def upsert(self, vectors, **kwargs) -> Any: ...
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = False,
+              include_values: bool = False, filter: Optional[dict] = None, **kwargs) -> Any: ...
+
+    def update(self, id: str, set_metadata: Optional[dict] = None, **kwargs) -> Any: ...
+
+    def delete(self, ids=None, delete_all: bool = False, filter: Optional[dict] = None, **kwargs) -> Any: ...
+
+    def list(self, prefix: Optional[str] = None, **kwargs) -> Iterator[list[str]]: ...
+
+
+# ==========================================================
+# Metadata filters (Pinecone syntax)
+# ==========================================================
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$exists": lambda value, arg: (value is not None) == bool(arg),
+}
+
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """Evaluate a Pinecone metadata filter (`{"page": {"$gte": 3}, "$or": [...]}`) against one record."""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, arg in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                try:
+                    if not _OPERATORS[op](value, arg):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+# ==========================================================
+# Local backend
+# ==========================================================
+class LocalVectorIndex:
+    """
+    In-process cosine index, a drop-in for the Pinecone `Index`.
+
+    Unit-normalized float32 vectors live in a memory-mapped file (one row per
+    slot), ids and metadata in a SQLite sidecar, so the index survives
+    restarts without loading anything up front. Queries are a single
+    matrix-vector product plus `argpartition`, exact rather than approximate.
+    Deleted slots are reused by later upserts; the file doubles in size when
+    it runs out of slots.
+    """
+
+    def __init__(self, path: str, dimension: int = 1024, initial_capacity: int = 1024):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self._matrix_path = os.path.join(path, "vectors.f32")
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "slot INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, metadata TEXT NOT NULL)"
+        )
+        row = self._db.execute("SELECT value FROM settings WHERE key = 'dimension'").fetchone()
+        if row is None:
+            self._db.execute("INSERT INTO settings (key, value) VALUES ('dimension', ?)", (str(dimension),))
+        elif int(row[0]) != dimension:
+            raise ValueError(f"Local index at {path} has dimension {row[0]}, expected {dimension}")
+        self._db.commit()
+
+        rows = self._db.execute("SELECT slot, id, metadata FROM vectors").fetchall()
+        on_disk = os.path.getsize(self._matrix_path) // (4 * dimension) if os.path.exists(self._matrix_path) else 0
+        capacity = max(initial_capacity, on_disk, max((r[0] for r in rows), default=-1) + 1)
+
+        self._ids: list[Optional[str]] = [None] * capacity
+        self._metadata: list[Optional[dict]] = [None] * capacity
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._slot_of: dict[str, int] = {}
+        for slot, vector_id, metadata in rows:
+            self._ids[slot] = vector_id
+            self._metadata[slot] = json.loads(metadata)
+            self._alive[slot] = True
+            self._slot_of[vector_id] = slot
+        self._size = max(self._slot_of.values(), default=-1) + 1  # high-water mark
+        self._free = [s for s in range(self._size - 1, -1, -1) if not self._alive[s]]
+        # filter masks are reused until the next write
+        self._filter_masks: dict[str, np.ndarray] = {}
+        self._open_matrix(capacity)
+
+    def _open_matrix(self, capacity: int):
+        needed = capacity * self.dimension * 4
+        with open(self._matrix_path, "ab") as f:
+            if f.tell() < needed:
+                f.truncate(needed)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+",
+                                 shape=(capacity, self.dimension))
+
+    def _grow(self, needed: int):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self._matrix.flush()
+        self._open_matrix(new_capacity)
+        extra = new_capacity - capacity
+        self._ids.extend([None] * extra)
+        self._metadata.extend([None] * extra)
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self._grow(self._size + 1)
+        self._size += 1
+        return self._size - 1
+
+    @staticmethod
+    def _items(vectors):
+        for item in vectors:
+            if isinstance(item, dict):
+                yield item["id"], item["values"], item.get("metadata") or {}
+            else:
+                vector_id, values, *rest = item
+                yield vector_id, values, (rest[0] if rest else None) or {}
+
+    def _normalize(self, values) -> np.ndarray:
+        vector = np.asarray(values, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dimension:
+            raise ValueError(f"Vector dimension {vector.shape[0]} does not match index dimension {self.dimension}")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _filter_mask(self, filter: dict) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True, default=str)
+        mask = self._filter_masks.get(key)
+        if mask is None:
+            mask = self._alive[:self._size].copy()
+            for slot in np.flatnonzero(mask):
+                mask[slot] = matches_filter(self._metadata[slot], filter)
+            if len(self._filter_masks) >= 64:
+                self._filter_masks.clear()
+            self._filter_masks[key] = mask
+        return mask
+
+    # ---------------- Pinecone Index API ----------------
+    def upsert(self, vectors, namespace: Optional[str] = None, **kwargs) -> dict:
+        rows = []
+        with self._lock:
+            for vector_id, values, metadata in self._items(vectors):
+                vector = self._normalize(values)
+                slot = self._slot_of.get(vector_id)
+                if slot is None:
+                    slot = self._allocate()
+                    self._slot_of[vector_id] = slot
+                    self._ids[slot] = vector_id
+                    self._alive[slot] = True
+                self._matrix[slot] = vector
+                self._metadata[slot] = dict(metadata)
+                rows.append((slot, vector_id, json.dumps(metadata, ensure_ascii=False)))
+            self._filter_masks.clear()
+            # vectors reach the file before the sidecar refers to them
+            self._matrix.flush()
+            self._db.executemany("INSERT OR REPLACE INTO vectors (slot, id, metadata) VALUES (?, ?, ?)", rows)
+            self._db.commit()
+        return {"upserted_count": len(rows)}
+
+    def query(self, vector=None, top_k: int = 10, include_metadata: bool = False,
+              include_values: bool = False, filter: Optional[dict] = None,
+              namespace: Optional[str] = None, id: Optional[str] = None, **kwargs) -> dict:
+        with self._lock:
+            if vector is None:
+                if id not in self._slot_of:
+                    return {"matches": []}
+                query = np.array(self._matrix[self._slot_of[id]])
+            else:
+                query = self._normalize(vector)
+
+            n = self._size
+            candidates = self._filter_mask(filter) if filter else self._alive[:n]
+            count = int(candidates.sum())
+            if not count or top_k <= 0:
+                return {"matches": []}
+
+            scores = self._matrix[:n] @ query
+            scores = np.where(candidates, scores, -np.inf)
+            k = min(top_k, count)
+            top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+            top = top[np.argsort(-scores[top], kind="stable")][:k]
+
+            matches = []
+            for slot in top:
+                match = {"id": self._ids[slot], "score": float(scores[slot])}
+                if include_metadata:
+                    match["metadata"] = dict(self._metadata[slot])
+                if include_values:
+                    match["values"] = self._matrix[slot].tolist()
+                matches.append(match)
+        return {"matches": matches, "namespace": namespace or ""}
+
+    def fetch(self, ids, namespace: Optional[str] = None, **kwargs) -> dict:
+        with self._lock:
+            found = {}
+            for vector_id in ids:
+                slot = self._slot_of.get(vector_id)
+                if slot is not None:
+                    found[vector_id] = {
+                        "id": vector_id,
+                        "values": self._matrix[slot].tolist(),
+                        "metadata": dict(self._metadata[slot]),
+                    }
+        return {"vectors": found, "namespace": namespace or ""}
+
+    def update(self, id: str, set_metadata: Optional[dict] = None, namespace: Optional[str] = None,
+               **kwargs) -> dict:
+        """Merge `set_metadata` into the metadata of vector `id` (a no-op for unknown ids, like Pinecone)."""
+        with self._lock:
+            slot = self._slot_of.get(id)
+            if slot is None or not set_metadata:
+                return {}
+            metadata = {**self._metadata[slot], **set_metadata}
+            self._metadata[slot] = metadata
+            self._filter_masks.clear()
+            self._db.execute("UPDATE vectors SET metadata = ? WHERE slot = ?",
+                             (json.dumps(metadata, ensure_ascii=False), slot))
+            self._db.commit()
+        return {}
+
+    def delete(self, ids=None, delete_all: bool = False, filter: Optional[dict] = None,
+               namespace: Optional[str] = None, **kwargs) -> dict:
+        with self._lock:
+            if delete_all:
+                targets = list(self._slot_of)
+            elif filter:
+                targets = [self._ids[s] for s in np.flatnonzero(self._alive[:self._size])
+                           if matches_filter(self._metadata[s], filter)]
+            else:
+                targets = [i for i in (ids or []) if i in self._slot_of]
+
+            slots = []
+            for vector_id in targets:
+                slot = self._slot_of.pop(vector_id)
+                self._ids[slot] = None
+                self._metadata[slot] = None
+                self._alive[slot] = False
+                self._free.append(slot)
+                slots.append((slot,))
+            self._filter_masks.clear()
+            self._db.executemany("DELETE FROM vectors WHERE slot = ?", slots)
+            self._db.commit()
+        return {}
+
+    def list(self, prefix: Optional[str] = None, limit: int = 100,
+             namespace: Optional[str] = None, **kwargs) -> Iterator[list[str]]:
+        """Yield pages of vector ids starting with `prefix`, like `Index.list`."""
+        with self._lock:
+            ids = sorted(i for i in self._slot_of if not prefix or i.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self, **kwargs) -> dict:
+        with self._lock:
+            return {"dimension": self.dimension, "total_vector_count": len(self._slot_of)}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def close(self):
+        with self._lock:
+            self._matrix.flush()
+            self._db.close()
+
+
+def get_local_vector_index() -> LocalVectorIndex:
+    global _local_index
+    if _local_index is None:
+        _local_index = LocalVectorIndex(config.LOCAL_INDEX_PATH, dimension=config.VECTOR_DIMENSION)
+        print(f" Using local vector index: {config.LOCAL_INDEX_PATH} ({len(_local_index)} vectors)")
+    return _local_index
@@ -0,0 +1,107 @@
+import asyncio
+import importlib
+import time
+from typing import Awaitable, Callable, Optional
+from backend.logger import logger
+from backend.modules.concurrency import run_sync
+from backend.modules.retry import backoff_delay
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+class Warmup:
+    """
+    Runs slow startup work (client imports, credentials, the query pipeline) in
+    the background once the app is already serving, one step at a time.
+    `required` steps are retried with backoff until they succeed and gate
+    readiness; optional ones run once and only report their outcome.
+    """
+
+    def __init__(self, retry_base_delay: float = 1.0, retry_max_delay: float = 30.0):
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._steps: dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._started = time.monotonic()
+
+    def add(self, name: str, fn: Callable[[], Awaitable], required: bool = True):
+        self._steps[name] = {"fn": fn, "required": required, "state": PENDING,
+                             "attempts": 0, "seconds": None, "error": None}
+
+    def start(self):
+        self._started = time.monotonic()
+        self._task = asyncio.create_task(self._run(), name="warmup")
+
+    async def _run(self):
+        for name, step in self._steps.items():
+            while True:
+                step["state"] = RUNNING
+                step["attempts"] += 1
+                start = time.perf_counter()
+                try:
+                    await step["fn"]()
+                except Exception as e:
+                    step["state"], step["error"] = FAILED, f"{type(e).__name__}: {e}"
+                    if not step["required"]:
+                        logger.warning(f"Warmup step {name} failed: {step['error']}")
+                        break
+                    delay = backoff_delay(step["attempts"] - 1, self.retry_base_delay, self.retry_max_delay)
+                    logger.exception(f"Warmup step {name} failed, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                step["state"], step["error"] = READY, None
+                step["seconds"] = round(time.perf_counter() - start, 3)
+                logger.info(f"Warmup step {name} ready in {step['seconds']}s")
+                break
+
+    @property
+    def ready(self) -> bool:
+        return all(step["state"] == READY for step in self._steps.values() if step["required"])
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self._started, 3),
+            "steps": {
+                name: {key: value for key, value in step.items() if key != "fn"}
+                for name, step in self._steps.items()
+            },
+        }
+
+    async def aclose(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+# ==========================================================
+# Startup steps
+# ==========================================================
+def import_modules(*names: str) -> Callable[[], Awaitable]:
+    """Step that imports `names` off the event loop, so the first request doesn't pay for it."""
+    async def step():
+        for name in names:
+            await run_sync(importlib.import_module, name)
+    return step
+
+
+def startup_warmup(registry) -> Warmup:
+    """Warmup for the API: the query pipeline gates readiness, the ingestion stack does not."""
+    async def query_pipeline():
+        await run_sync(registry.ensure_loaded)
+        await registry.astart()
+
+    async def ocr_client():
+        from backend.modules.ocr_loader import get_vision_client
+        await run_sync(get_vision_client)
+
+    warmup = Warmup()
+    warmup.add("query_pipeline", query_pipeline)
+    warmup.add("ingestion", import_modules("backend.modules.load_vectorstore", "backend.modules.ocr_loader"),
+               required=False)
+    warmup.add("ocr_client", ocr_client, required=False)
+    return warmup
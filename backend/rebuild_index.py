@@ -0,0 +1,130 @@
+"""
+Repopulate the vector index from the local embedding archive, without
+calling Voyage.
+
+    python -m backend.rebuild_index [--index-name NAME] [--source PATH ...] [--batch 5000]
+    python -m backend.rebuild_index --backfill
+
+The target is the index the app is configured for (`VECTOR_BACKEND`,
+`PINECONE_INDEX_NAME`, or `--index-name`), created if missing. Every chunk
+in the chunk manifest is upserted under the vector id it already has, so
+the manifest, BM25 index, chunk store and answer cache stay valid. Chunk
+text archived from an index that still carried it is moved to the chunk
+store, so a rebuild also slims the metadata of older vectors. Chunks embedded
+before the archive existed are reported as missing: run `--backfill`
+against the old index first, which copies their vectors out of it.
+"""
+import argparse
+import sys
+import time
+from typing import Iterable, Optional
+from backend.config.config import config
+from backend.modules.chunk_manifest import ChunkManifest, get_chunk_manifest
+from backend.modules.chunk_store import ChunkStore, get_chunk_store
+from backend.modules.embedding_archive import EmbeddingArchive, get_embedding_archive
+from backend.modules.load_vectorstore import (
+    EMBEDDING_MODEL,
+    chunked_iterable,
+    get_pinecone_index,
+    get_upsert_pipeline,
+)
+from backend.modules.retriever import fetch_documents
+from backend.modules.upsert_pipeline import UpsertPipeline
+
+
+def rebuild_index(index, archive: EmbeddingArchive, manifest: ChunkManifest, model: str = EMBEDDING_MODEL,
+                  sources: Optional[Iterable[str]] = None, batch_size: int = 5000,
+                  upserter: Optional[UpsertPipeline] = None, chunk_store: Optional[ChunkStore] = None) -> dict:
+    """
+    Upsert every archived chunk of `sources` (default: all) into `index`;
+    returns counts. The page comes from the manifest, since the archive keeps
+    the metadata a chunk was first embedded with. With a `chunk_store`, text
+    found in archived metadata is stored there and left out of the upserted
+    metadata.
+    """
+    upserter = upserter or get_upsert_pipeline(index)
+    report = {"sources": 0, "vectors": 0, "upserted": 0, "missing": 0, "failed": 0}
+    started = time.perf_counter()
+    for source in sources or manifest.sources():
+        report["sources"] += 1
+        page_of = manifest.pages(source)
+        for batch in chunked_iterable(manifest.entries(source), batch_size):
+            positions, vectors, metadata = archive.get(model, [h for _, h in batch])
+            items, texts = [], []
+            for i, values, meta in zip(positions, vectors.tolist(), metadata):
+                vector_id = batch[i][0]
+                meta = {**meta, "source": str(source), "page": page_of.get(vector_id, meta.get("page"))}
+                if chunk_store is not None and "text" in meta:
+                    texts.append((vector_id, meta.pop("text"), meta["page"]))
+                items.append((vector_id, values, meta))
+            if texts:
+                chunk_store.add(source, texts)
+            result = upserter.upsert(items)
+            report["vectors"] += len(batch)
+            report["missing"] += len(batch) - len(positions)
+            report["upserted"] += len(result.upserted)
+            report["failed"] += len(result.failed)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def backfill_archive(index, archive: EmbeddingArchive, manifest: ChunkManifest, model: str = EMBEDDING_MODEL,
+                     batch_size: int = 100) -> dict:
+    """Archive the vectors of chunks indexed before the archive existed, fetched from `index` by id."""
+    report = {"sources": 0, "missing": 0, "archived": 0}
+    for source in manifest.sources():
+        report["sources"] += 1
+        entries = manifest.entries(source)
+        hash_of = dict(entries)
+        missing = archive.missing(model, [h for _, h in entries])
+        todo = [vector_id for vector_id, h in entries if h in missing]
+        report["missing"] += len(todo)
+        for ids in chunked_iterable(todo, batch_size):
+            docs, values = fetch_documents(index, ids)
+            report["archived"] += archive.add(model, [
+                (hash_of[doc.id], vector, doc.metadata) for doc, vector in zip(docs, values)
+            ])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector index from the embedding archive")
+    parser.add_argument("--index-name", help="Pinecone index to (create and) fill; default PINECONE_INDEX_NAME")
+    parser.add_argument("--source", action="append", help="only this source document (repeatable)")
+    parser.add_argument("--batch", type=int, default=5000, help="chunks read from the archive at a time")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--backfill", action="store_true",
+                        help="copy vectors missing from the archive out of the current index, then exit")
+    args = parser.parse_args()
+
+    archive = get_embedding_archive()
+    if archive is None:
+        sys.exit("EMBEDDING_ARCHIVE_PATH is empty: there is no embedding archive")
+    if args.index_name:
+        config.PINECONE_INDEX_NAME = args.index_name
+    index = get_pinecone_index()
+    manifest = get_chunk_manifest()
+
+    if args.backfill:
+        report = backfill_archive(index, archive, manifest, args.model)
+        print(f"Backfilled the embedding archive: {report}")
+        return
+
+    archived = archive.stats().get(args.model)
+    if archived is None:
+        sys.exit(f"No {args.model} embeddings in the archive at {config.EMBEDDING_ARCHIVE_PATH}")
+    if archived["dimension"] != config.VECTOR_DIMENSION:
+        sys.exit(f"Archived {args.model} embeddings have dimension {archived['dimension']}, "
+                 f"the index is configured for {config.VECTOR_DIMENSION}")
+
+    report = rebuild_index(index, archive, manifest, args.model, sources=args.source, batch_size=args.batch,
+                           chunk_store=get_chunk_store())
+    print(f"Rebuilt the index from the embedding archive: {report}")
+    if report["missing"]:
+        print(f"{report['missing']} chunks have no archived embedding; re-ingest their documents "
+              f"or run --backfill against the index they are in")
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from backend.modules.answer_cache import get_answer_cache
+
+router = APIRouter()
+
+
+@router.get("/cache/stats")
+async def cache_stats(request: Request):
+    registry = request.app.state.resources
+    return JSONResponse(
+        content={
+            "query_embeddings": registry.embedding_cache.stats(),
+            "answers": get_answer_cache().stats(),
+        },
+        status_code=200
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+
+@router.get("/readyz")
+async def readyz(request: Request):
+    """Readiness: 200 once the query pipeline is built, 503 with warmup progress until then."""
+    status = request.app.state.warmup.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
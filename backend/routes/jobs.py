@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from backend.modules.jobs import get_ingestion_queue
+
+router = APIRouter()
+
+
+@router.get("/jobs/")
+async def list_jobs(limit: int = 50):
+    return JSONResponse(content={"jobs": get_ingestion_queue().store.recent(limit)}, status_code=200)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = get_ingestion_queue().store.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"Job not found: {job_id}"}, status_code=404)
+    return JSONResponse(content=job, status_code=200)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = get_ingestion_queue().cancel(job_id)
+    if job is None:
+        return JSONResponse(content={"error": f"Job not found: {job_id}"}, status_code=404)
+    return JSONResponse(content=job, status_code=200)
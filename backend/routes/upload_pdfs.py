@@ -2,10 +2,10 @@ import os
 from fastapi import APIRouter, UploadFile, File
 from fastapi.responses import JSONResponse
 from backend.logger import logger
-from backend.modules.load_vectorstore import load_vectorstore_from_docs
-from backend.modules.ocr_loader import load_pdf_with_hybrid_ocr
+from backend.modules.concurrency import run_sync
+from backend.modules.jobs import get_ingestion_queue
+from backend.modules.pdf_handlers import UPLOAD_DIR, discard, staged_path, stream_to_disk
 
-UPLOAD_DIR = "./uploaded_documents"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 router = APIRouter()
@@ -14,28 +14,37 @@ router = APIRouter()
 @router.post("/upload_pdfs/")
 async def upload_pdfs(files: list[UploadFile] = File(...)):
     try:
+        queue = get_ingestion_queue()
+        jobs = []
         for file in files:
-            file_path = os.path.join(UPLOAD_DIR, file.filename)
-
-            # --- Save uploaded file ---
-            with open(file_path, "wb") as f:
-                f.write(await file.read())
-            logger.info(f"Saved file: {file.filename}")
-
-            # --- Extract text with hybrid OCR ---
-            docs = load_pdf_with_hybrid_ocr(file_path)
-
-            if not docs:
-                logger.warning(f"No text extracted from {file.filename}")
+            filename = os.path.basename(file.filename)
+
+            # --- Save uploaded file in chunks, hashing as it is written ---
+            temp_path, content_hash = await run_sync(stream_to_disk, file.file, UPLOAD_DIR)
+
+            # --- An identical file already indexed (or being indexed) is not extracted again ---
+            duplicate = await run_sync(queue.find_duplicate, content_hash)
+            if duplicate is not None:
+                await run_sync(discard, temp_path)
+                jobs.append({"job_id": duplicate["job_id"], "filename": filename, "status": "duplicate",
+                             "duplicate_of": duplicate["filename"]})
+                logger.info(f"Skipped {filename}: identical to {duplicate['filename']}")
                 continue
 
-            # --- Push docs directly to vectorstore ---
-            load_vectorstore_from_docs(docs, file_path)
-            logger.info(f"Document added to vectorstore: {file.filename}")
+            # --- Kept under a unique name until its job runs: an earlier job for the
+            # same filename may still be reading UPLOAD_DIR/filename ---
+            file_path = staged_path(filename, UPLOAD_DIR)
+            os.replace(temp_path, file_path)
+            logger.info(f"Saved file: {filename} (sha256 {content_hash[:12]})")
+
+            # --- Extraction, chunking, embedding and upsert run in the background ---
+            job = queue.submit(filename, file_path, content_hash, source=os.path.join(UPLOAD_DIR, filename))
+            jobs.append({"job_id": job["id"], "filename": filename, "status": job["status"]})
+            logger.info(f"Queued ingestion job {job['id']} for {filename}")
 
         return JSONResponse(
-            content={"message": "Files processed and added to vectorstore"},
-            status_code=200,
+            content={"message": "Files queued for processing", "jobs": jobs},
+            status_code=202,
         )
 
     except Exception as e:
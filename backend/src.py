@@ -1,8 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.routes.upload_pdfs import router as upload_pdfs
 from backend.routes.ask_questions import router as ask_question
+from backend.routes.cache import router as cache_stats
+from backend.routes.jobs import router as jobs
+from backend.routes.metrics import router as metrics
+from backend.routes.health import router as health
 from backend.middlewares.exception_handlers import catch_exception_middleware
+from backend.middlewares.server_timing import server_timing_middleware
+from backend.modules.concurrency import shutdown_sync_executor
+from backend.modules.jobs import get_ingestion_queue
+from backend.modules.resources import ResourceRegistry
+from backend.modules.warmup import startup_warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background ingestion workers (resume jobs left over from the last run)
+    get_ingestion_queue().start()
+
+    # Build the query pipeline once and share it across requests. It loads in
+    # the background so the app serves health checks right away; /readyz
+    # turns ready once it is built (requests arriving earlier build it lazily)
+    app.state.resources = ResourceRegistry()
+    app.state.warmup = startup_warmup(app.state.resources)
+    app.state.warmup.start()
+    yield
+    await app.state.warmup.aclose()
+    await app.state.resources.aclose()
+    get_ingestion_queue().shutdown()
+    shutdown_sync_executor()
+
 
 version = "v1"
 app = FastAPI(title="AI-Powered RAG Guitar Assistant",
@@ -16,7 +45,8 @@ app = FastAPI(title="AI-Powered RAG Guitar Assistant",
                   "name": "Eben-The-Great",
                   "email": "tijaniebenezer6@gmail.com",
                   "url": "https://github.com/EbenTheGreat/BookApp"
-              })
+              },
+              lifespan=lifespan)
 
 @app.get('/')
 async def read_root():
@@ -34,13 +64,23 @@ app.add_middleware(
 
 # middleware exception handlers
 app.middleware("http")(catch_exception_middleware)
+# per-stage timings: Server-Timing header and request latency histogram
+app.middleware("http")(server_timing_middleware)
 
 # routers
 
 # Upload pdf documents
 app.include_router(upload_pdfs)
+# ingestion job status / cancel
+app.include_router(jobs)
 # asking query
 app.include_router(ask_question)
+# cache hit/miss counters
+app.include_router(cache_stats)
+# Prometheus metrics
+app.include_router(metrics)
+# liveness / readiness probes
+app.include_router(health)
 
 
 
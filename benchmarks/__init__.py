@@ -0,0 +1,11 @@
+"""
+Offline benchmarks and checks. They run against the local fakes in
+`benchmarks.fakes`, so placeholder credentials are enough to load the settings.
+"""
+import os
+
+for _key in (
+    "PINECONE_API_KEY", "PINECONE_ENVIRONMENT", "PINECONE_INDEX_NAME", "GROQ_API_KEY",
+    "GOOGLE_API_KEY", "OPENAI_API_KEY", "VOYAGE_API_KEY", "GOOGLE_APPLICATION_CREDENTIAL",
+):
+    os.environ.setdefault(_key, "offline-benchmark")
@@ -0,0 +1,98 @@
+"""
+Throughput of /ask/ as the number of in-flight requests grows.
+
+    python -m benchmarks.ask_concurrency [--requests 128] [--latency 0.05]
+
+Every upstream call sleeps for a fixed latency. With the async path, requests
+overlap their waits on one event loop, so throughput should grow roughly
+linearly with concurrency until the thread pool (for the sync-only parts) or
+the CPU saturates. The `thread-pool` rows use the sync Pinecone index through
+the bounded executor instead of the asyncio client.
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from benchmarks.fakes import (
+    FakeGroqChatModel,
+    FakePineconeAsyncIndex,
+    FakePineconeIndex,
+    FakeVoyageEmbeddings,
+    fake_vector,
+)
+from backend.modules.llm import get_answer_chain
+from backend.modules.pipeline import RAGPipeline
+from backend.modules.resources import Resources, get_resources
+from backend.modules.retriever import PineconeRetriever
+from backend.routes.ask_questions import router as ask_router
+from backend.logger import logger
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32, 64]
+
+
+def build_app(latency: float, native_async_index: bool) -> FastAPI:
+    index = FakePineconeIndex(latency=latency)
+    index.upsert([
+        (f"chunk-{i}", fake_vector(f"chunk {i}"), {"source": "manual.pdf", "page": i, "text": f"chunk {i}"})
+        for i in range(50)
+    ])
+    embeddings = FakeVoyageEmbeddings(latency=latency)
+    retriever = PineconeRetriever(
+        index=index,
+        embeddings=embeddings,
+        top_k=3,
+        async_index=FakePineconeAsyncIndex(index) if native_async_index else None,
+    )
+    llm = FakeGroqChatModel(first_token_latency=latency * 4)
+    answer_chain = get_answer_chain(llm=llm)
+    resources = Resources(
+        settings=None,
+        embeddings=embeddings,
+        vector_store=index,
+        retriever=retriever,
+        answer_chain=answer_chain,
+        pipeline=RAGPipeline(retriever, answer_chain),
+    )
+
+    app = FastAPI()
+    app.include_router(ask_router)
+    app.dependency_overrides[get_resources] = lambda: resources
+    return app
+
+
+async def run_level(app: FastAPI, concurrency: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                r = await client.post("/ask/", data={"query": f"question number {i}"})
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        return total / (time.perf_counter() - start)
+
+
+async def main(total: int, latency: float):
+    print(f"{total} requests per level, {latency * 1000:.0f} ms per upstream call\n")
+    print(f"{'mode':<12} {'in-flight':>9} {'req/s':>9} {'speedup':>8}")
+    for mode, native in (("asyncio", True), ("thread-pool", False)):
+        app = build_app(latency, native)
+        baseline = None
+        for concurrency in CONCURRENCY_LEVELS:
+            throughput = await run_level(app, concurrency, total)
+            baseline = baseline or throughput
+            print(f"{mode:<12} {concurrency:>9} {throughput:>9.1f} {throughput / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    logger.setLevel("WARNING")
+    asyncio.run(main(args.requests, args.latency))
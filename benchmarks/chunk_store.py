@@ -0,0 +1,128 @@
+"""
+Chunk text in the vector metadata versus in the local chunk store: upsert
+and query payload sizes, and retrieval latency with response transfer time
+modelled on the fake index.
+
+    python -m benchmarks.chunk_store [--pages 300] [--queries 200] [--mb-per-second 10]
+
+A manual is ingested twice through the real IngestionPipeline (structure-
+aware chunks, fake embeddings) into two in-memory indexes, once with text
+in the metadata and once with a ChunkStore. Retrieval runs the dense
+retriever both ways: the rerank path (top 20 with vectors) and the plain
+path (top 6, metadata only). Both must return the same text.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from langchain_core.documents import Document
+from benchmarks.documents import manual_page
+from benchmarks.fakes import FakePineconeAsyncIndex, FakePineconeIndex, FakeVoyageEmbeddings
+from backend.logger import logger
+from backend.modules.chunk_manifest import ChunkManifest
+from backend.modules.chunk_store import ChunkStore
+from backend.modules.chunker import ManualChunker
+from backend.modules.embedding_engine import EmbeddingEngine
+from backend.modules.ingest_pipeline import IngestionPipeline
+from backend.modules.retriever import PineconeRetriever
+from backend.modules.upsert_pipeline import UpsertPipeline
+
+MODEL = "voyage-3.5"
+PATHS = {"rerank (top 20 + vectors)": (20, True), "plain (top 6)": (6, False)}
+
+
+def make_pages(n: int) -> list[Document]:
+    rng = random.Random(0)
+    return [Document(page_content=manual_page(page, rng)[0],
+                     metadata={"source": "manual.pdf", "page": page, "extraction": "text"}) for page in range(n)]
+
+
+def ingest(pages, workdir: str, name: str, args, chunk_store=None) -> FakePineconeIndex:
+    index = FakePineconeIndex(latency=args.latency, query_latency_per_mb=1 / args.mb_per_second)
+    pipeline = IngestionPipeline(
+        "manual.pdf", MODEL, ManualChunker(),
+        embedder=EmbeddingEngine(FakeVoyageEmbeddings()),
+        upserter=UpsertPipeline(index, sleep=lambda s: None),
+        manifest=ChunkManifest(os.path.join(workdir, f"{name}-manifest.sqlite")),
+        chunk_store=chunk_store,
+    )
+    pipeline.run(pages)
+    return index
+
+
+def run_queries(retriever: PineconeRetriever, vectors, top_k: int, include_values: bool):
+    seconds, docs = [], []
+    for vector in vectors:
+        start = time.perf_counter()
+        candidates = retriever.search_candidates(vector, top_k=top_k, include_values=include_values)
+        seconds.append(time.perf_counter() - start)
+        docs.append([(d.id, d.page_content) for d in candidates.docs])
+    return np.array(seconds) * 1000, docs
+
+
+async def run_async_queries(retriever: PineconeRetriever, vectors, top_k: int, include_values: bool):
+    loop = asyncio.get_running_loop()
+    seconds = []
+    for vector in vectors:
+        start = loop.time()
+        await retriever.asearch_candidates(vector, top_k=top_k, include_values=include_values)
+        seconds.append(loop.time() - start)
+    return np.array(seconds) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per query round trip")
+    parser.add_argument("--mb-per-second", type=float, default=10.0, help="modelled response download speed")
+    args = parser.parse_args()
+    logger.setLevel("ERROR")
+
+    pages = make_pages(args.pages)
+    with tempfile.TemporaryDirectory() as workdir:
+        store = ChunkStore(os.path.join(workdir, "chunks.sqlite"))
+        indexes = {
+            "text in metadata": ingest(pages, workdir, "inline", args),
+            "chunk store": ingest(pages, workdir, "store", args, chunk_store=store),
+        }
+
+        print(f"Upserts: {args.pages} pages, {len(indexes['chunk store'].vectors)} chunks\n")
+        print(f"{'layout':<18} {'requests':>9} {'MB sent':>8} {'metadata B/vector':>18} {'max metadata B':>15}")
+        for name, index in indexes.items():
+            metadata = [len(json.dumps(m)) for _, m in index.vectors.values()]
+            sent = index.request_bytes((vid, v, m) for vid, (v, m) in index.vectors.items())
+            print(f"{name:<18} {index.counter.calls['upsert']:>9} {sent / 2**20:>8.2f} "
+                  f"{np.mean(metadata):>18.0f} {max(metadata):>15}")
+
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((args.queries, 1024)).astype(np.float32)
+        vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+        print(f"\nQueries: {args.queries}, {args.latency * 1000:.0f} ms round trip + "
+              f"response size at {args.mb_per_second:g} MB/s\n")
+        print(f"{'path':<26} {'layout':<18} {'KB/response':>12} {'p50 ms':>8} {'p95 ms':>8} {'async p50':>10}")
+        for path, (top_k, include_values) in PATHS.items():
+            results = {}
+            for name, index in indexes.items():
+                retriever = PineconeRetriever(index=index, embeddings=FakeVoyageEmbeddings(),
+                                              async_index=FakePineconeAsyncIndex(index),
+                                              chunk_store=store if name == "chunk store" else None)
+                response = index.query(vector=vectors[0], top_k=top_k, include_metadata=True,
+                                       include_values=include_values, _skip_latency=True)
+                size = index.request_bytes((m["id"], m.get("values", []), m["metadata"]) for m in response["matches"])
+                seconds, docs = run_queries(retriever, vectors, top_k, include_values)
+                async_seconds = asyncio.run(run_async_queries(retriever, vectors, top_k, include_values))
+                results[name] = docs
+                print(f"{path:<26} {name:<18} {size / 1024:>12.1f} {np.median(seconds):>8.1f} "
+                      f"{np.percentile(seconds, 95):>8.1f} {np.median(async_seconds):>10.1f}")
+            same = results["text in metadata"] == results["chunk store"]
+            print(f"{'':<26} same documents and text: {'yes' if same else 'NO'}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Chunking throughput and chunk quality: the previous 500-character recursive
+splitter versus the structure- and token-aware ManualChunker.
+
+    python -m benchmarks.chunking [--pages 400] [--repeat 7] [--max-tokens 192]
+
+Runs over a synthetic manual shaped like extracted PDF text: running headers
+and page numbers, numbered chapter and section headings, wrapped paragraphs
+and parameter tables. Reports pages/s and chunks/s (best of `--repeat`),
+chunk count and size in embedding tokens, tokens to embed (overlap included),
+estimated vector storage, and structure damage: tables whose rows land in more
+than one chunk, headings that do not start a chunk, and chunks starting
+mid-sentence.
+"""
+import argparse
+import random
+import textwrap
+import time
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.documents import WORDS
+from backend.modules.chunker import ManualChunker
+from backend.modules.embedding_engine import estimate_tokens
+
+RUNNING_HEADER = "BOSS GT-1 Guitar Effects Processor Owner's Manual"
+VECTOR_BYTES = 1024 * 4  # voyage-3.5, float32
+
+
+def make_manual(pages: int, rng: random.Random):
+    """Pages of extracted text, plus the headings and tables (as row lists) they contain."""
+    docs, headings, tables = [], [], []
+    chapter, section = 0, 0
+    for page in range(pages):
+        lines = [RUNNING_HEADER, ""]
+        if page % 12 == 0:
+            chapter, section = chapter + 1, 0
+            lines += [f"{chapter} {rng.choice(WORDS).upper()} {rng.choice(WORDS).upper()}", ""]
+            headings.append(lines[-2])
+        for _ in range(rng.randint(1, 2)):
+            section += 1
+            param = f"{rng.choice(WORDS).title()}{page:03d}{section}"
+            lines += [f"{chapter}.{section} {param} settings", ""]
+            headings.append(lines[-2])
+            for _ in range(rng.randint(1, 3)):
+                words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 60)))
+                lines += textwrap.wrap(f"The {param} parameter adjusts the {words}. "
+                                       f"Hold the footswitch to {rng.choice(WORDS)} it.", 90) + [""]
+            rows = [f"{'PARAMETER':<16}{'RANGE':<14}DEFAULT"] + [
+                f"{param}-{rng.choice(WORDS):<12}{'0-127':<14}{rng.randint(0, 127)}"
+                for _ in range(rng.randint(3, 8))
+            ]
+            tables.append(rows)
+            lines += rows + [""]
+        lines.append(f"- {page + 1} -")
+        docs.append(Document(page_content="\n".join(lines), metadata={"source": "manual.pdf", "page": page}))
+    return docs, headings, tables
+
+
+def best_of(repeat: int, splitters: dict) -> dict:
+    """Best time and output of each splitter, taking turns so machine noise hits all alike."""
+    best = {name: (float("inf"), None) for name in splitters}
+    for _ in range(repeat):
+        for name, split in splitters.items():
+            start = time.perf_counter()
+            chunks = split()
+            best[name] = (min(best[name][0], time.perf_counter() - start), chunks)
+    return best
+
+
+def structure_damage(pages: list[Document], chunks: list[Document], headings, tables) -> dict:
+    texts = [c.page_content for c in chunks]
+    split_tables = sum(
+        len({i for row in rows[1:] for i, text in enumerate(texts) if row in text}) > 1
+        or any(not any(row in text for text in texts) for row in rows[1:])
+        for rows in tables
+    )
+    starts = {text.lstrip().split("\n", 1)[0] for text in texts}
+    cut_headings = sum(heading not in starts and not any(
+        text.lstrip().startswith(heading) or f"\n{heading}\n" in text for text in texts) for heading in headings)
+    by_page = {doc.metadata["page"]: doc.page_content for doc in pages}
+    mid_sentence = 0
+    for chunk in chunks:
+        page_text, head = by_page[chunk.metadata["page"]], chunk.page_content[:40]
+        at = page_text.find(head)
+        before = page_text[:at].rstrip(" ")
+        mid_sentence += at > 0 and not before.endswith(("\n", ".", "!", "?"))
+    return {"split_tables": split_tables, "cut_headings": cut_headings, "mid_sentence": mid_sentence}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--max-tokens", type=int, default=192)
+    parser.add_argument("--min-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    pages, headings, tables = make_manual(args.pages, random.Random(0))
+    source_tokens = sum(estimate_tokens(p.page_content) for p in pages)
+    recursive = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    splitters = {
+        "recursive 500/50": lambda: recursive.split_documents(pages),
+        "recursive/page": lambda: [c for p in pages for c in recursive.split_documents([p])],
+        "structured": lambda: list(ManualChunker(args.max_tokens, args.min_tokens).iter_chunks(pages)),
+    }
+
+    print(f"{args.pages} pages, {len(headings)} headings, {len(tables)} tables, "
+          f"~{source_tokens} tokens of text\n")
+    print(f"{'splitter':<18} {'pages/s':>8} {'chunks/s':>9} {'chunks':>7} {'tok/chunk':>9} "
+          f"{'embed tok':>10} {'storage MB':>10} {'split tbl':>9} {'cut head':>8} {'mid-sent':>8}")
+    for name, (seconds, chunks) in best_of(args.repeat, splitters).items():
+        tokens = [estimate_tokens(c.page_content) for c in chunks]
+        storage = sum(VECTOR_BYTES + len(c.page_content.encode()) for c in chunks) / 1e6
+        damage = structure_damage(pages, chunks, headings, tables)
+        print(f"{name:<18} {len(pages) / seconds:>8.0f} {len(chunks) / seconds:>9.0f} {len(chunks):>7} "
+              f"{sum(tokens) / len(chunks):>9.1f} {sum(tokens):>10} {storage:>10.2f} "
+              f"{damage['split_tables']:>9} {damage['cut_headings']:>8} {damage['mid_sentence']:>8}")
+
+
+if __name__ == "__main__":
+    main()
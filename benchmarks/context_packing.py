@@ -0,0 +1,129 @@
+"""
+Prompt size and LLM latency: the previous prompt (fixed top-3 chunks
+verbatim, question repeated in the system message) versus token-budget
+context packing with the question asked once.
+
+    python -m benchmarks.context_packing [--pages 120] [--questions 100] [--budget 350]
+
+Runs the real RAGPipeline and answer chain over a synthetic pedal manual with
+page headers, footers and a repeated safety notice, using the local vector
+index and bag-of-words fake embeddings. The fake Groq model takes
+`--first-token` seconds plus `--per-1k` seconds per 1000 prompt tokens, a
+simple model of prompt processing cost. Answer quality is proxied by how
+often the chunk the question is about (or the notice, for power questions)
+reaches the prompt.
+"""
+import argparse
+import random
+import tempfile
+import time
+import numpy as np
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.context_tokens import make_manual
+from benchmarks.fakes import FakeGroqChatModel, FakeVoyageEmbeddings, lexical_vector
+from backend.config.loader import load_yaml_config
+from backend.logger import logger
+from backend.modules.context_packer import ContextPacker
+from backend.modules.llm import PROMPTS_PATH, get_answer_chain
+from backend.modules.pipeline import RAGPipeline
+from backend.modules.prompt_builder import build_prompt_from_config
+from backend.modules.retriever import PineconeRetriever, RerankingRetriever
+from backend.modules.vector_index import LocalVectorIndex
+
+HEADER = "BOSS GT-1 Guitar Effects Processor - Owner's Manual (Rev. 2)"
+
+
+def legacy_answer_chain(llm):
+    """The answer chain as it was before packing: the question is also in the system message."""
+    template = build_prompt_from_config(load_yaml_config(PROMPTS_PATH)["rag_assistant_prompt"]).template
+    template = template.replace("answer the user’s question.\n", "answer the user’s query:\n\n\nQuery: {input}\n")
+    prompt = ChatPromptTemplate([
+        SystemMessagePromptTemplate.from_template(f"{template}\n\nContext:\n{{context}}"),
+        HumanMessagePromptTemplate.from_template("Question: {input}"),
+    ])
+    return create_stuff_documents_chain(llm, prompt)
+
+
+def with_page_furniture(pages: list[Document]) -> list[Document]:
+    return [
+        Document(page_content=f"{HEADER}\n{'-' * 40}\n{doc.page_content}\n{'-' * 40}\nPage {doc.metadata['page'] + 1}",
+                 metadata=doc.metadata)
+        for doc in pages
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--budget", type=int, default=350)
+    parser.add_argument("--max-chunks", type=int, default=6)
+    parser.add_argument("--min-relevance", type=float, default=0.75)
+    parser.add_argument("--first-token", type=float, default=0.15, help="seconds before the first token")
+    parser.add_argument("--per-1k", type=float, default=0.3, help="seconds per 1000 prompt tokens")
+    args = parser.parse_args()
+    logger.setLevel("WARNING")
+    rng = random.Random(0)
+
+    pages, params = make_manual(args.pages, rng)
+    chunks = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50).split_documents(
+        with_page_furniture(pages))
+    embeddings = FakeVoyageEmbeddings(vectorize=lexical_vector)
+    questions = [
+        (page, f"How do I set the {params[page]} parameter?") if rng.random() > 0.25
+        else (None, "Which adapter polarity should I use for power?")
+        for page in (rng.randrange(args.pages) for _ in range(args.questions))
+    ]
+
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path)
+        vectors = embeddings.embed_documents([c.page_content for c in chunks])
+        index.upsert([
+            (f"manual#{i:05d}", v, {**c.metadata, "text": c.page_content})
+            for i, (c, v) in enumerate(zip(chunks, vectors))
+        ])
+        dense = PineconeRetriever(index=index, embeddings=embeddings)
+
+        def llm():
+            return FakeGroqChatModel(first_token_latency=args.first_token,
+                                     latency_per_1k_prompt_tokens=args.per_1k)
+
+        packer = ContextPacker(budget_tokens=args.budget, max_chunks=args.max_chunks,
+                               min_relevance=args.min_relevance)
+        modes = {}
+        model = llm()
+        modes["top-3 verbatim"] = (RAGPipeline(RerankingRetriever(base=dense, top_k=3),
+                                               legacy_answer_chain(model)), model)
+        model = llm()
+        modes["packed"] = (RAGPipeline(RerankingRetriever(base=dense, top_k=args.max_chunks),
+                                       get_answer_chain(llm=model), packer=packer), model)
+
+        print(f"{len(chunks)} chunks from {args.pages} pages, {len(questions)} questions, "
+              f"LLM {args.first_token * 1000:.0f} ms + {args.per_1k * 1000:.0f} ms per 1k prompt tokens\n")
+        print(f"{'mode':<16} {'docs':>5} {'prompt tok':>11} {'p50 tok':>8} {'LLM p50 ms':>11} "
+              f"{'LLM p95 ms':>11} {'hit':>6}")
+        baseline = None
+        for name, (pipeline, model) in modes.items():
+            docs_n, latencies, hits = [], [], 0
+            for page, question in questions:
+                docs = pipeline.retrieve(question)
+                start = time.perf_counter()
+                pipeline.answer(question, docs)
+                latencies.append(time.perf_counter() - start)
+                docs_n.append(len(docs))
+                hits += any(d.metadata.get("page") == page and params[page] in d.page_content
+                            if page is not None else "polarity" in d.page_content for d in docs)
+            tokens = np.array(model.prompt_tokens)
+            baseline = baseline or tokens.mean()
+            ms = np.array(latencies) * 1000
+            print(f"{name:<16} {np.mean(docs_n):>5.2f} {tokens.mean():>11.1f} {np.median(tokens):>8.0f} "
+                  f"{np.median(ms):>11.1f} {np.percentile(ms, 95):>11.1f} {hits / len(questions):>6.1%}")
+        print(f"\nprompt tokens: {tokens.mean() / baseline - 1:+.1%} vs top-3 verbatim")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Context tokens per prompt: plain top-k dense retrieval versus over-fetch +
+MMR + adjacent-chunk merging (RerankingRetriever), over a synthetic pedal
+manual split exactly like ingestion does.
+
+    python -m benchmarks.context_tokens [--pages 120] [--queries 200] [--top-k 3]
+
+Uses the local vector index and bag-of-words fake embeddings, so neighbouring
+overlapping chunks and repeated boilerplate look alike, as they do with the
+real model. Reports context tokens, the share (and count) of them that repeat
+text already in the prompt, and how often the chunk the question is about
+made it into the context. "merge only" keeps plain relevance order (MMR lambda 1.0).
+"""
+import argparse
+import random
+import re
+import tempfile
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.fakes import FakeVoyageEmbeddings, lexical_vector
+from backend.modules.embedding_engine import estimate_tokens
+from backend.modules.retriever import PineconeRetriever, RerankingRetriever
+from backend.modules.vector_index import LocalVectorIndex
+
+WORDS = ("signal tone gain level knob footswitch preset bank delay reverb modulation depth rate "
+         "feedback mix filter sweep envelope attack release threshold input output stereo mono "
+         "expression pedal tap tempo subdivision latency bypass buffer impedance headroom").split()
+BOILERPLATE = ("Note: always power off the unit before connecting or disconnecting cables. Use only the "
+               "supplied 9V DC adapter with center-negative polarity; other adapters may damage the "
+               "circuit and void the warranty. ")
+
+
+def make_manual(pages: int, rng: random.Random) -> tuple[list[Document], list[str]]:
+    docs, params = [], []
+    for page in range(pages):
+        param = f"{rng.choice(WORDS).title()}{page:03d}"
+        params.append(param)
+        sentences = [f"Section {page}: {param} settings."]
+        for _ in range(rng.randint(8, 14)):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+            sentences.append(f"The {param} parameter (CC#{page % 128}) adjusts the {words}.")
+            # spec-table rows are short, so the splitter's 50-char overlap repeats them
+            sentences.append(f"{rng.choice(WORDS).title()}: 0 to 127, default {rng.randint(0, 127)}")
+        if page % 3 == 0:
+            sentences.insert(rng.randint(1, len(sentences)), BOILERPLATE)
+        docs.append(Document(page_content="\n".join(sentences), metadata={"source": "manual.pdf", "page": page}))
+    return docs, params
+
+
+def redundant_share(docs: list[Document], n: int = 4) -> float:
+    """Fraction of word n-grams in the prompt that already appeared earlier in it."""
+    seen, total, repeated = set(), 0, 0
+    for doc in docs:
+        words = re.findall(r"\S+", doc.page_content)
+        for i in range(len(words) - n + 1):
+            gram = tuple(words[i:i + n])
+            total += 1
+            repeated += gram in seen
+            seen.add(gram)
+    return repeated / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--mmr-lambda", type=float, default=0.5)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    pages, params = make_manual(args.pages, rng)
+    chunks = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50).split_documents(pages)
+    embeddings = FakeVoyageEmbeddings(vectorize=lexical_vector)
+
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path)
+        vectors = embeddings.embed_documents([c.page_content for c in chunks])
+        index.upsert([
+            (f"manual#{i:05d}", v, {**c.metadata, "text": c.page_content})
+            for i, (c, v) in enumerate(zip(chunks, vectors))
+        ])
+        dense = PineconeRetriever(index=index, embeddings=embeddings, top_k=args.top_k)
+        modes = {
+            f"dense top-{args.top_k}": dense,
+            "merge only": RerankingRetriever(base=dense, top_k=args.top_k, fetch_k=args.fetch_k, mmr_lambda=1.0),
+            f"MMR fetch-{args.fetch_k}": RerankingRetriever(base=dense, top_k=args.top_k, fetch_k=args.fetch_k,
+                                                           mmr_lambda=args.mmr_lambda, merge_adjacent=False),
+            f"MMR + merge": RerankingRetriever(base=dense, top_k=args.top_k, fetch_k=args.fetch_k,
+                                               mmr_lambda=args.mmr_lambda),
+        }
+
+        # one question in four is about the boilerplate repeated on every third page
+        questions = [
+            (page, f"How do I set the {params[page]} parameter?") if rng.random() > 0.25
+            else (None, "Which adapter polarity should I use for power?")
+            for page in (rng.randrange(args.pages) for _ in range(args.queries))
+        ]
+
+        print(f"{len(chunks)} chunks from {args.pages} pages, {args.queries} questions\n")
+        print(f"{'mode':<16} {'docs':>5} {'tokens':>7} {'vs dense':>9} {'redundant':>10} {'wasted tokens':>14} "
+              f"{'unique tokens':>14} {'hit':>6}")
+        baseline = None
+        for name, retriever in modes.items():
+            docs_n, tokens, redundant, unique, hits = [], [], [], [], 0
+            for page, question in questions:
+                docs = retriever.invoke(question)
+                t = sum(estimate_tokens(d.page_content) for d in docs)
+                r = redundant_share(docs)
+                docs_n.append(len(docs))
+                tokens.append(t)
+                redundant.append(r)
+                unique.append(t * (1 - r))
+                hits += any(d.metadata.get("page") == page if page is not None else "polarity" in d.page_content
+                            for d in docs)
+            baseline = baseline or np.mean(tokens)
+            print(f"{name:<16} {np.mean(docs_n):>5.2f} {np.mean(tokens):>7.1f} {np.mean(tokens) / baseline - 1:>+9.1%} "
+                  f"{np.mean(redundant):>10.1%} {np.mean(tokens) - np.mean(unique):>14.1f} "
+                  f"{np.mean(unique):>14.1f} {hits / len(questions):>6.1%}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Synthetic pedal manuals written as real PDF files, for benchmarks that go through extraction."""
+import random
+import textwrap
+from typing import Optional
+
+WORDS = ("signal tone gain level knob footswitch preset bank delay reverb modulation depth rate "
+         "feedback mix filter sweep envelope attack release threshold input output stereo mono "
+         "expression pedal tap tempo subdivision latency bypass buffer impedance headroom").split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+LINES_PER_PAGE = 56
+
+
+def manual_page(page: int, rng: random.Random) -> tuple[str, str]:
+    """Text of one manual page and the parameter it documents."""
+    param = f"{rng.choice(WORDS).title()}{page:03d}"
+    lines = [f"Section {page}: {param} settings", ""]
+    while len(lines) < LINES_PER_PAGE - 4:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 30)))
+        paragraph = f"The {param} parameter (CC#{page % 128}) adjusts the {words}."
+        lines += textwrap.wrap(paragraph, 90) + [""]
+    lines.append(f"{rng.choice(WORDS).title()}: 0 to 127, default {rng.randint(0, 127)}")
+    return "\n".join(lines[:LINES_PER_PAGE]), param
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_stream(text: str) -> bytes:
+    ops = ["BT", "/F1 10 Tf", "12 TL", f"40 {PAGE_HEIGHT - 40} Td"]
+    for line in text.splitlines():
+        ops.append(f"({_escape(line)}) Tj T*")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1", "replace")
+
+
+def _image_stream() -> bytes:
+    # a scanned page: one image painted over the whole page and no text layer
+    return f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im1 Do Q".encode()
+
+
+def write_pdf(path: str, pages: list[Optional[str]]):
+    """Write a PDF with one page per entry: a text page, or a scanned (image-only) page for None."""
+    objects: list[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def stream(data: bytes, extra: str = "") -> bytes:
+        return f"<< /Length {len(data)} {extra}>>\nstream\n".encode() + data + b"\nendstream"
+
+    catalog = add(b"")  # filled in once the page tree exists
+    page_tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    image = add(stream(b"\x80", "/Type /XObject /Subtype /Image /Width 1 /Height 1 "
+                                "/ColorSpace /DeviceGray /BitsPerComponent 8 "))
+    kids = []
+    for text in pages:
+        content = add(stream(_image_stream() if text is None else _text_stream(text)))
+        kids.append(add(
+            f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> /XObject << /Im1 {image} 0 R >> >> "
+            f"/Contents {content} 0 R >>".encode()
+        ))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {page_tree} 0 R >>".encode()
+    objects[page_tree - 1] = (f"<< /Type /Pages /Count {len(kids)} /Kids ["
+                              + " ".join(f"{k} 0 R" for k in kids) + "] >>").encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_manual(path: str, pages: int, scanned_share: float = 0.0, seed: int = 0) -> list[str]:
+    """Write a synthetic manual; returns the parameter names documented on its text pages."""
+    rng = random.Random(seed)
+    texts, params = [], []
+    for page in range(pages):
+        text, param = manual_page(page, rng)
+        if rng.random() < scanned_share:
+            texts.append(None)
+        else:
+            texts.append(text)
+            params.append(param)
+    write_pdf(path, texts)
+    return params
@@ -0,0 +1,403 @@
+"""
+End-to-end benchmark of the real FastAPI app (`backend/src.py`) with local
+fakes standing in for Voyage, Pinecone, Groq and Google Vision.
+
+    python -m benchmarks.e2e [--docs 4] [--pages 40] [--scanned 0.2] [--questions 100]
+                             [--concurrency 8] [--latency-scale 1.0] [--jitter 0.25] [--error-rate 0.0]
+                             [--output PATH] [--compare PATH]
+
+The app is served by uvicorn on a local port with its normal lifespan, and
+every data file it writes goes to a temporary directory. Measured:
+
+- ingestion pages/s and chunks/s: synthetic PDF manuals (some pages scanned,
+  so they go through OCR) posted to /upload_pdfs/, until every job finished
+- /ask/ latency p50/p95/p99 at the given concurrency
+- /ask/stream time to first token (first body bytes) p50/p95/p99
+
+Every fake sleeps its base latency (times `--latency-scale`) plus up to
+`--jitter` of it, and fails with a retryable error at `--error-rate`; all
+random choices are seeded. Results are written as JSON (by default to
+benchmarks/results/e2e-<commit>.json); `--compare` prints the change
+against an earlier results file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+import numpy as np
+from benchmarks.documents import write_manual
+
+# Base latencies in seconds, scaled by --latency-scale
+LATENCY = {
+    "voyage": 0.08,             # per embedding call
+    "voyage_per_1k_chars": 0.002,
+    "pinecone_query": 0.03,
+    "pinecone_upsert": 0.05,
+    "groq_first_token": 0.30,
+    "groq_token": 0.01,
+    "vision": 0.25,             # per annotate call
+}
+ANSWER = ("- Set the parameter from the edit menu, then press the footswitch to store it. "
+          "- The default value is listed in the table at the end of the section. "
+          "(manual.pdf, page 3)")
+FINISHED = {"completed", "failed", "cancelled"}
+
+
+# ==========================================================
+# Setup
+# ==========================================================
+def configure_environment(workdir: Path, answer_cache: bool):
+    """Point every file the app writes into `workdir`; must run before the backend is imported."""
+    credentials = workdir / "google-credentials.json"
+    credentials.write_text("{}")
+    os.environ.update({
+        "JOBS_DB_PATH": str(workdir / "jobs.sqlite"),
+        "CHUNK_MANIFEST_PATH": str(workdir / "chunk_manifest.sqlite"),
+        "EMBEDDING_ARCHIVE_PATH": str(workdir / "embedding_archive"),
+        "CHUNK_STORE_PATH": str(workdir / "chunks.sqlite"),
+        "BM25_INDEX_PATH": str(workdir / "bm25.sqlite"),
+        "EMBED_CACHE_PATH": str(workdir / "query_embeddings.sqlite"),
+        "EXTRACTION_CACHE_DIR": str(workdir / "ocr_cache"),
+        "LOCAL_INDEX_PATH": str(workdir / "vector_index"),
+        "VECTOR_BACKEND": "pinecone",
+        "ANSWER_CACHE_ENABLED": str(answer_cache).lower(),
+        "GOOGLE_APPLICATION_CREDENTIAL": str(credentials),
+    })
+
+
+def install_fakes(args, workdir: Path) -> dict:
+    """Swap the upstream clients the app builds for local fakes; returns the fakes."""
+    from benchmarks.fakes import (
+        FakeGroqChatModel,
+        FakePageRasterizer,
+        FakePineconeAsyncIndex,
+        FakePineconeIndex,
+        FakeVisionClient,
+        FakeVoyageEmbeddings,
+    )
+    import langchain_voyageai
+    from pypdf import PdfReader
+
+    scale = args.latency_scale
+    faults = lambda name: dict(jitter=LATENCY[name] * scale * args.jitter, error_rate=args.error_rate)
+    fakes = {
+        "voyage": FakeVoyageEmbeddings(latency=LATENCY["voyage"] * scale,
+                                       latency_per_1k_chars=LATENCY["voyage_per_1k_chars"] * scale,
+                                       seed=1, **faults("voyage")),
+        "pinecone": FakePineconeIndex(latency=LATENCY["pinecone_query"] * scale,
+                                      upsert_latency=LATENCY["pinecone_upsert"] * scale,
+                                      seed=2, **faults("pinecone_query")),
+        "groq": FakeGroqChatModel(answer=ANSWER, first_token_latency=LATENCY["groq_first_token"] * scale,
+                                  token_latency=LATENCY["groq_token"] * scale, seed=3,
+                                  **faults("groq_first_token")),
+        "vision": FakeVisionClient(latency=LATENCY["vision"] * scale, seed=4,
+                                   text_for=lambda content: f"Scanned {content.decode()}: footswitch "
+                                                            f"assignments and expression pedal calibration. " * 6,
+                                   **faults("vision")),
+    }
+
+    from backend.config.config import config
+    from backend.modules import llm, load_vectorstore, ocr_loader
+    from backend.modules.ocr_engine import StreamingOCREngine
+    from backend.routes import upload_pdfs
+
+    load_vectorstore.VoyageAIEmbeddings = lambda **kw: fakes["voyage"]
+    # the query pipeline imports the client when it is built
+    langchain_voyageai.VoyageAIEmbeddings = lambda **kw: fakes["voyage"]
+    load_vectorstore._pinecone_index = fakes["pinecone"]
+    load_vectorstore._pinecone_async_index = FakePineconeAsyncIndex(fakes["pinecone"])
+    llm.get_llm = lambda settings=None: fakes["groq"]
+    ocr_loader.get_vision_client = lambda: fakes["vision"]
+    ocr_loader.get_ocr_engine = lambda: StreamingOCREngine(
+        fakes["vision"],
+        concurrency=config.OCR_CONCURRENCY,
+        batch_size=config.OCR_BATCH_SIZE,
+        max_pages_in_memory=config.OCR_MAX_PAGES_IN_MEMORY,
+        rasterize=FakePageRasterizer(pages=0),
+        page_count=lambda path: len(PdfReader(path).pages),
+    )
+    upload_pdfs.UPLOAD_DIR = str(workdir / "uploaded_documents")
+    os.makedirs(upload_pdfs.UPLOAD_DIR, exist_ok=True)
+    return fakes
+
+
+class LocalServer:
+    """Runs the app under uvicorn on a free local port, in a background thread."""
+
+    def __init__(self, app):
+        import uvicorn
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port,
+                                                    log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, name="e2e-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("server failed to start")
+            time.sleep(0.05)
+        # the query pipeline is built in the background after startup
+        while httpx.get(f"{self.url}/readyz").status_code != 200:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+# ==========================================================
+# Measurements
+# ==========================================================
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+async def bench_ingest(client: httpx.AsyncClient, paths: list[Path], timeout: float) -> dict:
+    start = time.perf_counter()
+    handles = [open(p, "rb") for p in paths]
+    try:
+        r = await client.post("/upload_pdfs/",
+                              files=[("files", (p.name, f, "application/pdf")) for p, f in zip(paths, handles)])
+    finally:
+        for f in handles:
+            f.close()
+    r.raise_for_status()
+    upload_seconds = time.perf_counter() - start
+
+    pending = {job["job_id"] for job in r.json()["jobs"] if job["status"] != "duplicate"}
+    jobs = {}
+    while pending:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"ingestion did not finish within {timeout}s")
+        await asyncio.sleep(0.1)
+        for job_id in list(pending):
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] in FINISHED:
+                jobs[job_id] = job
+                pending.discard(job_id)
+    elapsed = time.perf_counter() - start
+
+    pages = sum(job["progress"].get("pages_extracted", 0) for job in jobs.values())
+    chunks = sum(job["progress"].get("vectors_upserted", 0) for job in jobs.values())
+    return {
+        "documents": len(paths),
+        "jobs_completed": sum(job["status"] == "completed" for job in jobs.values()),
+        "pages": pages,
+        "chunks": chunks,
+        "chunks_failed": sum(job["progress"].get("chunks_failed", 0) for job in jobs.values()),
+        "upload_seconds": round(upload_seconds, 3),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 2),
+        "job_seconds": percentiles([job["updated"] - job["created"] for job in jobs.values()]),
+    }
+
+
+async def bench_ask(client: httpx.AsyncClient, questions: list[str], concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(question: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            r = await client.post("/ask/", data={"query": question})
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    elapsed = time.perf_counter() - start
+    return {"requests": len(questions), "errors": errors, "concurrency": concurrency,
+            "requests_per_second": round(len(latencies) / elapsed, 2), "latency": percentiles(latencies)}
+
+
+async def bench_stream(client: httpx.AsyncClient, questions: list[str], concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    first_token, totals, errors = [], [], 0
+
+    async def one(question: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            first, body = None, b""
+            async with client.stream("POST", "/ask/stream", data={"query": question}) as r:
+                async for chunk in r.aiter_bytes():
+                    if chunk and first is None:
+                        first = time.perf_counter() - start
+                    body += chunk
+            if r.status_code != 200 or b"[ERROR]" in body or first is None:
+                errors += 1
+                return
+            first_token.append(first)
+            totals.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(q) for q in questions))
+    return {"requests": len(questions), "errors": errors, "concurrency": concurrency,
+            "time_to_first_token": percentiles(first_token), "total": percentiles(totals)}
+
+
+# ==========================================================
+# Results
+# ==========================================================
+def git_revision() -> tuple[str, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+HEADLINE = [
+    ("ingest", "pages_per_second", True),
+    ("ingest", "chunks_per_second", True),
+    ("ask", "latency.p50_ms", False),
+    ("ask", "latency.p95_ms", False),
+    ("ask", "latency.p99_ms", False),
+    ("ask_stream", "time_to_first_token.p50_ms", False),
+    ("ask_stream", "time_to_first_token.p95_ms", False),
+    ("ask_stream", "time_to_first_token.p99_ms", False),
+]
+
+
+def _lookup(results: dict, section: str, path: str):
+    value = results.get(section, {})
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def print_summary(results: dict, baseline: dict = None):
+    header = f"{'metric':<42} {'value':>10}"
+    if baseline:
+        header += f" {'baseline':>10} {'change':>8}"
+    print(header)
+    for section, path, higher_is_better in HEADLINE:
+        value = _lookup(results, section, path)
+        line = f"{section + '.' + path:<42} {value if value is not None else '-':>10}"
+        if baseline:
+            before = _lookup(baseline, section, path)
+            if value is not None and before:
+                change = value / before - 1
+                worse = change < 0 if higher_is_better else change > 0
+                line += f" {before:>10} {change:>+8.1%}{'  !' if worse and abs(change) > 0.1 else ''}"
+            else:
+                line += f" {'-':>10} {'-':>8}"
+        print(line)
+
+
+# ==========================================================
+# Driver
+# ==========================================================
+async def run(args, workdir: Path) -> dict:
+    rng = random.Random(args.seed)
+    paths, params = [], []
+    for i in range(args.docs):
+        path = workdir / "manuals" / f"manual-{i}.pdf"
+        path.parent.mkdir(exist_ok=True)
+        params += write_manual(str(path), args.pages, args.scanned, seed=args.seed + i)
+        paths.append(path)
+    templates = ["How do I set the {} parameter?", "What is the default value of {}?",
+                 "Which CC number controls {}?"]
+    questions = [rng.choice(templates).format(rng.choice(params)) for _ in range(args.questions)]
+
+    fakes = install_fakes(args, workdir)
+    from backend.logger import logger
+    from backend.src import app
+    logger.setLevel("WARNING")
+
+    results = {}
+    with LocalServer(app) as server:
+        async with httpx.AsyncClient(base_url=server.url, timeout=120) as client:
+            print(f"Ingesting {args.docs} x {args.pages} pages ({args.scanned:.0%} scanned)...")
+            results["ingest"] = await bench_ingest(client, paths, args.ingest_timeout)
+
+            await bench_ask(client, questions[:args.warmup], 1)  # warm up the pipeline
+            print(f"Asking {len(questions)} questions at concurrency {args.concurrency}...")
+            results["ask"] = await bench_ask(client, questions, args.concurrency)
+            results["ask_stream"] = await bench_stream(client, questions, args.concurrency)
+
+    results["upstream_calls"] = {name: dict(fake.counter.calls) for name, fake in fakes.items()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=40, help="pages per document")
+    parser.add_argument("--scanned", type=float, default=0.2, help="share of pages that need OCR")
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.25, help="max extra latency, as a share of the base")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="retryable error rate of every fake")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--ingest-timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    output = Path(args.output or f"benchmarks/results/e2e-{commit[:10]}{'-dirty' if dirty else ''}.json")
+
+    with tempfile.TemporaryDirectory(prefix="e2e-bench-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, args.answer_cache)
+        results = asyncio.run(run(args, workdir))
+
+    report = {
+        "benchmark": "e2e",
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {**vars(args), "latency": LATENCY},
+        **results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print()
+    print_summary(report, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Rebuilding an index from the embedding archive versus re-embedding the
+corpus, against a fake Voyage and an in-memory Pinecone with latency.
+
+    python -m benchmarks.embedding_archive [--chunks 20000] [--sources 20]
+
+- ingest: what archiving adds to a first ingestion (embedding + upserting).
+- rebuild: a fresh index filled by `rebuild_index` from the archive versus
+  re-embedding every chunk with EmbeddingEngine and upserting it; reports
+  wall time and Voyage calls. The rebuilt index is checked to hold every
+  vector id with its metadata.
+- size and fidelity: archive bytes against float32, the cosine between each
+  float16 vector and its original, and top-k overlap of queries against
+  float16 and float32 vectors.
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from benchmarks.fakes import FakePineconeIndex, FakeVoyageEmbeddings
+from backend.logger import logger
+from backend.modules.chunk_manifest import ChunkManifest, assign_vector_ids, chunk_hash
+from backend.modules.embedding_archive import EmbeddingArchive
+from backend.modules.embedding_engine import EmbeddingEngine
+from backend.modules.upsert_pipeline import UpsertPipeline
+from backend.rebuild_index import rebuild_index
+
+MODEL = "voyage-3.5"
+
+
+def make_corpus(chunks: int, sources: int) -> dict[str, list[tuple[str, dict]]]:
+    """`{source: [(text, metadata), ...]}`, text lengths varying like real manual chunks."""
+    corpus = {}
+    for i in range(chunks):
+        source = f"manual-{i % sources:03d}.pdf"
+        text = f"chunk {i} " + "parameter value " * (5 + (i * 37) % 60)
+        corpus.setdefault(source, []).append((text, {"source": source, "page": i // sources // 20, "text": text}))
+    return corpus
+
+
+def make_engine(args) -> tuple[EmbeddingEngine, FakeVoyageEmbeddings]:
+    voyage = FakeVoyageEmbeddings(latency=args.embed_latency, latency_per_1k_chars=args.embed_latency_per_1k)
+    return EmbeddingEngine(voyage, max_concurrency=args.embed_concurrency, sleep=lambda s: None), voyage
+
+
+def make_upserter(args) -> tuple[UpsertPipeline, FakePineconeIndex]:
+    index = FakePineconeIndex(upsert_latency=args.upsert_latency)
+    return UpsertPipeline(index, max_concurrency=args.upsert_concurrency, sleep=lambda s: None), index
+
+
+def ingest(args, corpus, archive, manifest) -> dict:
+    """First ingestion: embed, upsert and (timed separately) archive every chunk."""
+    engine, voyage = make_engine(args)
+    upserter, index = make_upserter(args)
+    timings = {"embed": 0.0, "upsert": 0.0, "archive": 0.0}
+    for source, chunks in corpus.items():
+        hashes = [chunk_hash(text, MODEL) for text, meta in chunks]
+        ids = assign_vector_ids(source, hashes)
+        started = time.perf_counter()
+        values = engine.embed([text for text, _ in chunks]).embeddings
+        timings["embed"] += time.perf_counter() - started
+        started = time.perf_counter()
+        upserter.upsert([(vid, v, meta) for vid, v, (_, meta) in zip(ids, values, chunks)])
+        timings["upsert"] += time.perf_counter() - started
+        started = time.perf_counter()
+        archive.add(MODEL, [(h, v, meta) for h, v, (_, meta) in zip(hashes, values, chunks)])
+        timings["archive"] += time.perf_counter() - started
+        manifest.add(source, [(vid, h, meta["page"]) for vid, h, (_, meta) in zip(ids, hashes, chunks)])
+    return {**timings, "index": index}
+
+
+def reembed(args, corpus, manifest) -> dict:
+    """The alternative to the archive: embed every chunk again and upsert it."""
+    engine, voyage = make_engine(args)
+    upserter, index = make_upserter(args)
+    started = time.perf_counter()
+    for source, chunks in corpus.items():
+        ids = [vid for vid, _ in manifest.entries(source)]
+        values = engine.embed([text for text, _ in chunks]).embeddings
+        upserter.upsert([(vid, v, meta) for vid, v, (_, meta) in zip(ids, values, chunks)])
+    return {"seconds": time.perf_counter() - started, "calls": voyage.counter.calls["embed_documents"],
+            "index": index}
+
+
+def fidelity(original: np.ndarray, queries: int, k: int) -> dict:
+    """Cosine of float16 rows to their originals, and top-k overlap of queries near corpus rows."""
+    rounded = original.astype(np.float16).astype(np.float32)
+    cosine = np.sum(original * rounded, axis=1) / (
+        np.linalg.norm(original, axis=1) * np.linalg.norm(rounded, axis=1))
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(original), size=queries, replace=False)
+    q = original[picks] + rng.standard_normal((queries, original.shape[1])).astype(np.float32) * 0.03
+    top = lambda m: np.argsort(-(q @ m.T), axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(top(original), top(rounded))]
+    return {"min_cosine": float(cosine.min()), "overlap": float(np.mean(overlap))}
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--embed-latency", type=float, default=0.08, help="seconds per Voyage call")
+    parser.add_argument("--embed-latency-per-1k", type=float, default=0.002, help="extra seconds per 1k characters")
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--upsert-latency", type=float, default=0.02, help="seconds per Pinecone upsert request")
+    parser.add_argument("--upsert-concurrency", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=5000, help="chunks read from the archive at a time")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    logger.setLevel("ERROR")
+
+    corpus = make_corpus(args.chunks, args.sources)
+    with tempfile.TemporaryDirectory() as workdir:
+        archive_path = os.path.join(workdir, "archive")
+        archive = EmbeddingArchive(archive_path)
+        manifest = ChunkManifest(os.path.join(workdir, "manifest.sqlite"))
+
+        first = ingest(args, corpus, archive, manifest)
+        total = first["embed"] + first["upsert"] + first["archive"]
+        print(f"Ingest: {args.chunks} chunks in {args.sources} documents\n")
+        print(f"  embed {first['embed']:.2f}s, upsert {first['upsert']:.2f}s, archive {first['archive']:.2f}s "
+              f"({first['archive'] / total:.1%} of the ingestion)")
+
+        upserter, rebuilt = make_upserter(args)
+        report = rebuild_index(rebuilt, archive, manifest, MODEL, batch_size=args.batch, upserter=upserter)
+        baseline = reembed(args, corpus, manifest)
+
+        print(f"\nRebuild into a fresh index\n")
+        print(f"{'path':<12} {'seconds':>8} {'vectors/s':>10} {'Voyage calls':>13}")
+        print(f"{'re-embed':<12} {baseline['seconds']:>8.2f} {args.chunks / baseline['seconds']:>10.0f} "
+              f"{baseline['calls']:>13}")
+        print(f"{'archive':<12} {report['seconds']:>8.2f} {args.chunks / report['seconds']:>10.0f} {0:>13}")
+
+        # the archive read alone: the rebuild minus the upserts both paths pay
+        started = time.perf_counter()
+        for source in manifest.sources():
+            archive.get(MODEL, [h for _, h in manifest.entries(source)])
+        read = time.perf_counter() - started
+        print(f"\n  archive read: {args.chunks / read:,.0f} vectors/s")
+
+        original = first["index"].vectors
+        wrong_meta = sum(rebuilt.vectors[vid][1] != meta for vid, (_, meta) in original.items()
+                         if vid in rebuilt.vectors)
+        print(f"  rebuilt ids: {len(rebuilt.vectors)}/{len(original)}, missing {report['missing']}, "
+              f"failed {report['failed']}, metadata mismatches {wrong_meta}")
+
+        ids = sorted(original)
+        matrix = np.asarray([original[vid][0] for vid in ids], dtype=np.float32)
+        f = fidelity(matrix, min(args.queries, len(ids)), args.k)
+        stored = directory_bytes(archive_path)
+        print(f"\nSize and fidelity\n")
+        print(f"  float32 vectors: {matrix.nbytes / 2**20:.1f} MB; archive on disk: {stored / 2**20:.1f} MB "
+              f"(vectors {archive.stats()[MODEL]['bytes'] / 2**20:.1f} MB, the rest is preallocation and sidecar)")
+        print(f"  float16 cosine to original: min {f['min_cosine']:.6f}; top-{args.k} overlap {f['overlap']:.1%}")
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
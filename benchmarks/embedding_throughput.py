@@ -0,0 +1,91 @@
+"""
+Document-embedding throughput: the old fixed 50-text sequential batching versus
+EmbeddingEngine, against a fake embedder with injected latency and failures.
+
+    python -m benchmarks.embedding_throughput [--chunks 2000] [--error-rate 0.1]
+
+Also checks alignment: every returned vector must be the one for its own text.
+The legacy path silently drops texts that keep failing, which shifts every
+later vector onto the wrong chunk.
+"""
+import argparse
+import time
+from benchmarks.fakes import FakeVoyageEmbeddings, fake_vector
+from backend.modules.embedding_engine import EmbeddingEngine
+from backend.logger import logger
+
+
+def legacy_embed_texts_in_batches(embedding_model, texts, batch_size: int = 50):
+    """The previous load_vectorstore implementation, kept here as the baseline."""
+    all_embeddings = []
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        try:
+            all_embeddings.extend(embedding_model.embed_documents(batch))
+        except Exception:
+            for text in batch:
+                try:
+                    all_embeddings.append(embedding_model.embed_documents([text])[0])
+                except Exception:
+                    pass
+    return all_embeddings
+
+
+def make_texts(n: int) -> list[str]:
+    # chunk sizes vary like real manual chunks: short table rows to long prose
+    return [f"chunk {i} " + "parameter value " * (5 + (i * 37) % 60) for i in range(n)]
+
+
+def misaligned(texts, vectors) -> int:
+    return sum(1 for t, v in zip(texts, vectors) if v is not None and v != fake_vector(t))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per call")
+    parser.add_argument("--latency-per-1k-chars", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.1, help="retryable 429/503 rate per call")
+    parser.add_argument("--reject-every", type=int, default=500, help="every Nth text is rejected (HTTP 400)")
+    args = parser.parse_args()
+    logger.setLevel("CRITICAL")
+
+    texts = make_texts(args.chunks)
+    rejected = set(texts[::args.reject_every]) if args.reject_every else set()
+
+    def embedder():
+        return FakeVoyageEmbeddings(
+            latency=args.latency,
+            latency_per_1k_chars=args.latency_per_1k_chars,
+            error_rate=args.error_rate,
+            reject=lambda t: t in rejected,
+            seed=42,
+        )
+
+    print(f"{args.chunks} chunks, {args.latency * 1000:.0f} ms/call, "
+          f"{args.error_rate:.0%} retryable errors, {len(rejected)} poison texts\n")
+    print(f"{'mode':<26} {'seconds':>8} {'chunks/s':>9} {'calls':>6} {'embedded':>9} "
+          f"{'reported':>9} {'misaligned':>11}")
+
+    model = embedder()
+    start = time.perf_counter()
+    vectors = legacy_embed_texts_in_batches(model, texts)
+    elapsed = time.perf_counter() - start
+    print(f"{'legacy 50/batch serial':<26} {elapsed:>8.2f} {len(texts) / elapsed:>9.0f} "
+          f"{model.counter.calls['embed_documents']:>6} {len(vectors):>9} {0:>9} "
+          f"{misaligned(texts, vectors):>11}")
+
+    for concurrency in (1, 4, 8, 16):
+        model = embedder()
+        engine = EmbeddingEngine(model, max_concurrency=concurrency, max_batch_tokens=8000,
+                                 base_delay=0.05, max_delay=1.0)
+        start = time.perf_counter()
+        result = engine.embed(texts)
+        elapsed = time.perf_counter() - start
+        print(f"{f'engine c={concurrency}':<26} {elapsed:>8.2f} {len(texts) / elapsed:>9.0f} "
+              f"{model.counter.calls['embed_documents']:>6} {len(result.succeeded):>9} "
+              f"{len(result.failed):>9} {misaligned(texts, result.embeddings):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+"""Deterministic local stand-ins for the upstream services."""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+DIMENSION = 1024
+
+
+def fake_vector(text: str, dimension: int = DIMENSION) -> list[float]:
+    """Stable pseudo-embedding: the same text always maps to the same unit vector."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def lexical_vector(text: str, dimension: int = DIMENSION) -> list[float]:
+    """
+    Hashed bag-of-words embedding: texts sharing words get similar vectors,
+    so overlapping or repeated chunks behave like near-duplicates do with a
+    real embedding model.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[h % dimension] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class CallCounter:
+    """Thread-safe per-method call counter shared by the fakes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def record(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+
+class Faults:
+    """
+    Seeded latency jitter and error injection shared by the fakes: each call
+    sleeps its base latency plus up to `jitter` seconds, and fails with a
+    retryable 429/503 with probability `error_rate`. With probability
+    `stall_rate` a call stalls for an extra `stall_seconds`, the occasional
+    multi-second upstream hiccup; `stall()` makes calls hang on command.
+    """
+
+    def __init__(self, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 stall_rate: float = 0.0, stall_seconds: float = 0.0):
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stalled_calls = 0  # left to stall on command; -1 for every call
+        self._stall_for = 0.0
+        self._released = threading.Event()
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def delay(self, latency: float) -> float:
+        return latency + (self.jitter * self._random() if self.jitter else 0.0)
+
+    def stall(self, seconds: float = 3600.0, calls: Optional[int] = None):
+        """Make the next `calls` calls (every call when None) hang for `seconds`, like a stalled or dead upstream."""
+        with self._lock:
+            self._stalled_calls = -1 if calls is None else calls
+            self._stall_for = seconds
+            self._released.clear()
+
+    def release(self):
+        """Stop stalling on command and wake the calls stalled so far."""
+        with self._lock:
+            self._stalled_calls = 0
+            self._released.set()
+
+    def _stall(self) -> float:
+        with self._lock:
+            if self._stalled_calls:
+                if self._stalled_calls > 0:
+                    self._stalled_calls -= 1
+                return self._stall_for
+        if self.stall_rate and self._random() < self.stall_rate:
+            return self.stall_seconds
+        return 0.0
+
+    def sleep(self, latency: float):
+        stall = self._stall()
+        time.sleep(self.delay(latency))
+        if stall:
+            self._released.wait(stall)
+
+    async def asleep(self, latency: float):
+        stall = self._stall()
+        await asyncio.sleep(self.delay(latency))
+        until = time.monotonic() + stall
+        while stall and not self._released.is_set() and time.monotonic() < until:
+            await asyncio.sleep(min(0.05, until - time.monotonic()))
+
+    def maybe_fail(self, counter: "CallCounter"):
+        if not self.error_rate:
+            return
+        roll = self._random()
+        if roll < self.error_rate:
+            counter.record("errors")
+            raise FakeUpstreamError(429 if roll < self.error_rate / 2 else 503)
+
+
+class FakeUpstreamError(Exception):
+    """HTTP-style error carrying a status code, like the real SDK exceptions."""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+# ==========================================================
+# Voyage
+# ==========================================================
+class FakeVoyageEmbeddings(Embeddings):
+    """
+    `error_rate` is the chance that a call fails with a retryable 429/503
+    and `jitter` adds up to that many seconds to each call's latency;
+    `reject` marks texts the fake refuses permanently (HTTP 400), so any
+    batch containing one fails until it is isolated. `vectorize` maps a text
+    to its vector (`fake_vector` by default, `lexical_vector` when similarity
+    should track shared words).
+    """
+
+    def __init__(self, model: str = "voyage-3.5", dimension: int = DIMENSION, latency: float = 0.0,
+                 latency_per_1k_chars: float = 0.0, error_rate: float = 0.0, reject=None, seed: int = 0,
+                 vectorize=fake_vector, jitter: float = 0.0):
+        self.model = model
+        self.vectorize = vectorize
+        self.dimension = dimension
+        self.latency = latency
+        self.latency_per_1k_chars = latency_per_1k_chars
+        self.reject = reject or (lambda text: False)
+        self.counter = CallCounter()
+        self.faults = Faults(jitter, error_rate, seed)
+
+    def _maybe_fail(self, texts: list[str]):
+        self.faults.maybe_fail(self.counter)
+        if any(self.reject(t) for t in texts):
+            self.counter.record("rejected")
+            raise FakeUpstreamError(400, "input rejected")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.counter.record("embed_documents")
+        self.faults.sleep(self.latency + self.latency_per_1k_chars * sum(map(len, texts)) / 1000)
+        self._maybe_fail(texts)
+        return [self.vectorize(t, self.dimension) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.counter.record("embed_query")
+        self.faults.sleep(self.latency)
+        self.faults.maybe_fail(self.counter)
+        return self.vectorize(text, self.dimension)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.counter.record("aembed_documents")
+        await self.faults.asleep(self.latency)
+        self._maybe_fail(texts)
+        return [self.vectorize(t, self.dimension) for t in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        self.counter.record("aembed_query")
+        await self.faults.asleep(self.latency)
+        self.faults.maybe_fail(self.counter)
+        return self.vectorize(text, self.dimension)
+
+
+# ==========================================================
+# Pinecone
+# ==========================================================
+class FakePineconeIndex:
+    """
+    In-memory index with the subset of the Pinecone `Index` API the app uses.
+
+    `upsert_latency` (per request) plus `upsert_latency_per_mb` model upsert
+    cost, and `query_latency_per_mb` the transfer time of query and fetch
+    responses on top of `latency`; requests over `max_request_bytes` are
+    refused with HTTP 400 like the real payload limit, and `error_rate` is the chance an upsert, update or query
+    fails with a retryable 429/503. `jitter` adds up to that many seconds to
+    each call.
+    """
+
+    def __init__(self, latency: float = 0.0, upsert_latency: float = 0.0,
+                 upsert_latency_per_mb: float = 0.0, max_request_bytes: Optional[int] = None,
+                 error_rate: float = 0.0, seed: int = 0, jitter: float = 0.0,
+                 query_latency_per_mb: float = 0.0):
+        self.vectors = {}
+        self.latency = latency
+        self.query_latency_per_mb = query_latency_per_mb
+        self.upsert_latency = upsert_latency
+        self.upsert_latency_per_mb = upsert_latency_per_mb
+        self.max_request_bytes = max_request_bytes
+        self.counter = CallCounter()
+        self.faults = Faults(jitter, error_rate, seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _items(vectors):
+        for item in vectors:
+            if isinstance(item, dict):
+                yield item["id"], item["values"], item.get("metadata", {})
+            else:
+                yield item
+
+    @staticmethod
+    def request_bytes(vectors) -> int:
+        """Serialized JSON size of an upsert request (values sampled to keep this cheap)."""
+        total = 0
+        for vid, values, metadata in FakePineconeIndex._items(vectors):
+            sample = list(values[:32])
+            per_value = len(json.dumps([float(v) for v in sample])) / max(len(sample), 1)
+            total += int(per_value * len(values)) + len(json.dumps({"id": vid, "metadata": metadata or {}}))
+        return total
+
+    def transfer_seconds(self, records) -> float:
+        """Modelled download time of response `records` (query matches or fetched vectors)."""
+        if not self.query_latency_per_mb:
+            return 0.0
+        size = self.request_bytes((r["id"], r.get("values", []), r.get("metadata")) for r in records)
+        return self.query_latency_per_mb * size / 1_000_000
+
+    def upsert(self, vectors, **kwargs):
+        self.counter.record("upsert")
+        size = self.request_bytes(vectors) if (self.max_request_bytes or self.upsert_latency_per_mb) else 0
+        self.faults.sleep(self.upsert_latency + self.upsert_latency_per_mb * size / 1_000_000)
+        if self.max_request_bytes and size > self.max_request_bytes:
+            self.counter.record("rejected")
+            raise FakeUpstreamError(400, f"request size {size} exceeds {self.max_request_bytes} bytes")
+        self.faults.maybe_fail(self.counter)
+
+        with self._lock:
+            for vid, values, metadata in self._items(vectors):
+                self.vectors[vid] = (np.asarray(values, dtype=np.float32), dict(metadata or {}))
+        return {"upserted_count": len(vectors)}
+
+    def update(self, id, set_metadata=None, **kwargs):
+        self.counter.record("update")
+        self.faults.sleep(self.upsert_latency)
+        self.faults.maybe_fail(self.counter)
+        with self._lock:
+            if id in self.vectors and set_metadata:
+                values, metadata = self.vectors[id]
+                self.vectors[id] = (values, {**metadata, **set_metadata})
+        return {}
+
+    def delete(self, ids=None, **kwargs):
+        self.counter.record("delete")
+        with self._lock:
+            for vid in ids or []:
+                self.vectors.pop(vid, None)
+        return {}
+
+    def fetch(self, ids, **kwargs):
+        self.counter.record("fetch")
+        self.faults.sleep(self.latency)
+        with self._lock:
+            found = {vid: self.vectors[vid] for vid in ids if vid in self.vectors}
+        vectors = {
+            vid: {"id": vid, "values": values.tolist(), "metadata": dict(metadata)}
+            for vid, (values, metadata) in found.items()
+        }
+        time.sleep(self.transfer_seconds(vectors.values()))
+        return {"vectors": vectors}
+
+    def list(self, prefix: str = "", limit: int = 100, **kwargs):
+        with self._lock:
+            ids = sorted(vid for vid in self.vectors if vid.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def query(self, vector=None, top_k: int = 10, include_metadata: bool = False,
+              include_values: bool = False, _skip_latency: bool = False, **kwargs):
+        self.counter.record("query")
+        if not _skip_latency:
+            self.faults.sleep(self.latency)
+        self.faults.maybe_fail(self.counter)
+        with self._lock:
+            items = list(self.vectors.items())
+        if not items:
+            return {"matches": []}
+
+        matrix = np.stack([values for _, (values, _) in items])
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        order = np.argsort(-scores)[:top_k]
+
+        matches = []
+        for i in order:
+            vid, (values, metadata) = items[i]
+            match = {"id": vid, "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = dict(metadata)
+            if include_values:
+                match["values"] = values.tolist()
+            matches.append(match)
+        if not _skip_latency:
+            time.sleep(self.transfer_seconds(matches))
+        return {"matches": matches}
+
+
+class FakePineconeAsyncIndex:
+    """Asyncio facade over a `FakePineconeIndex`, like Pinecone's `IndexAsyncio`."""
+
+    def __init__(self, index: FakePineconeIndex, latency: Optional[float] = None):
+        self.index = index
+        self.latency = index.latency if latency is None else latency
+
+    async def query(self, **kwargs):
+        self.index.counter.record("aquery")  # counted up front, so cancelled calls count too
+        await self.index.faults.asleep(self.latency)
+        response = self.index.query(**{**kwargs, "_skip_latency": True})
+        await asyncio.sleep(self.index.transfer_seconds(response["matches"]))
+        return response
+
+    async def close(self):
+        pass
+
+
+# ==========================================================
+# Groq
+# ==========================================================
+class FakeGroqChatModel(BaseChatModel):
+    """
+    Chat model returning a fixed answer after `first_token_latency`, then one
+    whitespace-delimited token every `token_latency` seconds when streamed.
+    `jitter` adds up to that many seconds before the first token, and
+    `error_rate` is the chance a call fails with a retryable 429/503.
+    `latency_per_1k_prompt_tokens` models prompt processing time; the
+    estimated prompt size of every call is appended to `prompt_tokens`.
+    """
+
+    answer: str = "- Stubbed answer from the fake LLM."
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+    latency_per_1k_prompt_tokens: float = 0.0
+    prompt_tokens: list = Field(default_factory=list)
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+    counter: Any = Field(default_factory=CallCounter)
+    faults: Any = None
+
+    def model_post_init(self, __context):
+        self.faults = self.faults or Faults(self.jitter, self.error_rate, self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-groq"
+
+    def _tokens(self) -> list[str]:
+        return [t for t in re.split(r"(\s)", self.answer) if t]
+
+    def _first_token_delay(self, messages) -> float:
+        """First-token latency for this prompt; records its estimated size (~4 characters per token)."""
+        tokens = sum(len(str(m.content)) for m in messages) // 4 + 1
+        self.prompt_tokens.append(tokens)
+        return self.first_token_latency + self.latency_per_1k_prompt_tokens * tokens / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.counter.record("generate")
+        self.faults.sleep(self._first_token_delay(messages) + self.token_latency * len(self._tokens()))
+        self.faults.maybe_fail(self.counter)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.counter.record("generate")
+        await self.faults.asleep(self._first_token_delay(messages) + self.token_latency * len(self._tokens()))
+        self.faults.maybe_fail(self.counter)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.counter.record("stream")
+        self.faults.sleep(self._first_token_delay(messages))
+        self.faults.maybe_fail(self.counter)
+        for token in self._tokens():
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.counter.record("stream")
+        await self.faults.asleep(self._first_token_delay(messages))
+        self.faults.maybe_fail(self.counter)
+        for token in self._tokens():
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+# ==========================================================
+# Google Vision
+# ==========================================================
+class FakeVisionClient:
+    """
+    Stand-in for `vision.ImageAnnotatorClient`. Each call sleeps `latency`
+    seconds (plus up to `jitter`), fails with a retryable 429/503 with
+    probability `error_rate`, and returns `text_for(content)` as the
+    detected text.
+    """
+
+    def __init__(self, latency: float = 0.0, text_for=None, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        from google.cloud import vision
+        self._vision = vision
+        self.latency = latency
+        self.text_for = text_for or (lambda content: f"OCR text ({len(content)} bytes)")
+        self.counter = CallCounter()
+        self.faults = Faults(jitter, error_rate, seed)
+        self.images_seen = 0
+
+    def _response(self, content: bytes):
+        return self._vision.AnnotateImageResponse(
+            full_text_annotation=self._vision.TextAnnotation(text=self.text_for(content))
+        )
+
+    def text_detection(self, image, **kwargs):
+        self.counter.record("text_detection")
+        self.faults.sleep(self.latency)
+        self.faults.maybe_fail(self.counter)
+        self.images_seen += 1
+        return self._response(image.content)
+
+    def batch_annotate_images(self, requests, **kwargs):
+        self.counter.record("batch_annotate_images")
+        self.faults.sleep(self.latency)
+        self.faults.maybe_fail(self.counter)
+        self.images_seen += len(requests)
+        return self._vision.BatchAnnotateImagesResponse(
+            responses=[self._response(r.image.content) for r in requests]
+        )
+
+
+class FakePageRasterizer:
+    """
+    Replaces pdf2image: returns placeholder page images and tracks how many are
+    alive at once, which is what drives peak memory when OCRing a scan.
+    """
+
+    def __init__(self, pages: int, bytes_per_page: int = 1700 * 2200 * 3, latency: float = 0.0):
+        self.pages = pages
+        self.bytes_per_page = bytes_per_page
+        self.latency = latency
+        self.live = 0
+        self.peak_live = 0
+        self._lock = threading.Lock()
+
+    def page_count(self, file_path: str) -> int:
+        return self.pages
+
+    def __call__(self, file_path: str, first_page: int, last_page: int):
+        images = []
+        for page in range(first_page, last_page + 1):
+            time.sleep(self.latency)
+            images.append(_FakePageImage(self, page))
+        return images
+
+    def _track(self, delta: int):
+        with self._lock:
+            self.live += delta
+            self.peak_live = max(self.peak_live, self.live)
+
+
+class _FakePageImage:
+    def __init__(self, rasterizer: FakePageRasterizer, page: int):
+        self.rasterizer = rasterizer
+        self.page = page
+        self.closed = False
+        rasterizer._track(+1)
+
+    def save(self, fp, format=None):
+        fp.write(f"page-{self.page}".encode("utf-8"))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.rasterizer._track(-1)
@@ -0,0 +1,84 @@
+"""
+Startup budget check: how long `import backend.src` takes in a fresh
+interpreter, and that none of the heavy client libraries are imported before
+the app starts serving (they load in the background warmup instead).
+
+    python -m benchmarks.import_time [--budget 1.0] [--runs 3] [--top 15]
+
+Exits non-zero when the best of `--runs` imports is over `--budget` seconds or
+a deferred module was imported, so CI can fail on a startup regression. Runs
+without Google Vision credentials, which the API must not need to boot.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Loaded by the warmup or on first use, never at import
+DEFERRED = (
+    "langchain_groq", "langchain_voyageai", "voyageai", "pinecone", "google.cloud.vision",
+    "langchain.chains", "langchain_core.retrievers", "langchain_text_splitters", "pdf2image",
+)
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import backend.src
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_once() -> tuple[dict, str]:
+    env = {key: value for key, value in os.environ.items() if key != "GOOGLE_APPLICATION_CREDENTIAL"}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        sys.exit(f"import backend.src failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def slowest(importtime: str, top: int) -> list[tuple[int, int, str]]:
+    """(self us, cumulative us, module) of the slowest imports in -X importtime output."""
+    rows = []
+    for line in importtime.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            rows.append((int(match[1]), int(match[2]), match[3] + match[4]))
+    return sorted(rows, key=lambda row: -row[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed for `import backend.src`")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_once() for _ in range(args.runs)]
+    result, importtime = min(runs, key=lambda run: run[0]["seconds"])
+    seconds = result["seconds"]
+
+    print(f"{'self ms':>8} {'cumul ms':>9}  module")
+    for self_us, cumulative_us, name in slowest(importtime, args.top):
+        print(f"{self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}  {name}")
+
+    deferred = [name for name in DEFERRED if name in result["modules"]]
+    print(f"\nimport backend.src: best {seconds:.3f}s of {args.runs} (budget {args.budget:.3f}s), "
+          f"{len(result['modules'])} modules")
+    failed = False
+    if seconds > args.budget:
+        print(f"FAIL: startup import is {seconds - args.budget:.3f}s over budget")
+        failed = True
+    if deferred:
+        print(f"FAIL: imported at startup, should load lazily: {', '.join(deferred)}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+LocalVectorIndex query latency and recall against brute-force cosine search
+(float64, norms recomputed per query) over the same vectors.
+
+    python -m benchmarks.local_index [--vectors 2000,10000,50000] [--queries 200]
+
+Vectors are clustered like chunk embeddings of a few manuals, and queries are
+perturbed copies of stored vectors. Also times a filtered query (one source
+document) and reopening the index from disk.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from backend.modules.vector_index import LocalVectorIndex
+
+DIMENSION = 1024
+
+
+def make_corpus(n: int, rng, sources: int = 20) -> np.ndarray:
+    centers = rng.standard_normal((sources, DIMENSION)).astype(np.float32)
+    labels = rng.integers(0, sources, size=n)
+    return centers[labels] + 0.8 * rng.standard_normal((n, DIMENSION)).astype(np.float32), labels
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    matrix = vectors.astype(np.float64)
+    scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    return np.argsort(-scores)[:k]
+
+
+def percentile_ms(samples, q) -> float:
+    return float(np.percentile(samples, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", default="2000,10000,50000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'vectors':>8} {'mode':<14} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+    for n in (int(v) for v in args.vectors.split(",")):
+        vectors, labels = make_corpus(n, rng)
+        picks = rng.integers(0, n, size=args.queries)
+        queries = vectors[picks] + 0.5 * rng.standard_normal((args.queries, DIMENSION)).astype(np.float32)
+
+        with tempfile.TemporaryDirectory() as path:
+            index = LocalVectorIndex(path, dimension=DIMENSION)
+            for start in range(0, n, 1000):
+                index.upsert([
+                    (f"doc{labels[i]}#{i:08d}", vectors[i], {"source": f"doc{labels[i]}.pdf", "page": i % 300})
+                    for i in range(start, min(start + 1000, n))
+                ])
+
+            exact_times, local_times, filtered_times, hits = [], [], [], 0
+            for q in queries:
+                t = time.perf_counter()
+                exact = brute_force(vectors, q.astype(np.float64), args.top_k)
+                exact_times.append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                response = index.query(vector=q, top_k=args.top_k, include_metadata=True)
+                local_times.append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                index.query(vector=q, top_k=args.top_k, filter={"source": {"$eq": "doc3.pdf"}})
+                filtered_times.append(time.perf_counter() - t)
+
+                found = {int(m["id"].split("#")[1]) for m in response["matches"]}
+                hits += len(found & set(exact.tolist()))
+            recall = hits / (args.top_k * args.queries)
+            index.close()
+
+            t = time.perf_counter()
+            reopened = LocalVectorIndex(path, dimension=DIMENSION)
+            reopen = time.perf_counter() - t
+            assert len(reopened) == n
+            reopened.close()
+
+        print(f"{n:>8} {'brute force':<14} {percentile_ms(exact_times, 50):>8.3f} {percentile_ms(exact_times, 95):>8.3f} {1.0:>9.3f}")
+        print(f"{n:>8} {'local index':<14} {percentile_ms(local_times, 50):>8.3f} {percentile_ms(local_times, 95):>8.3f} {recall:>9.3f}")
+        print(f"{n:>8} {'local filtered':<14} {percentile_ms(filtered_times, 50):>8.3f} {percentile_ms(filtered_times, 95):>8.3f} {'-':>9}")
+        print(f"{n:>8} {'reopen':<14} {reopen * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Scanned-PDF OCR: eager rasterize-everything + sequential Vision calls versus
+the page-streaming engine.
+
+    python -m benchmarks.ocr_streaming [--pages 300] [--latency 0.02]
+
+Uses a fake rasterizer and a local stand-in Vision client, so no Poppler,
+credentials or network are needed. Peak memory is reported as the largest
+number of rasterized pages alive at once (about 11 MB each at 200 dpi).
+"""
+import argparse
+import io
+import time
+from benchmarks.fakes import FakePageRasterizer, FakeVisionClient
+from backend.modules.ocr_engine import StreamingOCREngine
+from backend.logger import logger
+
+MB = 1024 * 1024
+
+
+def run_eager(pages: int, latency: float, raster_latency: float):
+    """What load_pdf_with_hybrid_ocr used to do."""
+    from google.cloud import vision
+    rasterizer = FakePageRasterizer(pages, latency=raster_latency)
+    client = FakeVisionClient(latency=latency)
+
+    start = time.perf_counter()
+    images = rasterizer("scan.pdf", 1, pages)
+    for img in images:
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        client.text_detection(image=vision.Image(content=buf.getvalue()))
+    elapsed = time.perf_counter() - start
+    for img in images:
+        img.close()
+    return elapsed, rasterizer.peak_live, rasterizer.bytes_per_page, client
+
+
+def run_streaming(pages: int, latency: float, raster_latency: float, concurrency: int,
+                  batch_size: int, max_pages: int):
+    rasterizer = FakePageRasterizer(pages, latency=raster_latency)
+    client = FakeVisionClient(latency=latency)
+    engine = StreamingOCREngine(
+        client,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        max_pages_in_memory=max_pages,
+        rasterize=rasterizer,
+        page_count=rasterizer.page_count,
+    )
+
+    start = time.perf_counter()
+    results = list(engine.iter_pages("scan.pdf"))
+    elapsed = time.perf_counter() - start
+    assert [p for p, _ in results] == list(range(1, pages + 1)), "pages out of order"
+    return elapsed, rasterizer.peak_live, rasterizer.bytes_per_page, client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per Vision call")
+    parser.add_argument("--raster-latency", type=float, default=0.002, help="seconds per page")
+    args = parser.parse_args()
+    logger.setLevel("WARNING")
+
+    configs = [
+        ("eager, sequential", None),
+        ("stream c=4 b=1 cap=8", dict(concurrency=4, batch_size=1, max_pages=8)),
+        ("stream c=8 b=1 cap=8", dict(concurrency=8, batch_size=1, max_pages=8)),
+        ("stream c=4 b=4 cap=16", dict(concurrency=4, batch_size=4, max_pages=16)),
+        ("stream c=8 b=4 cap=32", dict(concurrency=8, batch_size=4, max_pages=32)),
+    ]
+
+    print(f"{args.pages} pages, {args.latency * 1000:.0f} ms per Vision call\n")
+    print(f"{'mode':<24} {'seconds':>8} {'pages/s':>8} {'calls':>6} {'peak pages':>11} {'peak MB':>8}")
+    for name, kwargs in configs:
+        if kwargs is None:
+            elapsed, peak, size, client = run_eager(args.pages, args.latency, args.raster_latency)
+        else:
+            elapsed, peak, size, client = run_streaming(
+                args.pages, args.latency, args.raster_latency, **kwargs
+            )
+        calls = sum(client.counter.calls.values())
+        print(f"{name:<24} {elapsed:>8.2f} {args.pages / elapsed:>8.1f} {calls:>6} "
+              f"{peak:>11} {peak * size / MB:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
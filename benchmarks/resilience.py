@@ -0,0 +1,183 @@
+"""
+Tail latency and outage behaviour of the ask path with and without the
+upstream resilience layer (deadlines, hedging, circuit breakers).
+
+    python -m benchmarks.resilience [--questions 400] [--concurrency 8] [--stall-rate 0.02]
+                                    [--stall 2.0] [--outage 3.0]
+
+Runs questions through the real async RAGPipeline (query embed, vector
+query, answer) against the local fakes.
+
+- stalls: every fake call stalls for `--stall` seconds with probability
+  `--stall-rate`; reports /ask latency p50/p95/p99/max and the extra
+  upstream calls hedging cost.
+- outage: Pinecone is stalled on command for `--outage` seconds while a
+  question arrives every `--interval` seconds, then released. Unguarded
+  questions hang until it comes back; guarded ones time out until the
+  circuit opens, then fail fast, and the circuit closes again once the
+  half-open trial call succeeds.
+"""
+import argparse
+import asyncio
+import random
+import numpy as np
+from benchmarks.fakes import (
+    Faults,
+    FakeGroqChatModel,
+    FakePineconeAsyncIndex,
+    FakePineconeIndex,
+    FakeVoyageEmbeddings,
+    fake_vector,
+)
+from backend.logger import logger
+from backend.modules.llm import get_answer_chain
+from backend.modules.pipeline import RAGPipeline
+from backend.modules.resilience import CircuitBreaker, CircuitOpenError, ResilientEmbeddings, Upstream, UpstreamTimeout
+from backend.modules.retriever import PineconeRetriever
+
+# Base latencies in seconds
+LATENCY = {"voyage": 0.08, "pinecone": 0.03, "groq_first_token": 0.30, "groq_token": 0.002}
+ANSWER = "- Hold EXIT and power on to reset the unit. (manual.pdf, page 3)"
+
+
+def build(args, guarded: bool, stall_rate: float):
+    """A pipeline over fresh, identically seeded fakes; returns it and the fakes."""
+    def faults(name, seed):
+        return Faults(jitter=LATENCY[name] * args.jitter, seed=seed,
+                      stall_rate=stall_rate, stall_seconds=args.stall)
+
+    voyage = FakeVoyageEmbeddings(latency=LATENCY["voyage"])
+    voyage.faults = faults("voyage", 1)
+    index = FakePineconeIndex(latency=LATENCY["pinecone"])
+    index.upsert([
+        (f"manual#{i:04d}", fake_vector(f"chunk {i}"), {"source": "manual.pdf", "page": i, "text": f"chunk {i}"})
+        for i in range(200)
+    ])
+    index.faults = faults("pinecone", 2)
+    groq = FakeGroqChatModel(answer=ANSWER, first_token_latency=LATENCY["groq_first_token"],
+                             token_latency=LATENCY["groq_token"], faults=faults("groq_first_token", 3))
+
+    def upstream(name, timeout):
+        return Upstream(name, timeout, hedge_min_delay=0.02,
+                        breaker=CircuitBreaker(name, args.breaker_threshold, args.breaker_reset)) if guarded else None
+
+    retriever = PineconeRetriever(
+        index=index,
+        embeddings=ResilientEmbeddings(voyage, upstream("voyage", args.timeout)) if guarded else voyage,
+        async_index=FakePineconeAsyncIndex(index),
+        upstream=upstream("pinecone", args.timeout),
+    )
+    pipeline = RAGPipeline(retriever, get_answer_chain(llm=groq), llm_upstream=upstream("groq", args.llm_timeout))
+    return pipeline, {"voyage": voyage, "pinecone": index, "groq": groq}
+
+
+async def ask(pipeline: RAGPipeline, question: str) -> str:
+    docs = await pipeline.aretrieve(question)
+    return await pipeline.aanswer(question, docs)
+
+
+async def run_stalls(args, guarded: bool) -> dict:
+    pipeline, fakes = build(args, guarded, args.stall_rate)
+    rng = random.Random(0)
+    questions = [f"How do I set parameter {rng.randrange(500)}?" for _ in range(args.questions)]
+    # fill the latency windows the hedge delays come from
+    for question in questions[:args.warmup]:
+        await ask(pipeline, question)
+    for fake in fakes.values():
+        fake.counter.reset()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def one(question: str) -> float:
+        async with semaphore:
+            start = loop.time()
+            await ask(pipeline, question)
+            return loop.time() - start
+
+    seconds = np.array(await asyncio.gather(*(one(q) for q in questions))) * 1000
+    calls = sum(fake.counter.calls[name] for fake in fakes.values()
+                for name in ("aembed_query", "aquery", "generate"))
+    return {
+        "p50": np.median(seconds), "p95": np.percentile(seconds, 95),
+        "p99": np.percentile(seconds, 99), "max": seconds.max(),
+        "calls": calls / (3 * len(questions)) - 1,
+    }
+
+
+async def run_outage(args, guarded: bool) -> dict:
+    pipeline, fakes = build(args, guarded, 0.0)
+    for i in range(args.warmup):
+        await ask(pipeline, f"warmup {i}")
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    results = []  # (sent during the outage, seconds, outcome)
+
+    async def one(question: str, during: bool):
+        sent = loop.time()
+        try:
+            await ask(pipeline, question)
+            outcome = "ok"
+        except CircuitOpenError:
+            outcome = "fail-fast"
+        except UpstreamTimeout:
+            outcome = "timeout"
+        results.append((during, loop.time() - sent, outcome))
+
+    fakes["pinecone"].faults.stall(seconds=3600)
+    tasks = []
+    for i in range(int((args.outage + args.after) / args.interval)):
+        during = loop.time() - start < args.outage
+        if not during:
+            fakes["pinecone"].faults.release()
+        tasks.append(asyncio.create_task(one(f"question {i}", during)))
+        await asyncio.sleep(args.interval)
+    await asyncio.gather(*tasks)
+    fakes["pinecone"].faults.release()
+
+    phases = {}
+    for phase, during in (("outage", True), ("after", False)):
+        rows = [(seconds, outcome) for d, seconds, outcome in results if d == during]
+        outcomes = {o: sum(outcome == o for _, outcome in rows) for o in ("ok", "timeout", "fail-fast")}
+        phases[phase] = {"n": len(rows), "p50": np.median([s for s, _ in rows]) * 1000,
+                         "max": max(s for s, _ in rows) * 1000, **outcomes}
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=30, help="unmeasured questions before each run")
+    parser.add_argument("--jitter", type=float, default=0.25, help="latency jitter, as a fraction of the base")
+    parser.add_argument("--stall-rate", type=float, default=0.02, help="chance that any one upstream call stalls")
+    parser.add_argument("--stall", type=float, default=2.0, help="seconds a stalled call takes")
+    parser.add_argument("--timeout", type=float, default=1.0, help="deadline for embed and vector calls")
+    parser.add_argument("--llm-timeout", type=float, default=5.0)
+    parser.add_argument("--breaker-threshold", type=int, default=5)
+    parser.add_argument("--breaker-reset", type=float, default=1.0)
+    parser.add_argument("--outage", type=float, default=3.0, help="seconds Pinecone hangs in the outage run")
+    parser.add_argument("--after", type=float, default=2.0, help="seconds of questions after it comes back")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between outage-run questions")
+    args = parser.parse_args()
+    logger.setLevel("ERROR")
+
+    print(f"Stalls: {args.questions} questions, concurrency {args.concurrency}, "
+          f"{args.stall_rate:.0%} of upstream calls stall {args.stall:.1f}s\n")
+    print(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'extra calls':>12}")
+    for name, guarded in (("unguarded", False), ("guarded", True)):
+        r = asyncio.run(run_stalls(args, guarded))
+        print(f"{name:<10} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['max']:>8.1f} {r['calls']:>12.1%}")
+
+    print(f"\nOutage: Pinecone hangs for {args.outage:.1f}s, a question every {args.interval * 1000:.0f} ms, "
+          f"{args.after:.1f}s more after it is back\n")
+    print(f"{'mode':<10} {'phase':<7} {'n':>4} {'ok':>4} {'timeout':>8} {'fail-fast':>9} {'p50 ms':>8} {'max ms':>8}")
+    for name, guarded in (("unguarded", False), ("guarded", True)):
+        for phase, r in asyncio.run(run_outage(args, guarded)).items():
+            print(f"{name:<10} {phase:<7} {r['n']:>4} {r['ok']:>4} {r['timeout']:>8} {r['fail-fast']:>9} "
+                  f"{r['p50']:>8.1f} {r['max']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
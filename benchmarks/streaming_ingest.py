@@ -0,0 +1,105 @@
+"""
+Peak memory and time-to-first-searchable-chunk: the previous all-at-once
+ingestion (every chunk, then every embedding, then every vector, then upsert)
+versus the streaming IngestionPipeline, for growing documents.
+
+    python -m benchmarks.streaming_ingest [--pages 100,500,2000] [--page-latency 0.005]
+
+Pages come from a generator with per-page extraction latency, embeddings and
+the index are fakes with per-call latency; memory is Python allocations
+traced with tracemalloc.
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.fakes import FakePineconeIndex, FakeVoyageEmbeddings
+from backend.logger import logger
+from backend.modules.chunk_manifest import ChunkManifest, assign_vector_ids, chunk_hash
+from backend.modules.embedding_engine import EmbeddingEngine
+from backend.modules.ingest_pipeline import IngestionPipeline
+from backend.modules.upsert_pipeline import UpsertPipeline
+
+MODEL = "voyage-3.5"
+
+
+def make_pages(n: int, latency: float):
+    for page in range(n):
+        time.sleep(latency)
+        text = " ".join(f"Page {page} line {line}: the delay time parameter sets echo spacing." for line in range(24))
+        yield Document(page_content=text, metadata={"source": "manual.pdf", "page": page, "extraction": "text"})
+
+
+class FirstUpsert:
+    """Wraps an index to record when the first vectors land."""
+
+    def __init__(self, index):
+        self.index = index
+        self.started = time.monotonic()
+        self.first = None
+
+    def upsert(self, vectors, **kwargs):
+        response = self.index.upsert(vectors, **kwargs)
+        if self.first is None:
+            self.first = time.monotonic() - self.started
+        return response
+
+
+def legacy_ingest(pages, source, splitter, engine, upserter, manifest):
+    """The previous load_vectorstore_from_docs flow, kept here as the baseline."""
+    chunks = splitter.split_documents(list(pages))
+    hashes = [chunk_hash(c.page_content, MODEL) for c in chunks]
+    ids = assign_vector_ids(source, hashes)
+    result = engine.embed([c.page_content for c in chunks])
+    vectors = [
+        (ids[i], result.embeddings[i], {"source": source, "page": chunks[i].metadata.get("page"),
+                                        "text": chunks[i].page_content})
+        for i in result.succeeded
+    ]
+    page_of = {ids[i]: chunks[i].metadata.get("page") for i in result.succeeded}
+    upserter.upsert(vectors, on_batch=lambda batch: manifest.add(source, [(vid, "", page_of[vid]) for vid in batch]))
+
+
+def measure(fn) -> tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", default="100,500,2000")
+    parser.add_argument("--page-latency", type=float, default=0.002, help="seconds to extract a page")
+    parser.add_argument("--embed-latency", type=float, default=0.03)
+    parser.add_argument("--upsert-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    logger.setLevel("CRITICAL")
+
+    print(f"{'pages':>6} {'mode':<10} {'seconds':>8} {'first vectors s':>16} {'peak MB':>8}")
+    for n in (int(p) for p in args.pages.split(",")):
+        for mode in ("legacy", "streaming"):
+            with tempfile.TemporaryDirectory() as path:
+                index = FirstUpsert(FakePineconeIndex(upsert_latency=args.upsert_latency))
+                manifest = ChunkManifest(f"{path}/manifest.sqlite")
+                splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+                engine = EmbeddingEngine(FakeVoyageEmbeddings(latency=args.embed_latency), max_concurrency=4)
+                upserter = UpsertPipeline(index, max_concurrency=8)
+                pages = make_pages(n, args.page_latency)
+                if mode == "legacy":
+                    run = lambda: legacy_ingest(pages, "manual.pdf", splitter, engine, upserter, manifest)
+                else:
+                    pipeline = IngestionPipeline("manual.pdf", MODEL, splitter, engine, upserter, manifest,
+                                                 batch_size=512, flush_seconds=1.0)
+                    run = lambda: pipeline.run(pages)
+                elapsed, peak = measure(run)
+                print(f"{n:>6} {mode:<10} {elapsed:>8.2f} {index.first:>16.2f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
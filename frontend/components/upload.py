@@ -6,8 +6,13 @@ def render_uploader():
     uploaded_files = st.sidebar.file_uploader("Upload multiple PDFs", type="pdf", accept_multiple_files=True)
     if st.sidebar.button("Upload DB") and uploaded_files:
         response = upload_pdfs(uploaded_files)
-        if response.status_code == 200:
-            st.sidebar.success("Uploaded Successfully!")
+        if response.status_code in (200, 202):
+            st.sidebar.success("Uploaded Successfully! Processing in the background.")
+            for job in response.json().get("jobs", []):
+                if job["status"] == "duplicate":
+                    st.sidebar.caption(f"{job['filename']}: already indexed as {job['duplicate_of']}, skipped")
+                else:
+                    st.sidebar.caption(f"{job['filename']}: job {job['job_id']}")
 
         else:
             st.sidebar.error(f"Error: {response.text}")
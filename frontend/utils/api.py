@@ -1,9 +1,57 @@
+import os
+import uuid
 import requests
 from frontend.config import API_URL
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class MultipartStream:
+    """
+    multipart/form-data body that reads each file in chunks while it is sent,
+    instead of building the whole body in memory. Sizes are known up front,
+    so requests sends a Content-Length rather than chunked encoding.
+    """
+
+    def __init__(self, files, field="files", content_type="application/pdf"):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._parts = []
+        for f in files:
+            name = getattr(f, "name", "upload.pdf").replace('"', "%22")
+            head = (f"--{self.boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{field}"; filename="{name}"\r\n'
+                    f"Content-Type: {content_type}\r\n\r\n").encode()
+            self._parts.append((head, f, _size(f)))
+        self._tail = f"--{self.boundary}--\r\n".encode()
+
+    def __len__(self):
+        return sum(len(head) + size + 2 for head, _, size in self._parts) + len(self._tail)
+
+    def __iter__(self):
+        for head, f, _ in self._parts:
+            yield head
+            f.seek(0)
+            for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                yield block
+            yield b"\r\n"
+        yield self._tail
+
+
+def _size(f) -> int:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+
 def upload_pdfs(files):
-    files_payload = [("files", (f.name, f.read(), "application/pdf")) for f in files]
-    return requests.post(f"{API_URL}/upload_pdfs/", files=files_payload)
+    body = MultipartStream(files)
+    return requests.post(f"{API_URL}/upload_pdfs/", data=body, headers={"Content-Type": body.content_type})
+
+
+def get_job(job_id):
+    return requests.get(f"{API_URL}/jobs/{job_id}")
 
 
 def ask_questions(question):
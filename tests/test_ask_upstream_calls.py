@@ -0,0 +1,110 @@
+"""
+Upstream calls per question on the production ask path: the registry-built
+pipeline (query-embedding cache, answer cache, hybrid search, reranking,
+chunk store) behind the /ask endpoints, with the local fakes standing in
+for Voyage, Pinecone and Groq.
+
+    python -m pytest tests/test_ask_upstream_calls.py
+"""
+import random
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from benchmarks.documents import manual_page
+from benchmarks.fakes import FakeGroqChatModel, FakePineconeAsyncIndex, FakePineconeIndex, FakeVoyageEmbeddings
+from backend.config.config import config
+from backend.modules import (
+    answer_cache,
+    bm25_index,
+    chunk_manifest,
+    chunk_store,
+    embedding_archive,
+    llm,
+    load_vectorstore,
+)
+from backend.modules.resources import ResourceRegistry
+from backend.modules.retriever import HybridRetriever, RerankingRetriever
+from backend.routes.ask_questions import router
+
+QUESTIONS = [
+    "How do I reset the unit to factory settings?",
+    "Which MIDI CC controls the expression pedal?",
+    "How many patches can be stored?",
+]
+
+
+@pytest.fixture
+def fakes(tmp_path, monkeypatch):
+    """Every file the app writes goes to `tmp_path`, every upstream client is a fake."""
+    for key, name in [("CHUNK_MANIFEST_PATH", "chunk_manifest.sqlite"), ("BM25_INDEX_PATH", "bm25.sqlite"),
+                      ("CHUNK_STORE_PATH", "chunks.sqlite"), ("EMBED_CACHE_PATH", "query_embeddings.sqlite"),
+                      ("EMBEDDING_ARCHIVE_PATH", "embedding_archive")]:
+        monkeypatch.setattr(config, key, str(tmp_path / name))
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "pinecone")
+    for module, name in [(answer_cache, "_answer_cache"), (bm25_index, "_bm25_index"),
+                         (chunk_manifest, "_chunk_manifest"), (chunk_store, "_chunk_store"),
+                         (embedding_archive, "_embedding_archive")]:
+        monkeypatch.setattr(module, name, None)
+
+    voyage, index, groq = FakeVoyageEmbeddings(), FakePineconeIndex(), FakeGroqChatModel()
+    monkeypatch.setattr(load_vectorstore, "VoyageAIEmbeddings", lambda **kw: voyage)
+    monkeypatch.setattr("langchain_voyageai.VoyageAIEmbeddings", lambda **kw: voyage)
+    monkeypatch.setattr(load_vectorstore, "_pinecone_index", index)
+    monkeypatch.setattr(llm, "get_llm", lambda settings=None: groq)
+    return voyage, index, groq
+
+
+@pytest.fixture
+def client(fakes):
+    voyage, index, _ = fakes
+    rng = random.Random(0)
+    pages = [Document(page_content=manual_page(page, rng)[0],
+                      metadata={"source": "manual.pdf", "page": page, "extraction": "text"}) for page in range(12)]
+    load_vectorstore.ingest_pages(pages, "manual.pdf")
+
+    registry = ResourceRegistry()
+    registry.async_index = FakePineconeAsyncIndex(index)
+    resources = registry.load()
+    assert isinstance(resources.retriever, RerankingRetriever)
+    assert isinstance(resources.retriever.base, HybridRetriever)
+    assert resources.pipeline.answer_cache is not None
+
+    app = FastAPI()
+    app.include_router(router)
+    app.state.resources = registry
+    with TestClient(app) as client:
+        yield client
+    registry.close()
+
+
+def upstream_calls(fakes) -> dict:
+    voyage, index, groq = fakes
+    calls = {
+        "embeds": sum(voyage.counter.calls[name] for name in
+                      ("embed_query", "aembed_query", "embed_documents", "aembed_documents")),
+        "vector_queries": index.counter.calls["query"],
+        "llm_calls": groq.counter.calls["generate"] + groq.counter.calls["stream"],
+    }
+    for counter in (voyage.counter, index.counter, groq.counter):
+        counter.reset()
+    return calls
+
+
+@pytest.mark.parametrize("endpoint", ["/ask/", "/ask/stream"])
+def test_one_embed_and_one_vector_query_per_question(client, fakes, endpoint):
+    upstream_calls(fakes)
+    for question in QUESTIONS:
+        response = client.post(endpoint, data={"query": question})
+        assert response.status_code == 200
+        assert "[ERROR]" not in response.text
+        assert upstream_calls(fakes) == {"embeds": 1, "vector_queries": 1, "llm_calls": 1}, question
+
+
+@pytest.mark.parametrize("endpoint", ["/ask/", "/ask/stream"])
+def test_repeated_question_makes_no_upstream_calls(client, fakes, endpoint):
+    client.post(endpoint, data={"query": QUESTIONS[0]})
+    upstream_calls(fakes)
+    response = client.post(endpoint, data={"query": QUESTIONS[0]})
+    assert response.status_code == 200
+    assert upstream_calls(fakes) == {"embeds": 0, "vector_queries": 0, "llm_calls": 0}